@@ -1,7 +1,28 @@
-import asyncio
-import random
-import math
-import time
+from events import PICKUP, DEPOSIT, TRAIL_ABANDONED, FOOD_TYPE_CODES
+from topology import STEP_ANGLES
+from visited import VisitedMemory, MEMORY_LENGTH
+
+# how many ticks an ant rests for after picking up or dropping off food (3 seconds at 0.1 seconds a tick)
+REST_TICKS = 30
+# how many ticks an ant ignores pheromone trails for after one runs out (5 seconds at 0.1 seconds a tick)
+IGNORE_PHEROMONE_TICKS = 50
+
+# goal codes, what an ant is doing is kept as one of these and the index into GOALS gives the text shown for it
+# the swarm uses the same codes
+GOAL_EXPLORING = 0
+GOAL_DEPOSITING = 1
+GOAL_RETURNING = 2
+GOAL_PICKING_UP = 3
+GOAL_FOLLOWING = 4
+GOAL_DETECTED = 5
+GOALS = [
+    "exploring for food",
+    "depositing food",
+    "returning to nest with food",
+    "picking up food",
+    "following pheromone trail",
+    "detected pheromone trail",
+]
 
 class Ant_agent:
     """
@@ -9,7 +30,11 @@ class Ant_agent:
     each ant agent is responsibble for thier own decision making and interacctions
     """
 
-    def __init__(self, position, environment, nest, colour):
+    # slots instead of a __dict__ per ant, so big colonies take less memory
+    __slots__ = ("environment", "_position", "direction", "carrying_food", "nest", "colour", "sensing_range",
+                 "following_pheromone", "visited", "ignore_pheromone_until", "goal", "sleep_until")
+
+    def __init__(self, position, environment, nest, colour, sensing_range=2, memory_length=MEMORY_LENGTH):
         """
         intialises the ant agent
         assigning it to the environment and a nest, colour, and position
@@ -19,32 +44,81 @@ class Ant_agent:
             environment (Environment): the environment that the ant is to act within
             nest (Nest): the nest the ant is assigned to
             colour (tuple): the coour code of the ant
+            sensing_range (int, optional): how many squares away the ant can sense food and pheromones. Defaults to 2.
+            memory_length (int, optional): how many of the squares it last stood on the ant remembers. Defaults to MEMORY_LENGTH.
         """
 
         # initialise properties of the ant
-        self.position = position
+        self.environment = environment
+        # the ant adds itself to the environments index of ants, the position property keeps it up to date
+        self._position = position
+        environment.ant_index.insert(self, position)
         self.direction = 0 
         self.carrying_food = False
-        self.environment = environment
         self.nest = nest
         self.colour = colour 
-        self.sensing_range = 2
+        self.sensing_range = sensing_range
         self.following_pheromone = False 
-        self.visited_positions = []
+        # the squares the ant stood on last, so exploring ants can avoid going back over them
+        self.visited = VisitedMemory(environment.cols, memory_length)
         self.ignore_pheromone_until = None
-        self.agent_goal = "exploring for food"
+        # one of the GOAL_ codes, agent_goal gives it as text
+        self.goal = GOAL_EXPLORING
+        # ticks on the environment clock, not wall clock time
         self.sleep_until = 0
 
-    async def act(self):
+    @property
+    def position(self):
+        """
+        the coordinates of the grid square the ant is on
+        """
+        return self._position
+
+    @position.setter
+    def position(self, position):
+        self.environment.ant_index.move(self, self._position, position)
+        self._position = position
+
+    @property
+    def agent_goal(self):
+        """
+        what the ant is doing, as the text shown in its popup
+        """
+        return GOALS[self.goal]
+
+    @agent_goal.setter
+    def agent_goal(self, goal):
+        self.goal = GOALS.index(goal)
+
+    @property
+    def visited_positions(self):
+        """
+        the squares the ant remembers standing on, oldest first
+        """
+        return list(self.visited)
+
+    @visited_positions.setter
+    def visited_positions(self, positions):
+        self.visited.clear()
+        for position in positions:
+            self.visited.add(position)
+
+    def act(self):
         """
         function tha contains the decision making logic for the ant agents
         the priorites of the ant agents are basically how they are organised in this function
         roughly summarised as:
         return food to nest > move towards sensed food > look for food > follow pheromones > look for pheromones > explore the environment
+        the ant takes one action each time this is called, which is once per simulation tick
         """
+        # counts which branch the ant takes when the sim is being profiled
+        profiler = self.environment.profiler
+
         # check if the ant is currently sleeping (picking up or dropping off food)
-        if self.sleep_until and time.time() < self.sleep_until:
+        if self.sleep_until and self.environment.tick < self.sleep_until:
             # is its still sleeping skip
+            if profiler:
+                profiler.count("branch.resting")
             return
         
         # check if the ant is currently carrying food
@@ -53,18 +127,23 @@ class Ant_agent:
             # if the ant is at the nest location
             if self.position == self.nest.position:
                 # deposit food to the nest
-                self.agent_goal = "depositing food"
+                self.goal = GOAL_DEPOSITING
                 self.carrying_food = False
                 self.nest.add_food()
-                self.sleep_until = time.time() + 3
-                print(f"Ant at {self.position} dropped food. Total food at {self.colour} nest: {self.nest.total_food}")
+                self.sleep_until = self.environment.tick + REST_TICKS
+                if profiler:
+                    profiler.count("branch.depositing")
+                self.environment.events.emit(DEPOSIT, self.environment.tick, self.position[0], self.position[1],
+                                             self.environment.nests.index(self.nest), self.nest.total_food)
             
             # if its not at the nest
             else:
                 # move towards the nst and lay pheromones
-                self.agent_goal = "returning to nest with food"
+                self.goal = GOAL_RETURNING
                 self.environment.drop_pheromone(self.position, self.colour)
-                self.move_towards(self.nest.position)
+                self.return_home()
+                if profiler:
+                    profiler.count("branch.returning")
         
         # if it isnt carrying food
         else:
@@ -78,42 +157,52 @@ class Ant_agent:
                 # if the ant is at the position of the food
                 if food_at_position.position[0] == self.position[0] and food_at_position.position[1] == self.position[1]:
                     # pick up some food
-                    self.agent_goal = "picking up food"
+                    self.goal = GOAL_PICKING_UP
                     self.carrying_food = True
                     self.environment.remove_food(food_at_position.position)
-                    self.sleep_until = time.time() + 3
-                    print(f"Ant at {self.position} picked up {food_at_position.food_type} food.")
+                    self.sleep_until = self.environment.tick + REST_TICKS
+                    if profiler:
+                        profiler.count("branch.picking_up")
+                    self.environment.events.emit(PICKUP, self.environment.tick, self.position[0], self.position[1],
+                                                 self.environment.nests.index(self.nest), FOOD_TYPE_CODES[food_at_position.food_type])
                 
                 # if its not move towards the food
                 else:
                     self.move_towards(food_at_position.position)
+                    if profiler:
+                        profiler.count("branch.moving_to_food")
             
             # if the ant is following a pheromone trail
             elif self.following_pheromone:
                 # follow the pheromone trail
-                self.agent_goal = "following pheromone trail"
+                self.goal = GOAL_FOLLOWING
                 self.follow_pheromone()
+                if profiler:
+                    profiler.count("branch.following_trail")
             
             # if the ant is ignoring a pheromone trail then explore
             # this is here to stop the ants getting stuck following a pheromone trail that leads to food that isnt there anymore
             # the agents will still pick up food if found but wont follow the pheromones
-            elif self.ignore_pheromone_until and asyncio.get_event_loop().time() < self.ignore_pheromone_until:
+            elif self.ignore_pheromone_until and self.environment.tick < self.ignore_pheromone_until:
                 # explore
-                self.agent_goal = "exploring for food"
+                self.goal = GOAL_EXPLORING
                 self.move()
+                if profiler:
+                    profiler.count("branch.ignoring_trails")
             
             else:
                 # look for any phromone trails, if found follow them
                 if self.start_following_pheromone():
-                    self.agent_goal = "detected pheromone trail"
+                    self.goal = GOAL_DETECTED
                     self.following_pheromone = True
+                    if profiler:
+                        profiler.count("branch.detected_trail")
                 else:
                     # explore if no pheromones are found
-                    self.agent_goal = "exploring for food"
+                    self.goal = GOAL_EXPLORING
                     self.move()
-
-        # give time for the agents to decide and act
-        await asyncio.sleep(0.1) 
+                    if profiler:
+                        profiler.count("branch.exploring")
 
     def sense_food(self):
         """
@@ -122,13 +211,13 @@ class Ant_agent:
         Returns:
             Food: the food that is found or None if none found
         """
-        for food in self.environment.food_items:
-            # check if the food is within the sensing range using abs so its always positive
-            if abs(food.position[0] - self.position[0]) <= self.sensing_range and \
-               abs(food.position[1] - self.position[1]) <= self.sensing_range:
-                self.ignore_pheromone_until = 0
-                return food
-        return None
+        if self.environment.profiler:
+            self.environment.profiler.count("sensing_scans")
+        # one lookup in the environments scent field for the ants sensing range
+        food = self.environment.food_within(self.position, self.sensing_range)
+        if food:
+            self.ignore_pheromone_until = 0
+        return food
 
     def start_following_pheromone(self):
         """
@@ -137,17 +226,15 @@ class Ant_agent:
         Returns:
             bool: boolean representing if a trial if found
         """
-        # check for pheromones on x axis
-        for x in range(self.position[0] - self.sensing_range, self.position[0] + self.sensing_range + 1):
-            # check for phromones i y axis
-            for y in range(self.position[1] - self.sensing_range, self.position[1] + self.sensing_range + 1):
-                # check that thje grid square is within bounds
-                if 0 <= x < self.environment.rows and 0 <= y < self.environment.cols:
-                    # if a trail is found
-                    if self.environment.pheromone_grids[self.colour][x][y] > 0:
-                        # move towwards it
-                        self.move_towards((x, y))
-                        return True
+        if self.environment.profiler:
+            self.environment.profiler.count("pheromone_reads")
+        # check the squares within sensing range for pheromones
+        trail = self.environment.find_trail(self.colour, self.position, self.sensing_range)
+        # if a trail is found
+        if trail:
+            # move towwards it
+            self.move_towards(trail)
+            return True
         return False
 
     def follow_pheromone(self):
@@ -159,21 +246,23 @@ class Ant_agent:
 
         # get surrounding squares of current position
         neighbors = self.environment.get_neighbors(self.position)
-        nest_x, nest_y = self.nest.position
+        offset = self.environment.topology.offset
         trail = None
+        last = self.visited.last()
 
-        
         max_distance = 0
+        if self.environment.profiler:
+            self.environment.profiler.count("pheromone_reads", len(neighbors))
         # check surrounding squares for the pheromone trail
         for neighbor in neighbors:
-            x, y = neighbor
             # stop the ant from returning to the square it was just one
             # mainly used when it reaches the end of a trail and finds no food to stop the ants oscilating
-            if neighbor == self.visited_positions[-1] if self.visited_positions else None:
+            if neighbor == last:
                 continue  # Avoid oscillating back to the last visited position
-            if self.environment.pheromone_grids[self.colour][x][y] > 0:
-                # calculate distance from the nest using pythagoras
-                distance_from_nest = (x - nest_x)**2 + (y - nest_y)**2
+            if self.environment.pheromones.has_trail(self.colour, neighbor):
+                # calculate distance from the nest using pythagoras, the short way round if the world wraps
+                dx, dy = offset(self.nest.position, neighbor)
+                distance_from_nest = dx**2 + dy**2
                 # if a trail is found that is further away than the nest assign it
                 if distance_from_nest > max_distance:
                     max_distance = distance_from_nest
@@ -181,11 +270,8 @@ class Ant_agent:
 
         # if there was a trail found
         if trail:
-            # add current position to visited positions
-            self.visited_positions.append(self.position)
-            # limit the ants memory to 50 last locatioins
-            if len(self.visited_positions) > 50:
-                self.visited_positions.pop(0)
+            # add current position to visited positions, the oldest one is forgotten once the memory is full
+            self.visited.add(self.position)
 
             # move towards the trail
             self.move_towards(trail)
@@ -197,10 +283,43 @@ class Ant_agent:
         else:
             # ff no trail is found or the trail ends without food stop following
             self.following_pheromone = False
+            self.environment.events.emit(TRAIL_ABANDONED, self.environment.tick, self.position[0], self.position[1],
+                                         self.environment.nests.index(self.nest))
             # and ignore the trails for 5 seconds
             # this gives time for the trail to decay so the ant isnt caught in a loop
             # stops them going: follow trail > explore > detect trail > follow trail > explore on and on
-            self.ignore_pheromone_until = asyncio.get_event_loop().time() + 5 
+            self.ignore_pheromone_until = self.environment.tick + IGNORE_PHEROMONE_TICKS
+
+    def return_home(self):
+        """
+        takes one step along the shortest way back to the nest, found in the nests homing field
+        so ants find their way round obstacles, if there is no way home it heads straight for the nest instead
+        """
+
+        step = self.nest.homing.step_from(self.position)
+        if step is None:
+            self.move_towards(self.nest.position)
+            return
+
+        # face the nest like move_towards does, then take the step
+        dx, dy = self.environment.topology.offset(self.position, self.nest.position)
+        self.face(dx, dy)
+        self.position = step
+
+    def face(self, dx, dy):
+        """
+        turns the ant to face the way of an offset, to the closest of the 8 directions it can step in
+        the angle comes from STEP_ANGLES so no trigonometry is done, an offset of nothing leaves it facing the same way
+
+        Args:
+            dx (int): row difference
+            dy (int): column difference
+        """
+
+        step_x = 1 if dx > 0 else -1 if dx < 0 else 0
+        step_y = 1 if dy > 0 else -1 if dy < 0 else 0
+        if step_x or step_y:
+            self.direction = STEP_ANGLES[step_x * 3 + step_y + 4]
 
     def move_towards(self, target):
         """
@@ -210,50 +329,61 @@ class Ant_agent:
             target (tuple): coordinate of the sqaure that is being moved to
         """
 
-        # calculate the new direction of the ant
-        dx = target[0] - self.position[0]
-        dy = target[1] - self.position[1]      
-        if dx != 0 or dy != 0:
-            self.direction = math.degrees(math.atan2(dy, dx)) 
+        # calculate the new direction of the ant, the short way round if the world wraps
+        topology = self.environment.topology
+        dx, dy = topology.offset(self.position, target)
+        self.face(dx, dy)
 
         # iteratively move towards the target location
-        # move towards the correct x axis
-        new_x = self.position[0] + (1 if dx > 0 else -1 if dx < 0 else 0)
-        # move towards the correct y axis
-        new_y = self.position[1] + (1 if dy > 0 else -1 if dy < 0 else 0)
-        # check if the square is within bounds
-        if 0 <= new_x < self.environment.rows and 0 <= new_y < self.environment.cols:
+        # step one square along the x and y axis towards it, the topology says if the square can be walked on
+        new_position = topology.step(self.position, (1 if dx > 0 else -1 if dx < 0 else 0), (1 if dy > 0 else -1 if dy < 0 else 0))
+        if new_position:
             # set position to the new position
-            self.position = (new_x, new_y)
+            self.position = new_position
+            return
+
+        # the straight step is blocked so go round, to the open neighbour that gets closest to the target
+        # ties go to the first in neighbour order, the same one the swarm picks
+        closest = max(abs(dx), abs(dy))
+        for neighbor in topology.neighbors(self.position):
+            ndx, ndy = topology.offset(neighbor, target)
+            if max(abs(ndx), abs(ndy)) < closest:
+                closest = max(abs(ndx), abs(ndy))
+                new_position = neighbor
+        if new_position is None:
+            # nothing gets any closer, like behind a wall, so wander like an exploring ant instead of standing still
+            self.move()
+            return
+        self.face(*topology.offset(self.position, new_position))
+        self.position = new_position
 
     def move(self):
         """
         function that allows the ant to move to a neighbouring square
-        this function tries to move to a square that the ant has not visited in hte last 50 cycles
+        this function tries to move to a square that the ant has not visited in hte last MEMORY_LENGTH cycles
         if not then it just picks a random one
         """
 
         # get the neighbouring squares and check if there is an unvisited one
         neighbors = self.environment.get_neighbors(self.position)
-        unvisited_neighbors = [n for n in neighbors if n not in self.visited_positions]
+        # an ant walled in by blocked squares stays where it is
+        if not neighbors:
+            return
+        unvisited_neighbors = self.visited.unvisited(neighbors)
 
         # if there are unvisited squares choose a random one
         if unvisited_neighbors:
-            target = random.choice(unvisited_neighbors) 
+            target = self.environment.rng.choice(unvisited_neighbors) 
         # if there isnt choose a ranxdom neighbouring square
         else:
-            target = random.choice(neighbors)
+            target = self.environment.rng.choice(neighbors)
 
         # calculate direction before moving
-        dx = target[0] - self.position[0]
-        dy = target[1] - self.position[1]
-        if dx != 0 or dy != 0:
-            self.direction = math.degrees(math.atan2(dy, dx))
+        dx, dy = self.environment.topology.offset(self.position, target)
+        self.face(dx, dy)
 
         # add current position to visited locations
-        self.visited_positions.append(self.position)
-        if len(self.visited_positions) > 50:
-            self.visited_positions.pop(0)
+        self.visited.add(self.position)
 
         # move to the selected target
         self.position = target
\ No newline at end of file
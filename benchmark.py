@@ -0,0 +1,351 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import numpy as np
+from replay import ant_arrays
+from simulation import Simulation, REVERSE_COLOURS
+
+# world sizes and colony sizes compared by default
+# the object engine is skipped above AGENT_LIMIT ants as it gets too slow to be worth waiting for
+DEFAULT_SCALES = [(33, 61, 5), (100, 100, 250), (300, 300, 2500), (1000, 1000, 25000)]
+AGENT_LIMIT = 20000
+
+# scenarios timed by the suite as (rows, cols, ants per nest, food items)
+SUITE_SCALES = {
+    "small": (33, 61, 5, 20),
+    "medium": (100, 100, 50, 100),
+    "large": (300, 300, 250, 500),
+}
+# ticks run before timing so there are trails to follow and ants spread out over the world
+WARMUP_TICKS = 200
+# a path is flagged as a regression when it is this much slower than the baseline
+REGRESSION_THRESHOLD = 0.25
+# world sizes the memory breakdown is taken at, with the same colony in each so the marked area stays about the same
+MEMORY_SCALES = [(500, 500), (1000, 1000), (2000, 2000)]
+MEMORY_ANTS_PER_NEST = 250
+# the paths the suite times, see hot_paths
+SUITE_PATHS = ("decay_pheromones", "sense_food", "start_following_pheromone", "follow_pheromone", "move", "tick", "render")
+
+
+def run_engine(engine, rows, cols, ants_per_nest, ticks, seed):
+    """
+    runs one headless simulation and times it
+
+    Args:
+        engine (str): "agents" or "swarm"
+        rows (int): the number of rows in the simulation
+        cols (int): the number of columns in the simulation
+        ants_per_nest (int): number of ants created for each nest
+        ticks (int): number of ticks to run
+        seed (int): seed used to build the world so both engines get the same one
+
+    Returns:
+        dict: ticks per second and the food each nest collected
+    """
+
+    # nobody wins so every run lasts the same number of ticks
+    simulation = Simulation.create(rows, cols, ants_per_nest, num_food_items=max(20, rows * cols // 500),
+                                   win_food=float("inf"), engine=engine, seed=seed)
+
+    start = time.perf_counter()
+    simulation.step(ticks)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ticks_per_second": ticks / elapsed,
+        "food": {REVERSE_COLOURS.get(nest.colour, "unknown"): nest.total_food for nest in simulation.nests},
+    }
+
+
+def compare_engines(scales, ticks, seeds):
+    """
+    runs both engines over a range of world sizes and prints their speed and how much food they collected
+    the food totals are averaged over the seeds so the aggregate behaviour of the engines can be compared
+
+    Args:
+        scales (list): (rows, cols, ants per nest) for each scale
+        ticks (int): number of ticks to run at each scale
+        seeds (list): seeds to run each scale with
+    """
+
+    print(f"{'world':>11} {'ants':>7} {'engine':>7} {'ticks/s':>10} {'food/nest':>10}")
+    for rows, cols, ants_per_nest in scales:
+        for engine in ("agents", "swarm"):
+            if engine == "agents" and ants_per_nest * 4 > AGENT_LIMIT:
+                continue
+            results = [run_engine(engine, rows, cols, ants_per_nest, ticks, seed) for seed in seeds]
+            speed = np.mean([result["ticks_per_second"] for result in results])
+            food = np.mean([np.mean(list(result["food"].values())) for result in results])
+            print(f"{rows:>5}x{cols:<5} {ants_per_nest * 4:>7} {engine:>7} {speed:>10.1f} {food:>10.1f}")
+
+
+def array_bytes(value):
+    """
+    adds up the numpy arrays held by an object, as its attributes or in dicts and lists of them
+
+    Args:
+        value: the object
+
+    Returns:
+        int: bytes held in numpy arrays
+    """
+
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(array_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(array_bytes(item) for item in value)
+    return 0
+
+
+def world_memory(rows, cols, pheromone_mode, ticks, seed):
+    """
+    runs a swarm simulation and measures the world arrays it holds
+    the pheromones are only part of it, the neighbour table, the homing field of each nest
+    and the scent field of each sensing range are dense and grow with the size of the world whatever the store
+
+    Args:
+        rows (int): the number of rows in the simulation
+        cols (int): the number of columns in the simulation
+        pheromone_mode (str): how pheromones are stored
+        ticks (int): number of ticks to run before measuring
+        seed (int): seed for the simulation
+
+    Returns:
+        dict: bytes held by each structure
+    """
+
+    simulation = Simulation.create(rows, cols, MEMORY_ANTS_PER_NEST, win_food=float("inf"), engine="swarm",
+                                   pheromone_mode=pheromone_mode, seed=seed)
+    simulation.step(ticks)
+    environment = simulation.environment
+    return {
+        "pheromones": array_bytes(vars(environment.pheromones)),
+        "neighbours": environment.topology.table.nbytes + environment.topology.blocked.nbytes,
+        "homing": sum(nest.homing.distance.nbytes + nest.homing.next_cell.nbytes for nest in simulation.nests),
+        "scent": sum(field.field.nbytes for field in environment.scent_fields.values()),
+    }
+
+
+def compare_memory(scales, ticks, seed):
+    """
+    prints the memory of the world arrays for the eager and tiled pheromone stores over a range of world sizes
+    the tiled store keeps its pheromones about the same size as the world grows, the rest still grows with it
+
+    Args:
+        scales (list): (rows, cols) for each scale
+        ticks (int): number of ticks to run before measuring
+        seed (int): seed for the simulation
+    """
+
+    columns = ("pheromones", "neighbours", "homing", "scent")
+    print(f"{'world':>11} {'store':>7} " + " ".join(f"{column:>10}" for column in columns) + f" {'total':>10}")
+    for rows, cols in scales:
+        for mode in ("eager", "tiled"):
+            memory = world_memory(rows, cols, mode, ticks, seed)
+            sizes = " ".join(f"{memory[column] / 2 ** 20:>7.1f} MB" for column in columns)
+            print(f"{rows:>5}x{cols:<5} {mode:>7} {sizes} {sum(memory.values()) / 2 ** 20:>7.1f} MB")
+
+
+def scenario(rows, cols, ants_per_nest, num_food_items, seed):
+    """
+    builds a seeded simulation and runs it for WARMUP_TICKS, the same world every time for the same arguments
+
+    Args:
+        rows (int): the number of rows in the simulation
+        cols (int): the number of columns in the simulation
+        ants_per_nest (int): number of ants created for each nest
+        num_food_items (int): number of food items placed at the start
+        seed (int): seed for the simulation
+
+    Returns:
+        Simulation: the warmed up simulation
+    """
+
+    simulation = Simulation.create(rows, cols, ants_per_nest, num_food_items, win_food=float("inf"), seed=seed)
+    simulation.step(WARMUP_TICKS)
+    return simulation
+
+
+def renderer(simulation):
+    """
+    sets up pygame with no window and returns a function that draws the simulation to an offscreen surface
+    the surface is the size of the window and the camera starts at the top left at the windows zoom,
+    so the time is what a frame costs in the window however big the world is
+
+    Args:
+        simulation (Simulation): the simulation to draw
+
+    Returns:
+        function: draws one frame
+    """
+
+    environment = simulation.environment
+    # imported here so the rest of the suite runs without a display
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import main as gui
+    from camera import Camera
+
+    pygame.init()
+    if gui.sprites is None:
+        pygame.display.set_mode((1, 1))
+        gui.load_images()
+    surface = pygame.Surface((gui.WIDTH, gui.HEIGHT))
+    camera = Camera(environment.rows, environment.cols, gui.WIDTH, gui.HEIGHT, gui.GRID_SIZE)
+    return lambda: gui.render(surface, environment, ant_arrays(simulation), simulation.nests, False, False, camera=camera)
+
+
+def hot_paths(simulation):
+    """
+    the code paths timed by the suite, each as a function that runs it once and the number of calls that makes
+
+    Args:
+        simulation (Simulation): the simulation to time them on
+
+    Returns:
+        dict: path name -> (function, calls)
+    """
+
+    environment = simulation.environment
+    ants = simulation.ants
+
+    def each_ant(method):
+        return lambda: [method(ant) for ant in ants]
+
+    render = renderer(simulation)
+    return {
+        "decay_pheromones": (environment.decay_pheromones, 1),
+        "sense_food": (each_ant(lambda ant: ant.sense_food()), len(ants)),
+        "start_following_pheromone": (each_ant(lambda ant: ant.start_following_pheromone()), len(ants)),
+        "follow_pheromone": (each_ant(lambda ant: ant.follow_pheromone()), len(ants)),
+        "move": (each_ant(lambda ant: ant.move()), len(ants)),
+        "tick": (simulation.step, 1),
+        "render": (render, 1),
+    }
+
+
+def run_suite(scales, rounds, seed):
+    """
+    times every hot path at every scale
+    each path gets its own fresh copy of the scenario so the paths that change the world dont affect each other
+    the median of the rounds is reported as it is the least upset by other things running on the machine
+
+    Args:
+        scales (list): names of the SUITE_SCALES to run
+        rounds (int): how many times each path is timed
+        seed (int): seed for the scenarios
+
+    Returns:
+        dict: details of the machine and the timings for each scale and path
+    """
+
+    results = {}
+    for name in scales:
+        rows, cols, ants_per_nest, num_food_items = SUITE_SCALES[name]
+        results[name] = {}
+        for path in SUITE_PATHS:
+            function, calls = hot_paths(scenario(rows, cols, ants_per_nest, num_food_items, seed))[path]
+            times = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                function()
+                times.append(time.perf_counter() - start)
+            median = statistics.median(times)
+            results[name][path] = {
+                "calls": calls,
+                "seconds": median,
+                "min_seconds": min(times),
+                "per_call": median / max(calls, 1),
+            }
+            print(f"{name:>7} {path:>26} {median * 1000:>10.3f} ms {median / max(calls, 1) * 1e6:>10.2f} us/call")
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "rounds": rounds,
+            "seed": seed,
+            "warmup_ticks": WARMUP_TICKS,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    compares suite results with a stored baseline and prints the change for each path
+
+    Args:
+        current (dict): results from run_suite
+        baseline (dict): earlier results from run_suite
+        threshold (float, optional): how much slower a path can get before it is flagged. Defaults to REGRESSION_THRESHOLD.
+
+    Returns:
+        list: (scale, path, ratio) for every path that got slower than the threshold allows
+    """
+
+    regressions = []
+    print(f"{'scale':>7} {'path':>26} {'baseline':>12} {'now':>12} {'change':>8}")
+    for scale, paths in current["results"].items():
+        for path, result in paths.items():
+            base = baseline["results"].get(scale, {}).get(path)
+            if base is None:
+                continue
+            ratio = result["seconds"] / base["seconds"]
+            flag = ""
+            if ratio > 1 + threshold:
+                regressions.append((scale, path, ratio))
+                flag = "  REGRESSION"
+            print(f"{scale:>7} {path:>26} {base['seconds'] * 1000:>9.3f} ms {result['seconds'] * 1000:>9.3f} ms {ratio - 1:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    """
+    compares the Ant_agent object engine with the vectorised AntSwarm,
+    or with --suite times each hot path and checks them against a baseline,
+    or with --memory breaks down the memory of the world arrays
+    """
+
+    parser = argparse.ArgumentParser(description="compare the object and swarm ant engines, or time the hot paths")
+    parser.add_argument("--ticks", type=int, default=200, help="ticks to run at each scale")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--suite", action="store_true", help="time each hot path instead of comparing engines")
+    parser.add_argument("--memory", action="store_true", help="measure the world arrays instead of comparing engines")
+    parser.add_argument("--scales", nargs="+", choices=list(SUITE_SCALES), default=list(SUITE_SCALES))
+    parser.add_argument("--rounds", type=int, default=20, help="times each path is timed in the suite")
+    parser.add_argument("--out", default="benchmark_results.json", help="file to write the suite results to")
+    parser.add_argument("--baseline", default=None, help="earlier suite results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    if args.memory:
+        compare_memory(MEMORY_SCALES, args.ticks, args.seeds[0])
+        return
+
+    if not args.suite:
+        compare_engines(DEFAULT_SCALES, args.ticks, args.seeds)
+        return
+
+    results = run_suite(args.scales, args.rounds, args.seeds[0])
+    with open(args.out, "w") as file:
+        json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# sizes of a grid square in pixels the camera can zoom between
+# whole pixels so squares, pheromone tiles and sprites always line up exactly
+ZOOM_LEVELS = (1, 2, 3, 4, 6, 8, 12, 16, 20, 24, 30, 40, 60)
+# smallest square size ants and food are drawn as sprites at, below it they are drawn as density pixels
+DETAIL_SIZE = 8
+# pixels the view moves for each press of a pan key
+PAN_STEP = 120
+# squares past the edge of the view that things are still drawn from, as sprites can be bigger than a square
+SPRITE_MARGIN = 3
+
+
+class Camera:
+    """
+    class describing which part of the world is shown in the window and how big it is drawn
+    the view is kept as the pixel position of the top left of the window in the world at the current zoom,
+    when the world is smaller than the window it is centred instead
+    """
+
+    def __init__(self, rows, cols, width, height, cell_size):
+        """
+        initialises the camera looking at the top left of the world
+
+        Args:
+            rows (int): the number of rows in the world
+            cols (int): the number of columns in the world
+            width (int): width of the window in pixels
+            height (int): height of the window in pixels
+            cell_size (int): size of a grid square in pixels to start at, the closest of ZOOM_LEVELS is used
+        """
+
+        self.rows = rows
+        self.cols = cols
+        self.width = width
+        self.height = height
+        self.level = min(range(len(ZOOM_LEVELS)), key=lambda level: abs(ZOOM_LEVELS[level] - cell_size))
+        self.left = 0
+        self.top = 0
+        self.clamp()
+
+    @property
+    def cell_size(self):
+        """
+        size of a grid square in pixels at the current zoom
+        """
+        return ZOOM_LEVELS[self.level]
+
+    @property
+    def detailed(self):
+        """
+        whether the camera is zoomed in enough to draw sprites
+        """
+        return self.cell_size >= DETAIL_SIZE
+
+    def clamp(self):
+        """
+        keeps the view inside the world, or centres the world if it is smaller than the window
+        """
+
+        size = self.cell_size
+        world_width, world_height = self.cols * size, self.rows * size
+        if world_width <= self.width:
+            self.left = -((self.width - world_width) // 2)
+        else:
+            self.left = min(max(self.left, 0), world_width - self.width)
+        if world_height <= self.height:
+            self.top = -((self.height - world_height) // 2)
+        else:
+            self.top = min(max(self.top, 0), world_height - self.height)
+
+    def view(self):
+        """
+        gets the squares in the window
+
+        Returns:
+            tuple: first row, row after the last, first column, column after the last and the square size in pixels
+        """
+
+        size = self.cell_size
+        x0, y0 = max(self.top // size, 0), max(self.left // size, 0)
+        x1 = min(-(-(self.top + self.height) // size), self.rows)
+        y1 = min(-(-(self.left + self.width) // size), self.cols)
+        return x0, x1, y0, y1, size
+
+    def shows(self, position, margin=0):
+        """
+        checks if a square is in the window
+
+        Args:
+            position (tuple): coordinates of the square
+            margin (int, optional): squares past the edge of the window that still count. Defaults to 0.
+
+        Returns:
+            bool: true if the square is in view
+        """
+
+        x0, x1, y0, y1, _ = self.view()
+        return x0 - margin <= position[0] < x1 + margin and y0 - margin <= position[1] < y1 + margin
+
+    def to_screen(self, x, y):
+        """
+        gets where the top left corner of a square is in the window
+
+        Args:
+            x (int): row of the square
+            y (int): column of the square
+
+        Returns:
+            tuple: pixel position in the window
+        """
+
+        size = self.cell_size
+        return y * size - self.left, x * size - self.top
+
+    def to_world(self, pixel):
+        """
+        gets the square under a point in the window
+
+        Args:
+            pixel (tuple): pixel position in the window, like the mouse position
+
+        Returns:
+            tuple: coordinates of the square, which may be outside the world
+        """
+
+        size = self.cell_size
+        return (pixel[1] + self.top) // size, (pixel[0] + self.left) // size
+
+    def pan(self, dx, dy):
+        """
+        moves the view
+
+        Args:
+            dx (int): pixels to move right
+            dy (int): pixels to move down
+        """
+
+        self.left += dx
+        self.top += dy
+        self.clamp()
+
+    def zoom(self, steps, anchor=None):
+        """
+        zooms in or out a number of ZOOM_LEVELS, keeping the point under the anchor where it is
+
+        Args:
+            steps (int): levels to zoom in by, negative to zoom out
+            anchor (tuple, optional): pixel position in the window to zoom round. Defaults to None (the centre).
+        """
+
+        level = min(max(self.level + steps, 0), len(ZOOM_LEVELS) - 1)
+        if level == self.level:
+            return
+        anchor_x, anchor_y = anchor if anchor is not None else (self.width // 2, self.height // 2)
+        old, new = self.cell_size, ZOOM_LEVELS[level]
+        self.level = level
+        self.left = (anchor_x + self.left) * new // old - anchor_x
+        self.top = (anchor_y + self.top) * new // old - anchor_y
+        self.clamp()
+
+    def fit(self):
+        """
+        zooms to the biggest level the whole world fits in the window at, or the smallest level if it never fits
+        """
+
+        fits = [level for level, size in enumerate(ZOOM_LEVELS) if self.cols * size <= self.width and self.rows * size <= self.height]
+        self.level = fits[-1] if fits else 0
+        self.clamp()
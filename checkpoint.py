@@ -0,0 +1,337 @@
+import json
+import os
+import random
+import struct
+import threading
+import numpy as np
+from ant_agent import Ant_agent
+from environment import Environment
+from food import Food, FOOD_TYPES
+from nest import Nest
+from parallel import ParallelSwarm
+from simulation import Simulation
+from swarm import AntSwarm
+from topology import GridTopology
+
+# checkpoint files start with the magic bytes and the length of the json header
+MAGIC = b"ANTSNAP\x01"
+PREFIX = struct.Struct("<8sQ")
+VERSION = 1
+# array sections start on a multiple of this many bytes so they can be memory mapped efficiently
+ALIGN = 64
+# sections that are memory mapped when loading instead of read in, the big world sized grids
+MAPPED_SECTIONS = ("pheromones.grid", "pheromones.marked")
+
+# food types are saved as their index in this list
+FOOD_TYPE_NAMES = list(FOOD_TYPES)
+
+
+def align(offset):
+    """
+    rounds an offset up to the next multiple of ALIGN
+
+    Args:
+        offset (int): offset in bytes
+
+    Returns:
+        int: the aligned offset
+    """
+
+    return -(-offset // ALIGN) * ALIGN
+
+
+def capture(simulation):
+    """
+    takes a copy of the full state of a simulation
+    everything is copied so the simulation can carry on while the copy is written out
+
+    Args:
+        simulation (Simulation): the simulation to copy
+
+    Returns:
+        tuple: a json serialisable header dict and a dict of section name -> numpy array
+    """
+
+    environment = simulation.environment
+    nests = simulation.nests
+    nest_index = {id(nest): index for index, nest in enumerate(nests)}
+
+    pheromone_values, pheromone_arrays = environment.pheromones.get_state()
+    sections = {f"pheromones.{name}": np.array(array) for name, array in pheromone_arrays.items()}
+
+    # food in the order it was added, which decides which item ants find first
+    foods = list(environment.food_items)
+    sections["food.x"] = np.array([food.position[0] for food in foods], dtype=np.int64)
+    sections["food.y"] = np.array([food.position[1] for food in foods], dtype=np.int64)
+    sections["food.hp"] = np.array([food.hp for food in foods], dtype=np.int64)
+    sections["food.type"] = np.array([FOOD_TYPE_NAMES.index(food.food_type) for food in foods], dtype=np.int8)
+    sections["topology.blocked"] = environment.topology.blocked.copy()
+
+    header = {
+        "version": VERSION,
+        "rows": environment.rows,
+        "cols": environment.cols,
+        "tick": environment.tick,
+        "next_food_tick": environment.next_food_tick,
+        "food_spawn_interval": list(environment.food_spawn_interval),
+        "wrap": environment.topology.wrap,
+        "rng": environment.rng.getstate(),
+        "pheromones": pheromone_values,
+        "nests": [
+            {"position": nest.position, "colour": nest.colour, "total_food": nest.total_food}
+            for nest in nests
+        ],
+        "win_food": simulation.win_food,
+        "winner": nest_index[id(simulation.winner)] if simulation.winner else None,
+        "engine": "agents",
+    }
+
+    if simulation.swarm is not None:
+        header["engine"] = simulation.swarm.engine
+        swarm_values, swarm_arrays = simulation.swarm.get_state()
+        header["swarm"] = swarm_values
+        sections.update({f"swarm.{name}": np.array(array) for name, array in swarm_arrays.items()})
+        return header, sections
+
+    ants = simulation.ants
+    sections["ants.x"] = np.array([ant.position[0] for ant in ants], dtype=np.int64)
+    sections["ants.y"] = np.array([ant.position[1] for ant in ants], dtype=np.int64)
+    sections["ants.direction"] = np.array([ant.direction for ant in ants], dtype=np.float64)
+    sections["ants.carrying_food"] = np.array([ant.carrying_food for ant in ants], dtype=bool)
+    sections["ants.following_pheromone"] = np.array([ant.following_pheromone for ant in ants], dtype=bool)
+    sections["ants.sleep_until"] = np.array([ant.sleep_until for ant in ants], dtype=np.int64)
+    # ants that have never ignored a trail have None, saved as -1
+    sections["ants.ignore_pheromone_until"] = np.array(
+        [-1 if ant.ignore_pheromone_until is None else ant.ignore_pheromone_until for ant in ants], dtype=np.int64
+    )
+    sections["ants.goal"] = np.array([ant.goal for ant in ants], dtype=np.int8)
+    sections["ants.nest"] = np.array([nest_index[id(ant.nest)] for ant in ants], dtype=np.int64)
+    sections["ants.sensing_range"] = np.array([ant.sensing_range for ant in ants], dtype=np.int64)
+    sections["ants.memory_length"] = np.array([ant.visited.length for ant in ants], dtype=np.int64)
+    # the visited squares of every ant one after another, with how many belong to each ant
+    sections["ants.visited_count"] = np.array([len(ant.visited) for ant in ants], dtype=np.int64)
+    visited = [position for ant in ants for position in ant.visited]
+    sections["ants.visited"] = np.array(visited, dtype=np.int64).reshape(-1, 2)
+    return header, sections
+
+
+def write(path, header, sections):
+    """
+    writes a captured state to a checkpoint file
+    the file is written next to the target and moved into place so a crash never leaves half a checkpoint
+
+    layout: magic and header length, the json header, then each array section aligned to ALIGN bytes
+    the header lists each sections dtype, shape and offset from the start of the sections
+
+    Args:
+        path (str): where to write the checkpoint
+        header (dict): header from capture
+        sections (dict): arrays from capture
+    """
+
+    table = []
+    offset = 0
+    for name, array in sections.items():
+        offset = align(offset)
+        table.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset += array.nbytes
+
+    header_bytes = json.dumps({**header, "sections": table}).encode()
+    data_start = align(PREFIX.size + len(header_bytes))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(PREFIX.pack(MAGIC, len(header_bytes)))
+        file.write(header_bytes)
+        for entry, array in zip(table, sections.values()):
+            file.seek(data_start + entry["offset"])
+            file.write(np.ascontiguousarray(array).tobytes())
+        file.truncate(data_start + offset)
+    os.replace(temporary, path)
+
+
+def save(simulation, path):
+    """
+    saves a simulation to a checkpoint file straight away
+
+    Args:
+        simulation (Simulation): the simulation to save
+        path (str): where to write the checkpoint
+    """
+
+    write(path, *capture(simulation))
+
+
+def read(path):
+    """
+    reads the header and array sections of a checkpoint file
+    the pheromone grids are memory mapped copy on write, so they are only read from disk as they are used
+
+    Args:
+        path (str): the checkpoint file
+
+    Returns:
+        tuple: the header dict and a dict of section name -> numpy array
+    """
+
+    with open(path, "rb") as file:
+        magic, header_length = PREFIX.unpack(file.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an ant simulation checkpoint")
+        header = json.loads(file.read(header_length))
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported checkpoint version {header['version']}")
+
+    data_start = align(PREFIX.size + header_length)
+    sections = {}
+    for entry in header["sections"]:
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        offset = data_start + entry["offset"]
+        count = int(np.prod(shape))
+        if entry["name"] in MAPPED_SECTIONS and count:
+            sections[entry["name"]] = np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=shape)
+        else:
+            sections[entry["name"]] = np.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return header, sections
+
+
+def load(path):
+    """
+    restores a simulation from a checkpoint file
+    the restored simulation carries on exactly where the saved one was, including its random numbers
+
+    Args:
+        path (str): the checkpoint file
+
+    Returns:
+        Simulation: the restored simulation
+    """
+
+    header, sections = read(path)
+
+    nests = [Nest.at(nest["position"], nest["colour"], nest["total_food"]) for nest in header["nests"]]
+    foods = [
+        Food((x, y), FOOD_TYPE_NAMES[food_type], hp)
+        for x, y, hp, food_type in zip(
+            sections["food.x"].tolist(), sections["food.y"].tolist(),
+            sections["food.hp"].tolist(), sections["food.type"].tolist(),
+        )
+    ]
+
+    rng_version, rng_internal, rng_gauss = header["rng"]
+    environment = Environment(
+        header["rows"], header["cols"], foods, nests, tuple(header["food_spawn_interval"]),
+        header["pheromones"]["mode"], random.Random(),
+        GridTopology(header["rows"], header["cols"], header["wrap"], sections["topology.blocked"]),
+    )
+    # the environment picks a spawn time when it is made, so the clock and generator are put back afterwards
+    environment.rng.setstate((rng_version, tuple(rng_internal), rng_gauss))
+    environment.tick = header["tick"]
+    environment.next_food_tick = header["next_food_tick"]
+    pheromone_arrays = {name.split(".", 1)[1]: array for name, array in sections.items() if name.startswith("pheromones.")}
+    environment.pheromones.set_state(header["pheromones"], pheromone_arrays)
+
+    winner = nests[header["winner"]] if header["winner"] is not None else None
+
+    if header["engine"] in ("swarm", "parallel"):
+        values = header["swarm"]
+        if header["engine"] == "parallel":
+            swarm = ParallelSwarm(environment, nests, 0, values["sensing_range"], values["memory_length"],
+                                  values["seed"], values["workers"])
+        else:
+            swarm = AntSwarm(environment, nests, 0, values["sensing_range"], values["memory_length"])
+        swarm.set_state(values, {name.split(".", 1)[1]: array for name, array in sections.items() if name.startswith("swarm.")})
+        simulation = Simulation(environment, [], nests, header["win_food"], swarm)
+        simulation.winner = winner
+        return simulation
+
+    ants = []
+    visited = [tuple(position) for position in sections["ants.visited"].tolist()]
+    memory_lengths = sections["ants.memory_length"].tolist()
+    start = 0
+    for (x, y, direction, carrying, following, sleep_until, ignore_until, goal, nest, sensing_range, count, memory_length) in zip(
+        *(sections[f"ants.{name}"].tolist() for name in (
+            "x", "y", "direction", "carrying_food", "following_pheromone", "sleep_until",
+            "ignore_pheromone_until", "goal", "nest", "sensing_range", "visited_count",
+        )),
+        memory_lengths,
+    ):
+        ant = Ant_agent((x, y), environment, nests[nest], nests[nest].colour, sensing_range, memory_length)
+        ant.direction = direction
+        ant.carrying_food = carrying
+        ant.following_pheromone = following
+        ant.sleep_until = sleep_until
+        ant.ignore_pheromone_until = None if ignore_until == -1 else ignore_until
+        ant.goal = goal
+        ant.visited_positions = visited[start:start + count]
+        start += count
+        ants.append(ant)
+
+    simulation = Simulation(environment, ants, nests, header["win_food"])
+    simulation.winner = winner
+    return simulation
+
+
+class CheckpointWriter:
+    """
+    tick hook that checkpoints a simulation every so many ticks
+    the state is copied on the simulation thread and written to disk on a background thread
+    if a write is still going when the next checkpoint is due the newest one replaces any waiting one
+    """
+
+    def __init__(self, path, every):
+        """
+        initialises the writer and starts its background thread
+
+        Args:
+            path (str): where to write the checkpoints, each one replaces the last
+            every (int): number of ticks between checkpoints
+        """
+
+        self.path = path
+        self.every = every
+        self.pending = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def __call__(self, simulation):
+        """
+        takes a checkpoint if one is due, add the writer to Simulation.tick_hooks to use it
+
+        Args:
+            simulation (Simulation): the simulation that has just ticked
+        """
+
+        if simulation.tick % self.every:
+            return
+        snapshot = capture(simulation)
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify()
+
+    def run(self):
+        """
+        writes checkpoints as they come in until the writer is closed
+        """
+
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                snapshot, self.pending = self.pending, None
+            write(self.path, *snapshot)
+
+    def close(self):
+        """
+        writes any waiting checkpoint and stops the background thread
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
@@ -1,13 +1,23 @@
-import asyncio
 import random
-from food import Food, generate_random_food, FOOD_TYPES
+import numpy as np
+from events import EventLog, SPAWN, FOOD_EXHAUSTED, FOOD_TYPE_CODES
+from food import generate_random_food
+from homing import HomingField
+from pheromones import PHEROMONE_MODES
+from scent import ScentField
+from spatial import SpatialHash
+from topology import GridTopology
+
+# how many random squares spawn_food tries before giving up on a world that is (nearly) all blocked
+FOOD_SPAWN_ATTEMPTS = 100
 
 class Environment:
     """
     class representing the environment that the simulation uses
     """
 
-    def __init__(self, rows: int, cols: int, food_items: list, nests: list):
+    def __init__(self, rows: int, cols: int, food_items: list, nests: list, food_spawn_interval: tuple = (50, 100), pheromone_mode: str = "eager",
+                 rng: random.Random = None, topology: GridTopology = None):
         """
         initialises the environment
 
@@ -16,16 +26,56 @@ class Environment:
             cols (int): the number of columns in the simulation
             food_items (list): the list of food items to be placed in the environment
             nests (list): the list of ant nests that are to be placed in the environment
+            food_spawn_interval (tuple): the min and max number of ticks between food spawning (5 to 10 seconds by default)
+            pheromone_mode (str): how pheromones are stored, "eager" decays every cell each tick
+                "lazy" works levels out from when cells were marked, "sparse" only stores marked cells
+                and "tiled" only stores the tiles of the world that have been marked recently
+                (see pheromones.PHEROMONE_MODES), the neighbour table, homing and scent fields are dense whatever the mode
+            rng (random.Random): random number generator for everything random in the environment and its ants
+                so seeded runs can be repeated, uses the random module if not given
+            topology (GridTopology): how the squares connect, whether the edges wrap and which squares are blocked
+                a bounded world with nothing blocked if not given
         """
 
         # set values and lists
+        self.rng = rng if rng is not None else random
         self.rows = rows
         self.cols = cols
-        self.food_items = food_items
+        # precomputed neighbours of every square, used for all moving and sensing
+        self.topology = topology if topology is not None else GridTopology(rows, cols)
+        # food is kept in a dict used as an ordered set, so items keep their order but can be removed in O(1)
+        self.food_items = {}
         self.nests = nests
-        # initialises a pheromone grid for each colour of nest contained in a dict using the colour of the nest as a key
-        # pheromone grids is the same size as the sim grid
-        self.pheromone_grids = {nest.colour: [[0 for _ in range(cols)] for _ in range(rows)] for nest in nests}
+
+        # spatial indexes so things can be looked up by where they are without scanning every item
+        # ants add themselves to the ant index when they are created and keep it up to date as they move
+        self.food_index = SpatialHash()
+        self.ant_index = SpatialHash()
+        self.nest_index = SpatialHash()
+        # sensing range -> ScentField of the food an ant on each square would sense, made the first time a range is sensed with
+        self.scent_fields = {}
+        for food in food_items:
+            self.add_food(food)
+        for nest in nests:
+            self.nest_index.insert(nest, nest.position)
+            # the way home from every square is worked out once per nest and shared by the whole colony
+            nest.homing = HomingField(self.topology, nest.position)
+        # initialises a pheromone layer for each colour of nest, stacked into one numpy backed field
+        # each layer is the same size as the sim grid
+        self.pheromones = PHEROMONE_MODES[pheromone_mode](rows, cols, [nest.colour for nest in nests])
+
+        # the simulation clock, counted in ticks of 0.1 seconds of simulated time
+        # everything time based in the sim uses this rather than the wall clock
+        self.tick = 0
+        # the min and max ticks between food spawning
+        # these can be changed depending of screen size and number of ants
+        self.food_spawn_interval = food_spawn_interval
+        # pick the tick the first new item of food will spawn on
+        self.schedule_food()
+        # TickProfiler that times and counts what happens each tick, None when the sim isnt being profiled
+        self.profiler = None
+        # structured log of what happens in the sim, attach an events.EventWriter to save it to a file
+        self.events = EventLog()
 
     def drop_pheromone(self, position, colour):
         """
@@ -37,10 +87,21 @@ class Environment:
             colour (tuple): colour code of the pheromone
         """
 
-        # set pos
-        x, y = position
-        # set the pheromone level to 10 in the correct pos and colour
-        self.pheromone_grids[colour][x][y] = 10
+        # set the pheromone level to full strength in the correct pos and colour
+        self.pheromones.drop(colour, position)
+
+    def add_food(self, food):
+        """
+        function that places a food item into the environment
+
+        args:
+            food (Food): the food item to add
+        """
+
+        self.food_items[food] = None
+        order = self.food_index.insert(food, food.position)
+        for field in self.scent_fields.values():
+            field.add(food, order)
 
     def remove_food(self, position):
         """
@@ -50,76 +111,222 @@ class Environment:
             position (tuple): coordinates of the food item
         """
 
-        # find food item with correct position
-        for food in self.food_items:
-            if food.position == position:
-                # if the item has no hp left remove it from the list of food items and environment
-                if food.reduce_hp():
-                    self.food_items.remove(food)
-                break
+        # find the first food item with correct position
+        found = self.food_index.at(position)
+        if found:
+            food = found[0]
+            # if the item has no hp left remove it from the food items and environment
+            if food.reduce_hp():
+                del self.food_items[food]
+                order = self.food_index.remove(food, position)
+                for field in self.scent_fields.values():
+                    field.remove(food, order)
+                self.events.emit(FOOD_EXHAUSTED, self.tick, position[0], position[1], FOOD_TYPE_CODES[food.food_type])
+
+    def scent(self, radius):
+        """
+        gets the scent field for a sensing range, building it from the food in the environment the first time
+        from then on it is kept up to date as food is added and removed
+
+        args:
+            radius (int): how many squares away food can be sensed
+
+        returns:
+            ScentField: the field for that range
+        """
+
+        field = self.scent_fields.get(radius)
+        if field is None:
+            field = ScentField(self.topology, self.food_index, radius)
+            self.scent_fields[radius] = field
+        return field
+
+    def food_within(self, position, radius):
+        """
+        function that finds food within range of a position
+        if there are several items in range the one that has been in the environment longest is returned
+        this is one lookup in the scent field for the range, so it costs the same however big the range is
+
+        args:
+            position (tuple): coordinates at the centre of the area to search
+            radius (int): how many squares to search in each direction
+
+        returns:
+            Food: the food item found or None if there is none in range
+        """
+
+        if self.profiler:
+            self.profiler.count("food_lookups")
+        return self.scent(radius).food_at(position)
+
+    def food_in(self, x0, x1, y0, y1):
+        """
+        gets the food in a rectangle of squares from the food index, for drawing the part of the world in view
+
+        args:
+            x0 (int): first row
+            x1 (int): row after the last one
+            y0 (int): first column
+            y1 (int): column after the last one
+
+        returns:
+            list: the food items in the rectangle, in the order they were added
+        """
+
+        return self.food_index.in_area(x0, x1, y0, y1)
+
+    def find_trail(self, colour, position, radius):
+        """
+        finds the first square holding a colours pheromone within range of a position
+        squares are checked row by row, wrapping round the edges on a torus
+
+        args:
+            colour (tuple): colour code of the pheromone
+            position (tuple): coordinates at the centre of the area to search
+            radius (int): how many squares to search in each direction
+
+        returns:
+            tuple: coordinates of the first pheromone found or None if there isnt one
+        """
+
+        if not self.topology.wrap:
+            return self.pheromones.find_trail(colour, position, radius)
+
+        xs, ys = self.topology.window(position, radius)
+        hits = np.flatnonzero(self.pheromones.has_trail_many(self.pheromones.layers[colour], xs, ys))
+        return (int(xs[hits[0]]), int(ys[hits[0]])) if hits.size else None
+
+    def food_at(self, position):
+        """
+        function that gets the first food item in a grid square
+
+        args:
+            position (tuple): coordinates of the grid square
+
+        returns:
+            Food: the food item or None if there isnt one
+        """
+
+        found = self.food_index.at(position)
+        return found[0] if found else None
+
+    def ant_at(self, position):
+        """
+        function that gets the first ant in a grid square
+
+        args:
+            position (tuple): coordinates of the grid square
+
+        returns:
+            Ant_agent: the ant or None if there isnt one
+        """
+
+        found = self.ant_index.at(position)
+        return found[0] if found else None
+
+    def nest_at(self, position):
+        """
+        function that gets the nest in a grid square
+
+        args:
+            position (tuple): coordinates of the grid square
+
+        returns:
+            Nest: the nest or None if there isnt one
+        """
+
+        found = self.nest_index.at(position)
+        return found[0] if found else None
 
     def get_neighbors(self, position):
         """
         get the surrounding grid positions from a position
+        the neighbours come from the topologys precomputed table so nothing is worked out or allocated per call
 
         args:
             position (tuple): the coordinates of the position that you want to get the surrounding squares
 
         returns:
-            list: the list of neighbouring locations
-        """
-
-        # get neighbouring squares based on position
-        x, y = position
-        neighbors = [
-            ((x - 1), y),    
-            ((x + 1), y),    
-            (x, (y - 1)),    
-            (x, (y + 1)),    
-            ((x - 1), y - 1),
-            ((x - 1), y + 1),
-            ((x + 1), y - 1),
-            ((x + 1), y + 1),
-        ]
-        # only return positions that are within the bounds of the simulation
-        return [(nx, ny) for nx, ny in neighbors if 0 <= nx < self.rows and 0 <= ny < self.cols]
-
-    async def decay_pheromones(self):
+            tuple: the neighbouring locations that can be walked on, shared so it must not be changed
+        """
+
+        return self.topology.neighbors(position)
+
+    def set_blocked(self, position, blocked=True):
+        """
+        blocks or opens a square while the sim is running
+        the neighbour table and each nests homing field are updated in place rather than rebuilt
+
+        args:
+            position (tuple): coordinates of the square
+            blocked (bool): true to block the square, false to open it
+        """
+
+        if self.topology.blocked[position] == blocked:
+            return
+        self.topology.set_blocked(position, blocked)
+        for nest in self.nests:
+            nest.homing.update(position)
+
+    def update(self):
+        """
+        advances the environment clock by one tick
+        decays the pheromones and spawns food when it is due
+        """
+
+        self.tick += 1
+        profiler = self.profiler
+        if profiler:
+            with profiler.phase("decay"):
+                self.decay_pheromones()
+            with profiler.phase("food_spawn"):
+                if self.tick >= self.next_food_tick:
+                    self.spawn_food()
+                    self.schedule_food()
+            return
+
+        # reduce pheromone every tick (0.1 seconds)
+        # this means pheromone lasts 10 seconds total (10 - 0.1, every 0.1 seconds)
+        self.decay_pheromones()
+        # drop a new item of food if enough ticks have passed since the last one
+        if self.tick >= self.next_food_tick:
+            self.spawn_food()
+            self.schedule_food()
+
+    def decay_pheromones(self):
         """
         function that simulates the decay of pheromones in the environment
-        reduces the intensity of the pheromone over time
+        reduces the intensity of every pheromone by one decay step
         """
 
-        while True:
-            # reduce all pheromones on the map by an amount
-            for colour, grid in self.pheromone_grids.items():
-                for x in range(self.rows):
-                    for y in range(self.cols):
-                        if grid[x][y] > 0:
-                            grid[x][y] -= 0.1
-            # reduce pheromone every 0.1 seconds 
-            # this means pheromone lasts 10 seconds total (10 - 0.1, every 0.1 seconds)
-            await asyncio.sleep(0.1)
+        # reduce all pheromones on the map by an amount in one array operation
+        self.pheromones.decay()
 
-    async def spawn_food(self):
+    def schedule_food(self):
         """
-        spawns a food item on the environment at set intervals
-        simulates food dropping on the ground for the ants to pick up
+        picks the tick that the next item of food will spawn on
+        a random number of ticks between the min and max spawn interval from now
         """
 
-        # set the max an min intervals for food spawing
-        # these can be changed depending of screen size and number of ants
-        min_interval = 5
-        max_interval = 10
+        min_interval, max_interval = self.food_spawn_interval
+        self.next_food_tick = self.tick + self.rng.randint(min_interval, max_interval)
 
-        while True:
-            # sleep for a random amount of time between the intervals set
-            await asyncio.sleep(random.randint(min_interval, max_interval)) 
+    def spawn_food(self):
+        """
+        spawns a food item on the environment
+        simulates food dropping on the ground for the ants to pick up
+        nothing is spawned if no open square turns up in FOOD_SPAWN_ATTEMPTS tries
+        """
 
-            # generate a random food item
-            food_item = generate_random_food(self.rows, self.cols, 1)
-            new_food = food_item[0] 
+        # generate a random food item, trying again if it lands on a blocked square
+        for _ in range(FOOD_SPAWN_ATTEMPTS):
+            new_food = generate_random_food(self.rows, self.cols, 1, self.rng)[0]
+            if self.topology.is_open(new_food.position):
+                break
+        else:
+            return
 
-            # add the food item to the environment
-            self.food_items.append(new_food)
-            print(f"Spawned {new_food.food_type} at ({new_food.position[0]}, {new_food.position[1]}) with HP: {new_food.hp}")
+        # add the food item to the environment
+        self.add_food(new_food)
+        self.events.emit(SPAWN, self.tick, new_food.position[0], new_food.position[1],
+                         FOOD_TYPE_CODES[new_food.food_type], new_food.hp)
@@ -0,0 +1,259 @@
+import json
+import struct
+import threading
+from collections import deque
+from food import FOOD_TYPES
+
+# kinds of event, used as small ints so logging one is just appending a tuple
+PICKUP = 0
+DEPOSIT = 1
+SPAWN = 2
+FOOD_EXHAUSTED = 3
+TRAIL_ABANDONED = 4
+EVENT_NAMES = ("pickup", "deposit", "spawn", "food_exhausted", "trail_abandoned")
+# every event has a tick and a position, then up to two ints whose meaning depends on the kind
+EVENT_VALUES = (
+    ("colony", "food_type"),
+    ("colony", "nest_total"),
+    ("food_type", "hp"),
+    ("food_type",),
+    ("colony",),
+)
+
+# levels, an event is only kept if its level is at least the logs level
+DEBUG = 10
+INFO = 20
+OFF = 100
+LEVELS = {"debug": DEBUG, "info": INFO, "off": OFF}
+# trails are given up on all the time so they are only logged when asked for
+EVENT_LEVELS = (INFO, INFO, INFO, INFO, DEBUG)
+
+# food types are logged as their index in FOOD_TYPES and written out as names in json
+FOOD_TYPE_NAMES = list(FOOD_TYPES)
+FOOD_TYPE_CODES = {name: code for code, name in enumerate(FOOD_TYPE_NAMES)}
+
+# binary event files are the magic then one fixed size record per event
+MAGIC = b"ANTEVNT\x01"
+RECORD = struct.Struct("<Bqiiii")
+
+
+class EventLog:
+    """
+    class that collects what happens in the simulation as structured events
+    events go into an in memory ring buffer, so logging one from the hot path only appends a tuple,
+    and an EventWriter drains the buffer to a file in batches on its own thread
+    if nothing drains it the buffer keeps the most recent events and counts the ones it pushes out
+
+    every environment has one, each event kind can be turned off by level or thinned out by sampling
+    sampling keeps every nth event of a kind by counting rather than with random numbers so it never changes a seeded run
+    """
+
+    def __init__(self, capacity=65536, level=INFO, sample=None):
+        """
+        initialises an empty log
+
+        Args:
+            capacity (int, optional): most events held before the oldest are pushed out. Defaults to 65536.
+            level (int, optional): lowest level of event kept, DEBUG, INFO or OFF. Defaults to INFO.
+            sample (dict, optional): event name -> keep one in this many events of that kind. Defaults to None (keep all).
+        """
+
+        self.buffer = deque(maxlen=capacity)
+        # events pushed out of the buffer before they were written
+        self.dropped = 0
+        # events of each kind seen so far, for sampling
+        self.seen = [0] * len(EVENT_NAMES)
+        self.configure(level, sample)
+
+    def configure(self, level=INFO, sample=None):
+        """
+        sets which events are kept
+
+        Args:
+            level (int, optional): lowest level of event kept. Defaults to INFO.
+            sample (dict, optional): event name -> keep one in this many events of that kind. Defaults to None (keep all).
+        """
+
+        sample = sample or {}
+        for name in sample:
+            if name not in EVENT_NAMES:
+                raise ValueError(f"unknown event: {name}")
+        # keep one in this many events of each kind, 0 for kinds that are turned off
+        self.every = [
+            sample.get(name, 1) if EVENT_LEVELS[kind] >= level else 0
+            for kind, name in enumerate(EVENT_NAMES)
+        ]
+
+    def wants(self, kind):
+        """
+        checks if events of a kind are being kept, so callers can skip working out an event that would be thrown away
+
+        Args:
+            kind (int): the kind of event
+
+        Returns:
+            bool: true if the kind is turned on
+        """
+
+        return self.every[kind] > 0
+
+    def emit(self, kind, tick, x, y, a=0, b=0):
+        """
+        logs an event
+
+        Args:
+            kind (int): the kind of event, PICKUP, DEPOSIT, SPAWN, FOOD_EXHAUSTED or TRAIL_ABANDONED
+            tick (int): the tick it happened on
+            x (int): row it happened at
+            y (int): column it happened at
+            a (int, optional): first value, see EVENT_VALUES. Defaults to 0.
+            b (int, optional): second value, see EVENT_VALUES. Defaults to 0.
+        """
+
+        every = self.every[kind]
+        if every != 1:
+            if not every:
+                return
+            self.seen[kind] += 1
+            if (self.seen[kind] - 1) % every:
+                return
+        buffer = self.buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped += 1
+        buffer.append((kind, tick, x, y, a, b))
+
+    def drain(self):
+        """
+        takes every event out of the buffer
+
+        Returns:
+            list: the events as (kind, tick, x, y, a, b) tuples, oldest first
+        """
+
+        buffer = self.buffer
+        batch = []
+        # popleft is safe while the simulation thread appends, copying and clearing the deque would not be
+        while buffer:
+            batch.append(buffer.popleft())
+        return batch
+
+
+def event_dict(event):
+    """
+    turns an event tuple into a dict with its fields named
+
+    Args:
+        event (tuple): (kind, tick, x, y, a, b)
+
+    Returns:
+        dict: the event
+    """
+
+    kind, tick, x, y, *values = event
+    record = {"event": EVENT_NAMES[kind], "tick": tick, "x": x, "y": y}
+    for name, value in zip(EVENT_VALUES[kind], values):
+        record[name] = FOOD_TYPE_NAMES[value] if name == "food_type" else value
+    return record
+
+
+class EventWriter:
+    """
+    class that writes an EventLogs events to a file from a background thread
+    the file is json lines if the path ends in .jsonl and binary records otherwise
+    """
+
+    def __init__(self, log, path, interval=0.25):
+        """
+        opens the file and starts the writer thread
+
+        Args:
+            log (EventLog): the log to drain
+            path (str): the file to write
+            interval (float, optional): seconds between batches. Defaults to 0.25.
+        """
+
+        self.log = log
+        self.path = path
+        self.interval = interval
+        self.binary = not path.endswith(".jsonl")
+        self.file = open(path, "wb" if self.binary else "w")
+        if self.binary:
+            self.file.write(MAGIC)
+        self.written = 0
+
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        writes a batch every interval until the writer is closed
+        """
+
+        while not self.stopping.wait(self.interval):
+            self.write(self.log.drain())
+
+    def write(self, batch):
+        """
+        writes a batch of events to the file
+
+        Args:
+            batch (list): event tuples
+        """
+
+        if not batch:
+            return
+        if self.binary:
+            self.file.write(b"".join(RECORD.pack(*event) for event in batch))
+        else:
+            self.file.write("".join(json.dumps(event_dict(event)) + "\n" for event in batch))
+        self.written += len(batch)
+
+    def close(self):
+        """
+        stops the thread, writes whatever is left in the log and closes the file
+        """
+
+        self.stopping.set()
+        self.thread.join()
+        self.write(self.log.drain())
+        self.file.close()
+
+
+def read_events(path):
+    """
+    reads the events back from a file written by an EventWriter, in either format
+
+    Args:
+        path (str): the file to read
+
+    Yields:
+        dict: each event, the same as event_dict gives
+    """
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            file.seek(0)
+            for line in file:
+                yield json.loads(line)
+            return
+        for event in RECORD.iter_unpack(file.read()):
+            yield event_dict(event)
+
+
+def parse_sample(items):
+    """
+    parses sampling options given as name=n on the command line
+
+    Args:
+        items (list): strings like "pickup=10"
+
+    Returns:
+        dict: event name -> keep one in this many
+    """
+
+    sample = {}
+    for item in items or []:
+        name, _, every = item.partition("=")
+        sample[name] = int(every)
+    return sample
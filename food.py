@@ -5,6 +5,9 @@ class Food:
     class representing an item of food in the simulation
     """
 
+    # slots instead of a __dict__, big worlds have a lot of food
+    __slots__ = ("position", "food_type", "hp")
+
     def __init__(self, position, food_type, hp):
         """
         initialises an item of food at a poistions in the sim
@@ -42,7 +45,7 @@ FOOD_TYPES = {
     "Bug": (15, 20) 
 }
 
-def generate_random_food(rows, cols, num_food_items):
+def generate_random_food(rows, cols, num_food_items, rng=random):
     """
     generates a list of food types
     a list of a given number of food types is randomly generated and returned
@@ -51,6 +54,7 @@ def generate_random_food(rows, cols, num_food_items):
         rows (int): the number of rows in the simulation
         cols (_type_): the number of columns in the simulation
         num_food_items (int): the number of food items to generate
+        rng (random.Random, optional): random number generator to use. Defaults to the random module.
 
     Returns:
         list: the list of generated food items
@@ -67,12 +71,12 @@ def generate_random_food(rows, cols, num_food_items):
     # generate the specified number of items
     for _ in range(num_food_items):
         # random position
-        position = (random.randint(0, rows - 1), random.randint(0, cols - 1))
+        position = (rng.randint(0, rows - 1), rng.randint(0, cols - 1))
         # choose 1 item of food based on value of weights
-        food_type = random.choices(food_types, weights=weights, k=1)[0]
+        food_type = rng.choices(food_types, weights=weights, k=1)[0]
         # random hp value between the specified range
         hp_range = FOOD_TYPES[food_type]
-        hp = random.randint(hp_range[0], hp_range[1])
+        hp = rng.randint(hp_range[0], hp_range[1])
         # initialise and add to list
         food_list.append(Food(position, food_type, hp))
     
@@ -0,0 +1,233 @@
+import heapq
+from collections import deque
+import numpy as np
+from topology import NEIGHBOR_DX, NEIGHBOR_DY, NEIGHBOR_OFFSETS, TABLE_SLAB, INDEX_DTYPE
+
+# distance given to squares that cannot reach the target, bigger than any real distance
+UNREACHABLE = np.iinfo(np.int32).max
+
+# slot in the neighbour table of the step (dx, dy), used to find the straight line step towards the target
+STEP_SLOT = np.full((3, 3), -1, dtype=np.int8)
+for slot, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+    STEP_SLOT[dx + 1, dy + 1] = slot
+
+
+class HomingField:
+    """
+    class holding the shortest way back to one square (a nest) from every square in the world
+    the distances are worked out once with a breadth first search over the topologys neighbour table,
+    then every square stores the square to step to next, so finding the way home is one array lookup
+
+    where several steps are equally short the straight line step is taken, the same step an ant heading
+    straight for the target would take, so in a world with nothing blocked ants walk home exactly as they did before
+    when squares are blocked or opened only the distances that change are worked out again
+    """
+
+    def __init__(self, topology, position):
+        """
+        builds the field for a target square
+
+        Args:
+            topology (GridTopology): how the squares of the world connect
+            position (tuple): coordinates of the target
+        """
+
+        self.topology = topology
+        self.position = tuple(position)
+        self.target = self.position[0] * topology.cols + self.position[1]
+
+        # steps from each square to the target, -1 where it cant be reached
+        self.distance = np.full(topology.rows * topology.cols, -1, dtype=np.int32)
+        # the square to step to next from each square, -1 at the target and where there is no way home
+        self.next_cell = np.full(topology.rows * topology.cols, -1, dtype=INDEX_DTYPE)
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        works out the whole field from scratch, one ring of squares at a time
+        """
+
+        table = self.topology.table
+        distance = self.distance
+        distance[:] = -1
+        distance[self.target] = 0
+        # next_cell is all worked out again afterwards, so until then it is scratch space for dropping repeats
+        # from each ring, each square keeps the last place it was written to and only that copy is kept,
+        # which is quicker than np.unique as nothing has to be sorted or hashed
+        seen = self.next_cell
+        frontier = np.array([self.target], dtype=INDEX_DTYPE)
+        steps = 0
+        while frontier.size:
+            steps += 1
+            reached = table[frontier].ravel()
+            reached = reached[reached >= 0]
+            reached = reached[distance[reached] < 0]
+            order = np.arange(reached.size, dtype=INDEX_DTYPE)
+            seen[reached] = order
+            reached = reached[seen[reached] == order]
+            distance[reached] = steps
+            frontier = reached
+        # the steps are picked a slab at a time so the temporaries stay small however big the world is
+        for start in range(0, distance.size, TABLE_SLAB):
+            self.update_steps(np.arange(start, min(start + TABLE_SLAB, distance.size), dtype=INDEX_DTYPE))
+
+    def update_steps(self, cells):
+        """
+        picks the next square for a group of squares from the distances of their neighbours
+
+        Args:
+            cells (numpy.ndarray): flat indexes of the squares
+        """
+
+        topology = self.topology
+        neighbors = topology.table[cells]
+        distance = np.where(neighbors >= 0, self.distance[neighbors], -1)
+        distance[distance < 0] = UNREACHABLE
+        best = distance.min(axis=1)
+
+        # the straight line step towards the target is used whenever it is one of the shortest
+        x, y = np.divmod(cells, topology.cols)
+        dx, dy = topology.offset_many(x, y, self.position[0], self.position[1])
+        straight = STEP_SLOT[np.sign(dx) + 1, np.sign(dy) + 1]
+        rows = np.arange(cells.size)
+        straight_distance = np.where(straight >= 0, distance[rows, np.maximum(straight, 0)], UNREACHABLE)
+        choice = np.where(straight_distance == best, straight, distance.argmin(axis=1))
+
+        steps = neighbors[rows, choice]
+        steps[(best == UNREACHABLE) | (cells == self.target)] = -1
+        self.next_cell[cells] = steps
+
+    def step_from(self, position):
+        """
+        gets the next square on the shortest way to the target
+
+        Args:
+            position (tuple): coordinates of the square to step from
+
+        Returns:
+            tuple: the square to step to or None at the target or when there is no way there
+        """
+
+        cell = self.next_cell[position[0] * self.topology.cols + position[1]]
+        if cell < 0:
+            return None
+        return divmod(int(cell), self.topology.cols)
+
+    def neighbors(self, cell):
+        """
+        gets the open neighbours of a square as a list of flat indexes
+
+        Args:
+            cell (int): flat index of the square
+
+        Returns:
+            list: flat indexes of the neighbours that can be walked on
+        """
+
+        return [neighbor for neighbor in self.topology.table[cell].tolist() if neighbor >= 0]
+
+    def update(self, position):
+        """
+        brings the field up to date after a square has been blocked or opened
+        the topology has to have been changed first
+
+        Args:
+            position (tuple): coordinates of the square that changed
+        """
+
+        cell = position[0] * self.topology.cols + position[1]
+        if self.topology.blocked[position]:
+            changed = self.block(cell)
+        else:
+            changed = self.open(cell)
+
+        # squares round a changed square may have a new best step, blocked ones included as an ant could be stood on one
+        cells = np.array(sorted(set(changed) | {cell}), dtype=INDEX_DTYPE)
+        x, y = np.divmod(cells, self.topology.cols)
+        x, y, inside = self.topology.wrap_many(x[:, None] + NEIGHBOR_DX, y[:, None] + NEIGHBOR_DY)
+        around = (x * self.topology.cols + y)[inside]
+        self.update_steps(np.unique(np.concatenate([cells, around])))
+
+    def open(self, cell):
+        """
+        distances can only get shorter when a square is opened, so they are spread out from it
+
+        Args:
+            cell (int): flat index of the square that was opened
+
+        Returns:
+            list: the squares whose distance changed
+        """
+
+        distance = self.distance
+        reachable = [distance[neighbor] for neighbor in self.neighbors(cell) if distance[neighbor] >= 0]
+        if not reachable:
+            return []
+        distance[cell] = min(reachable) + 1
+
+        changed = [cell]
+        queue = deque([cell])
+        while queue:
+            current = queue.popleft()
+            for neighbor in self.neighbors(current):
+                if distance[neighbor] < 0 or distance[current] + 1 < distance[neighbor]:
+                    distance[neighbor] = distance[current] + 1
+                    changed.append(neighbor)
+                    queue.append(neighbor)
+        return changed
+
+    def block(self, cell):
+        """
+        distances can only get longer when a square is blocked, and only for squares whose every shortest way
+        home went through it, those squares are found ring by ring and worked out again from the squares round them
+
+        Args:
+            cell (int): flat index of the square that was blocked
+
+        Returns:
+            list: the squares whose distance changed
+        """
+
+        distance = self.distance
+        if distance[cell] < 0:
+            return []
+
+        # find the squares that lost their only shortest way home
+        affected = {cell}
+        ring = [cell]
+        while ring:
+            candidates = {
+                neighbor
+                for current in ring
+                for neighbor in self.neighbors(current)
+                if distance[neighbor] == distance[current] + 1 and neighbor not in affected
+            }
+            ring = [
+                candidate for candidate in candidates
+                if not any(
+                    distance[parent] == distance[candidate] - 1 and parent not in affected
+                    for parent in self.neighbors(candidate)
+                )
+            ]
+            affected.update(ring)
+
+        for square in affected:
+            distance[square] = -1
+        affected.discard(cell)
+
+        # work the affected squares out again from the unaffected squares round them, shortest first
+        queue = []
+        for square in affected:
+            reachable = [distance[neighbor] for neighbor in self.neighbors(square) if distance[neighbor] >= 0]
+            if reachable:
+                heapq.heappush(queue, (min(reachable) + 1, square))
+        while queue:
+            steps, square = heapq.heappop(queue)
+            if distance[square] >= 0:
+                continue
+            distance[square] = steps
+            for neighbor in self.neighbors(square):
+                if neighbor in affected and distance[neighbor] < 0:
+                    heapq.heappush(queue, (steps + 1, neighbor))
+
+        return [cell] + list(affected)
@@ -1,116 +1,162 @@
-import asyncio
+import argparse
+import time
+import numpy as np
 import pygame
-from ant_agent import Ant_agent
-from environment import Environment
-from food import generate_random_food
-from nest import Nest
+from camera import Camera, PAN_STEP, SPRITE_MARGIN
+from events import EventWriter, LEVELS, parse_sample
+from pheromone_overlay import PheromoneOverlay
+from parallel import SHARED_PHEROMONE_MODES
+from pheromones import PHEROMONE_MODES
+from profiler import TickProfiler
+from replay import Replay, ReplayRecorder
+from simulation import Simulation, COLOURS, REVERSE_COLOURS, TICK_SECONDS
+from snapshot import SimulationRunner
+from sprites import SpriteCache
 
 # intialise simulation constants
-# size in pixels
+# size of the window in pixels
 WIDTH, HEIGHT = 1840, 1000
-# size of grid squares inpixels
+# size of grid squares inpixels when the camera starts
 GRID_SIZE = 30
-# get number of grid squares based on the size of the sim using integer division
+# default number of grid squares, the world that fits the window at GRID_SIZE using integer division
+# bigger worlds can be set with --rows and --cols and looked round with the camera
 ROWS, COLS = HEIGHT // GRID_SIZE, WIDTH // GRID_SIZE
 
 # colour codes dict for nests and ants
-colours = {
-    "black": (0, 0, 0),
-    "red": (255, 0, 0),
-    "green": (0, 255, 0),
-    "blue": (0, 0, 255),
-}
-# reverse the colours dictionary to so colour values can be mapped back to language for tooltips in visualisation
-REVERSE_COLOURS = {v: k for k, v in colours.items()}
-
-# initialise dictionaries for images
-food_images = {}
-ant_images = {}
-nest_images = {}
+# REVERSE_COLOURS maps colour values back to language for tooltips in visualisation
+colours = COLOURS
+
+# cache of scaled and rotated images, made once the display is set up
+sprites = None
+# sprite caches for the other square sizes the camera zooms to, made the first time they are drawn
+sprite_caches = {}
+# the pheromone layer, made the first time it is drawn
+pheromone_overlay = None
+# times each phase of the loop, made when profiling is turned on with --profile or F3
+profiler = None
+# whether the profilers stats are drawn over the simulation
+show_stats = False
+
+# speeds the simulation can be run at, as multiples of real time, changed with + and -
+SPEEDS = (1, 2, 4, 8, 16, 32)
+# in turbo mode ticks run as fast as they can and the screen is only redrawn this often, in seconds
+TURBO_REFRESH = 0.2
+# ticks run between checks of the clock in turbo mode
+TURBO_BATCH = 10
+
+# keys that pan the camera and the direction they move the view in
+PAN_KEYS = {pygame.K_w: (0, -1), pygame.K_a: (-1, 0), pygame.K_s: (0, 1), pygame.K_d: (1, 0)}
+# colour of blocked squares
+BLOCKED_COLOUR = (120, 120, 120)
+# when zoomed out food is drawn as a pixel of this colour
+FOOD_COLOUR = (150, 90, 30)
+# and squares with ants on are drawn in their colour, more solid the more ants there are
+DENSITY_ALPHA = 120
+DENSITY_STEP = 45
 
 def load_images():
     """
-    this function loads the images for the simulation into the dictionaries
-    loads the ants, nests, and food to be used later
+    this function loads the images for the simulation into the sprite cache
+    loads the ants, nests, and food to be used later, already scaled to the grid size
     """
-    global food_images, ant_images, nest_images
-    # food items
-    food_images = {
-        "Leaf": pygame.image.load("images/leaf.png"),
-        "Bug": pygame.image.load("images/bug.png"),
-        "Berry": pygame.image.load("images/berry.png"),
-        "Nut": pygame.image.load("images/nut.png"),
-    }
-    # ants
-    ant_images = {
-        (0, 0, 0): pygame.image.load("images/black_ant.png"),
-        (255, 0, 0): pygame.image.load("images/red_ant.png"),
-        (0, 255, 0): pygame.image.load("images/green_ant.png"),
-        (0, 0, 255): pygame.image.load("images/blue_ant.png"),
-    }
-    # nests
-    nest_images = {
-        (0, 0, 0): pygame.image.load("images/black_ant_nest.png"),
-        (255, 0, 0): pygame.image.load("images/red_ant_nest.png"),
-        (0, 255, 0): pygame.image.load("images/green_ant_nest.png"),
-        (0, 0, 255): pygame.image.load("images/blue_ant_nest.png"),
-    }
-
-def setup_simulation():
+    global sprites
+    sprites = SpriteCache(GRID_SIZE)
+    sprite_caches[GRID_SIZE] = sprites
+
+def sprites_at(size):
+    """
+    gets the sprite cache for a grid square size, made the first time the camera zooms to it
+
+    Args:
+        size (int): size of a grid square in pixels
+
+    Returns:
+        SpriteCache: the images scaled to that size
+    """
+    if size not in sprite_caches:
+        sprite_caches[size] = SpriteCache(size)
+    return sprite_caches[size]
+
+def setup_simulation(wrap=False, obstacle_density=0.0, rows=ROWS, cols=COLS, ants_per_nest=5, engine="agents", pheromone_mode="eager"):
     """
     this function sets up the simulation environment
     initialises all the agents and components of the simulation
 
+    Args:
+        wrap (bool, optional): whether the edges of the world wrap round. Defaults to False.
+        obstacle_density (float, optional): fraction of squares that are blocked. Defaults to 0.0.
+        rows (int, optional): the number of rows in the world. Defaults to ROWS.
+        cols (int, optional): the number of columns in the world. Defaults to COLS.
+        ants_per_nest (int, optional): number of ants created for each nest. Defaults to 5.
+        engine (str, optional): "agents", "swarm" or "parallel", see Simulation.create. Defaults to "agents".
+        pheromone_mode (str, optional): how pheromones are stored, see pheromones.PHEROMONE_MODES. Defaults to "eager".
+
+    Returns:
+        Simulation: the headless simulation that the window displays
+    """
+    # 20 random food items and 5 ants for each nest by default
+    return Simulation.create(rows, cols, ants_per_nest=ants_per_nest, num_food_items=20, engine=engine,
+                             pheromone_mode=pheromone_mode, wrap=wrap, obstacle_density=obstacle_density)
+
+def draw_cells(screen, origin, size, rgb, alpha):
+    """
+    draws a block of grid squares as one pixel each scaled up to the square size, for things drawn as flat colour
+
+    Args:
+        screen (pygame.Surface): the surface to draw onto
+        origin (tuple): pixel position of the top left square
+        size (int): size of a grid square in pixels
+        rgb (numpy.ndarray): (rows, cols, 3) colour of each square
+        alpha (numpy.ndarray): (rows, cols) alpha of each square, 0 where nothing is drawn
+    """
+    rows, cols = alpha.shape
+    cells = pygame.Surface((cols, rows), pygame.SRCALPHA)
+    # surfarray indexes pixels by (x, y) which is (column, row) so the arrays are transposed
+    pixels = pygame.surfarray.pixels3d(cells)
+    pixels[...] = rgb.transpose(1, 0, 2)
+    del pixels
+    pixels = pygame.surfarray.pixels_alpha(cells)
+    pixels[...] = alpha.T
+    del pixels
+    screen.blit(pygame.transform.scale(cells, (cols * size, rows * size)), origin)
+
+def move_camera(camera, event):
+    """
+    moves the camera for an event
+    the mouse wheel zooms round the pointer, dragging with the left button or WASD pans and F fits the whole world in the window
+
+    Args:
+        camera (Camera): the camera to move
+        event (pygame.event.Event): the event
+
     Returns:
-        _type_: _description_
+        bool: whether the event moved the camera
     """
-    food_items = generate_random_food(ROWS, COLS, num_food_items=20)  # 20 random food items
-
-    # define quadrants for the nests
-    # this splts the sim into 4 quarters so a nest can be placed into each so they are better sporead out
-    # also moves the nest away from the edge a bit
-    quadrants = {
-        "top_left": (2, ROWS // 2, 2, COLS // 2),
-        "top_right": (2, ROWS // 2, COLS // 2, COLS - 2),
-        "bottom_left": (ROWS // 2, ROWS -2, 2, COLS // 2),
-        "bottom_right": (ROWS // 2, ROWS - 2, COLS // 2, COLS - 2),
-    }
-
-    # initialise a nest in each of the quadrants into a list of nests
-    nests = [
-        Nest(*quadrants["top_left"], colours["red"]),
-        Nest(*quadrants["top_right"], colours["black"]),
-        Nest(*quadrants["bottom_left"], colours["green"]),
-        Nest(*quadrants["bottom_right"], colours["blue"]),
-    ]
-
-    # initialise the environment with the correct size
-    environment = Environment(ROWS, COLS, food_items, nests)
-
-    # initialise the ants for each nest and add them to a list of ants
-    ants = []
-
-    # for each nest
-    for nest in nests:
-        # create 5 ants for each nest
-        for _ in range(5):
-            # create an ant
-            ant = Ant_agent(nest.position, environment, nest, nest.colour)
-            # add the ant to the list
-            ants.append(ant)
-
-    return environment, ants, nests
-
-def render(screen, environment, ants, nests, paused, game_over, winner=None, hovered_nest=None, hovered_food=None, hovered_ant=None):
+    if event.type == pygame.MOUSEWHEEL:
+        camera.zoom(event.y, pygame.mouse.get_pos())
+    elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+        camera.pan(-event.rel[0], -event.rel[1])
+    elif event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+        dx, dy = PAN_KEYS[event.key]
+        camera.pan(dx * PAN_STEP, dy * PAN_STEP)
+    elif event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+        camera.fit()
+    else:
+        return False
+    return True
+
+def render(screen, environment, ants, nests, paused, game_over, winner=None, hovered_nest=None, hovered_food=None, hovered_ant=None, status=None, stats=None, camera=None):
     """
     function for rendering the simulation using PyGame
     renders the simulation every frame
     also renders the tooltips for displaying information when the simulation is paused
+    only what is in the cameras view is drawn, and when it is zoomed out too far for sprites
+    ants and food are drawn as a pixel per square instead, so a frame costs what is on screen rather than the size of the world
 
     Args:
         SCREEN (pygame.Surface): the window the simulation is being displayed
-        environment (Environment): the environment created for the simulation to be rendered
-        ants (list): list of all ants in the simulation
+        environment (Environment): the environment to be rendered, or a snapshot or replay frame with the same parts
+        ants (tuple): x, y, direction and colony index arrays of every ant, see replay.ant_arrays
         nests (list): list of all nests
         paused (bool): boolean representing if the simulation is paused
         game_over (bool): boolean whether the simulation has ended
@@ -118,6 +164,9 @@ def render(screen, environment, ants, nests, paused, game_over, winner=None, hov
         hovered_nest (Nest, optional): the nest that the mouse is currently hovering over. Defaults to None.
         hovered_food (Food, optional): the food that the mouse is currently hovering over. Defaults to None.
         hovered_ant (Ant_agent, optional): the ant that the mouse is currently hovering over. Defaults to None.
+        status (str, optional): text shown in the top left corner, used by replay playback and to show the speed. Defaults to None.
+        stats (TickProfiler, optional): profiler whose stats are drawn in the top right corner. Defaults to None.
+        camera (Camera, optional): the part of the world to draw. Defaults to None (the top left at GRID_SIZE).
     """
     # check if the simulation has reached the end (a colony has collected enough food)
     if game_over:
@@ -132,110 +181,97 @@ def render(screen, environment, ants, nests, paused, game_over, winner=None, hov
             screen.blit(restart_surface, (WIDTH // 2 - restart_surface.get_width() // 2, HEIGHT // 2 - restart_surface.get_height() // 2 + 50))
 
             # show the winning nest
-            nest_image = nest_images[tuple(colours[winner])]
-            resized_nest_image = pygame.transform.scale(nest_image, (200, 200))
+            nest_image = sprites.nest_images[tuple(colours[winner])]
+            resized_nest_image = sprites.large_image(nest_image, (200, 200))
             screen.blit(resized_nest_image, (WIDTH // 2 - resized_nest_image.get_width() // 2, HEIGHT // 2 - resized_nest_image.get_height() // 2 - 150))
 
             # show the winning ant image
-            ant_image = ant_images[tuple(colours[winner])]
-            resized_ant_image = pygame.transform.scale(ant_image, (100, 100))
+            ant_image = sprites.ant_images[tuple(colours[winner])]
+            resized_ant_image = sprites.large_image(ant_image, (100, 100))
             screen.blit(resized_ant_image, (WIDTH // 2 - resized_ant_image.get_width() // 2, HEIGHT // 2 - resized_ant_image.get_height() // 2 + 150))
     else:
         # white background
         screen.fill((255, 255, 255))
 
-        # layer for showing pheromones
-        pheromone_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+        if camera is None:
+            camera = Camera(environment.rows, environment.cols, screen.get_width(), screen.get_height(), GRID_SIZE)
+        view = camera.view()
+        x0, x1, y0, y1, size = view
+        origin = camera.to_screen(x0, y0)
 
         # render pheromones in see though version of ant colour
-        # check valuse in all pheromone grids
-        for colour, grid in environment.pheromone_grids.items():
-            for x in range(environment.rows):
-                for y in range(environment.cols):
-                    intensity = grid[x][y]
-                    # if there is a pheromone in the grid
-                    if intensity > 0:
-                        # get the colour
-                        r, g, b = colour
-                        # calculate the inalpha value based on the intensity of the pheromone (how recently it was placed)
-                        alpha = max(20, min(100, intensity * 10)) 
-                        # draw the pheromone using the colour and calculated intesnity
-                        pygame.draw.rect(
-                            pheromone_surface,
-                            (r, g, b, alpha), 
-                            (y * GRID_SIZE, x * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-                        )
+        # the overlay is built from the pheromone arrays in view and kept between frames, so only changes are redrawn
+        global pheromone_overlay
+        if pheromone_overlay is None:
+            pheromone_overlay = PheromoneOverlay()
 
         # add the pheromone surface onto the main surface
-        screen.blit(pheromone_surface, (0, 0))
-
-        # draw food items
-        for food in environment.food_items:
-            # get position of food and image for food
-            food_x, food_y = food.position
-            food_image = food_images[food.food_type]
-
-            # set size for each food
-            if food.food_type == "Nut":
-                size = (GRID_SIZE * 2, GRID_SIZE * 2) 
-            elif food.food_type == "Berry":
-                size = (GRID_SIZE * 2, GRID_SIZE * 3)
-            elif food.food_type == "Leaf":
-                size = (GRID_SIZE * 4, GRID_SIZE * 4)
-            elif food.food_type == "Bug":
-                size = (GRID_SIZE * 6, GRID_SIZE * 3)
-
-            # resize the images
-            resized_image = pygame.transform.scale(food_image, size)
-
-            # calculate the position
-            centre_x = food_y * GRID_SIZE - size[0] // 2 + GRID_SIZE
-            centre_y = food_x * GRID_SIZE - size[1] // 2 + GRID_SIZE
-
-            # render the food onto main surface
-            screen.blit(resized_image, (centre_x, centre_y))
-
-        # draw nests
-        for nest in nests:
-            # get position
-            nest_x, nest_y = nest.position      
-            # get the colour
-            nest_colour_key = nest.colour
-            # get the image for nest
-            nest_image = nest_images[nest_colour_key]       
-            # scale the image to 2x2 grid size
-            size = (GRID_SIZE * 2, GRID_SIZE * 2)
-            resized_nest_image = pygame.transform.scale(nest_image, size)
-        
-            # calculate position
-            centre_x = nest_y * GRID_SIZE - size[0] // 2 + GRID_SIZE
-            centre_y = nest_x * GRID_SIZE - size[1] // 2 + GRID_SIZE
-        
-            # render the nest image onto main surface
-            screen.blit(resized_nest_image, (centre_x, centre_y))
-
-        # draw ants
-        for ant in ants:
-            # get the needed values
-            ant_x, ant_y = ant.position
-            direction = ant.direction
-            ant_image = ant_images[ant.colour]
-
-            # scale image
-            resized_ant_image = pygame.transform.scale(ant_image, (GRID_SIZE, GRID_SIZE))
-
-            # rotate image (needs an extra 180 degrees)
-            rotated_image = pygame.transform.rotate(resized_ant_image, (direction + 180))
-
-            # get new dimensions of rotated image
-            rotated_rect = rotated_image.get_rect()
-
-            # calculate position and centre them to a grid square
-            centre_x = ant_y * GRID_SIZE + GRID_SIZE // 2 - rotated_rect.width // 2
-            centre_y = ant_x * GRID_SIZE + GRID_SIZE // 2 - rotated_rect.height // 2
-
-            # render the ant onto main surface
-            screen.blit(rotated_image, (centre_x, centre_y))
+        screen.blit(pheromone_overlay.update(environment.pheromones, view), origin)
+
+        # draw blocked squares in view in grey
+        blocked = environment.topology.blocked[x0:x1, y0:y1]
+        if blocked.any():
+            draw_cells(screen, origin, size, np.where(blocked[..., None], np.uint8(BLOCKED_COLOUR), np.uint8(0)), blocked * np.uint8(255))
+
+        # ants and food in view, food a few squares outside it is still drawn as its image can reach in
+        ant_x, ant_y, ant_direction, ant_colony = ants
+        in_view = (ant_x >= x0) & (ant_x < x1) & (ant_y >= y0) & (ant_y < y1)
+        nest_colours = [nest.colour for nest in nests]
+
+        if camera.detailed:
+            cache = sprites_at(size)
+            # images to draw this frame as (image, position) pairs, drawn together with one blits call
+            blits = []
+
+            # draw food items, looked up from the food index so food out of view costs nothing
+            for food in environment.food_in(x0 - SPRITE_MARGIN, x1 + SPRITE_MARGIN, y0 - SPRITE_MARGIN, y1 + SPRITE_MARGIN):
+                # get position of food and its image already scaled to the size for its type
+                screen_x, screen_y = camera.to_screen(*food.position)
+                image, (offset_x, offset_y) = cache.food_sprite(food.food_type)
+                # the offset centres the image on the bottom right corner of its grid square
+                blits.append((image, (screen_x + offset_x, screen_y + offset_y)))
+
+            # draw nests
+            for nest in nests:
+                if not camera.shows(nest.position, SPRITE_MARGIN):
+                    continue
+                # get position and the image for the nests colour, scaled to 2x2 grid size
+                screen_x, screen_y = camera.to_screen(*nest.position)
+                image, (offset_x, offset_y) = cache.nest_sprite(nest.colour)
+                blits.append((image, (screen_x + offset_x, screen_y + offset_y)))
+
+            # draw ants
+            for x, y, direction, colony in zip(ant_x[in_view].tolist(), ant_y[in_view].tolist(),
+                                               ant_direction[in_view].tolist(), ant_colony[in_view].tolist()):
+                # get the image already rotated to the closest heading to the ants direction
+                screen_x, screen_y = camera.to_screen(x, y)
+                image, (offset_x, offset_y) = cache.ant_sprite(nest_colours[colony], direction)
+                # the offset centres the rotated image on its grid square
+                blits.append((image, (screen_x + offset_x, screen_y + offset_y)))
+
+            # render everything onto main surface
+            screen.blits(blits, doreturn=False)
+        else:
+            # too far out for sprites, squares with ants on are drawn in the colour of an ant there,
+            # more solid the more ants there are, and squares with food in brown
+            rows, cols = x1 - x0, y1 - y0
+            rgb = np.zeros((rows, cols, 3), dtype=np.uint8)
+            local_x, local_y = ant_x[in_view] - x0, ant_y[in_view] - y0
+            count = np.bincount(local_x * cols + local_y, minlength=rows * cols).reshape(rows, cols)
+            rgb[local_x, local_y] = np.array(nest_colours, dtype=np.uint8).reshape(-1, 3)[ant_colony[in_view]]
+            alpha = np.where(count > 0, np.minimum(DENSITY_ALPHA + count * DENSITY_STEP, 255), 0).astype(np.uint8)
+            for food in environment.food_in(x0, x1, y0, y1):
+                rgb[food.position[0] - x0, food.position[1] - y0] = FOOD_COLOUR
+                alpha[food.position[0] - x0, food.position[1] - y0] = 255
+            draw_cells(screen, origin, size, rgb, alpha)
+
+            # nests as dots in their colour so they can still be found
+            for nest in nests:
+                if camera.shows(nest.position, SPRITE_MARGIN):
+                    screen_x, screen_y = camera.to_screen(*nest.position)
+                    centre = (screen_x + size // 2, screen_y + size // 2)
+                    pygame.draw.circle(screen, nest.colour, centre, max(size * 2, 4))
+                    pygame.draw.circle(screen, (0, 0, 0), centre, max(size * 2, 4), 1)
 
         # if paused display the paused message and hovered item info
         if paused:
@@ -257,6 +293,14 @@ def render(screen, environment, ants, nests, paused, game_over, winner=None, hov
             if hovered_ant:
                 render_popup(screen, f"{REVERSE_COLOURS.get(hovered_ant.colour, 'Unknown')} ant\n{hovered_ant.agent_goal}")
 
+        # status line in the top left corner
+        if status:
+            status_surface = pygame.font.Font(None, 30).render(status, True, (0, 0, 0))
+            screen.blit(status_surface, (10, 10))
+
+        if stats:
+            render_stats(screen, stats)
+
     # update the display
     pygame.display.flip()
 
@@ -303,99 +347,231 @@ def render_popup(screen, text):
         screen.blit(surface, (popup_rect.left + 5, y_offset))
         y_offset += surface.get_height()
 
-async def run_simulation(environment, ants, nests):
+def render_stats(screen, profiler):
+    """
+    function for drawing the profilers stats over the simulation
+    shows the average time of each phase and the counters per frame over the last 60 frames
+
+    Args:
+        screen (pygame.surface): the surface to draw onto
+        profiler (TickProfiler): the profiler to show
+    """
+
+    phases, counters = profiler.summary()
+    lines = [f"{name}: {milliseconds:.2f} ms" for name, milliseconds in phases.items()]
+    lines += [f"{name}: {amount:.1f}" for name, amount in sorted(counters.items())]
+    if not lines:
+        return
+
+    font = pygame.font.Font(None, 24)
+    surfaces = [font.render(line, True, (0, 0, 0)) for line in lines]
+    width = max(surface.get_width() for surface in surfaces) + 10
+    height = sum(surface.get_height() for surface in surfaces) + 10
+
+    # see through white box in the top right corner
+    box = pygame.Surface((width, height), pygame.SRCALPHA)
+    box.fill((255, 255, 255, 200))
+    y_offset = 5
+    for surface in surfaces:
+        box.blit(surface, (5, y_offset))
+        y_offset += surface.get_height()
+    screen.blit(box, (WIDTH - width - 10, 10))
+
+def run_simulation(simulation, steps_per_frame=0, render_every=0):
     """
     runs the simualation
     controls the main loop of the simulation
     and handles the events
+    the simulation is stepped one tick for every 0.1 seconds that it is running, times the speed
+    + and - change the speed, T turns turbo on and off, where ticks run as fast as the cpu allows
+    and the screen is only redrawn every TURBO_REFRESH seconds
+    F3 shows and hides the profiler stats, turning profiling on the first time
+    the mouse wheel zooms, dragging or WASD pans and F fits the world in the window, see move_camera
+
+    the simulation runs on its own thread (see snapshot.SimulationRunner) and this loop draws the latest snapshot of it,
+    so the window keeps handling pause, hover and ESC even when a tick takes longer than a frame
+    pygame has to be driven from the main thread so it is the simulation that is moved off it
+    everything in the sim is counted in ticks so running faster only changes how often the screen is drawn,
+    not what the ants do
 
     Args:
-        environment (Environment): the environment for the simulation
-        ants (list): list of all ants
-        nests (list): list of all nests
+        simulation (Simulation): the simulation to run and display
+        steps_per_frame (int, optional): ticks run every frame instead of keeping to real time, 0 to keep to real time. Defaults to 0.
+        render_every (int, optional): only redraw once this many ticks have run since the last redraw, 0 to draw every new snapshot. Defaults to 0.
 
     Returns:
         bool: whether the simulation is to continue running
     """
-    # run the tasks for spawning food and phromone decay asynchronously
-    asyncio.create_task(environment.decay_pheromones())
-    asyncio.create_task(environment.spawn_food())
+    global profiler, show_stats
+    simulation.environment.profiler = profiler
+    runner = SimulationRunner(simulation, steps_per_frame, tick_seconds=TICK_SECONDS, turbo_batch=TURBO_BATCH)
 
     # variables to control the flow of the simulation
     clock = pygame.time.Clock()
     running = True
     paused = True
-    game_over = False
-    winner = None
+    # index into SPEEDS and whether turbo is on
+    speed = 0
+    turbo = False
+    # the snapshot last drawn and when, so a snapshot is only drawn once and turbo only redraws now and then
+    drawn = None
+    drawn_at = 0.0
+    # the part of the world in the window
+    camera = Camera(simulation.environment.rows, simulation.environment.cols, WIDTH, HEIGHT, GRID_SIZE)
 
     # application loop
-    while running:
-        # reset any hovered items
-        hovered_nest = None
-        hovered_food = None
-        hovered_ant = None
+    try:
+        while running:
+            # reset any hovered items
+            hovered_nest = None
+            hovered_food = None
+            hovered_ant = None
+            # the latest state of the simulation, it keeps running on its own thread while this is drawn
+            snapshot = runner.latest
+            game_over = snapshot.finished
+            # whether the camera moved this frame, so the snapshot is drawn again even if it hasnt changed
+            moved = False
+
+            # handle events
+            for event in pygame.event.get():
+                # is quits set running to false
+                if event.type == pygame.QUIT:
+                    running = False
+                    break
+                elif move_camera(camera, event):
+                    moved = True
+                elif event.type == pygame.KEYDOWN:
+                    # if space is pressed
+                    if event.key == pygame.K_SPACE:
+                        # restart simulation if the sim has ended
+                        if game_over:
+                            return True
+                        # toggle pause if it hasnt yet
+                        paused = not paused
+                        runner.set(paused=paused)
+                    # exit application if escape is pressed
+                    elif event.key == pygame.K_ESCAPE:
+                        running = False
+                    # speed up or slow down
+                    elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                        speed = min(speed + 1, len(SPEEDS) - 1)
+                        runner.set(speed=SPEEDS[speed])
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        speed = max(speed - 1, 0)
+                        runner.set(speed=SPEEDS[speed])
+                    # run as fast as possible
+                    elif event.key == pygame.K_t:
+                        turbo = not turbo
+                        runner.set(turbo=turbo)
+                    # show or hide the profiler stats
+                    elif event.key == pygame.K_F3:
+                        if profiler is None:
+                            profiler = TickProfiler()
+                            simulation.environment.profiler = profiler
+                        show_stats = not show_stats
+
+            if profiler:
+                profiler.lap("events")
+
+            # puse sim if the sim ends to stop things continuing to run
+            # win condition is collecting 50 food for now this can be changed to scale with number of ants or whatever
+            winner = None
+            if game_over:
+                paused = True
+                winner = REVERSE_COLOURS.get(snapshot.winner, "Unknown")
+
+            # handle the showing of popups when paused
+            if paused and not game_over:
+                # check for hovered nest, food and ant in the snapshot under the mouse
+                hovered_nest, hovered_food, hovered_ant = snapshot.lookup(camera.to_world(pygame.mouse.get_pos()))
+                if profiler:
+                    profiler.lap("hover")
+
+            # render everything
+            # paused frames are always drawn for the popups, otherwise only new snapshots once enough ticks have passed
+            now = time.perf_counter()
+            if turbo and not paused:
+                draw = now - drawn_at >= TURBO_REFRESH
+            else:
+                draw = paused or moved or drawn is None or (snapshot is not drawn and snapshot.tick - drawn.tick >= render_every)
+            if draw:
+                status = "turbo" if turbo else f"x{SPEEDS[speed]}" if speed else None
+                ants = (snapshot.ant_x, snapshot.ant_y, snapshot.ant_direction, snapshot.ant_colony)
+                render(screen, snapshot, ants, snapshot.nests, paused, game_over, winner, hovered_nest, hovered_food,
+                       hovered_ant, status=status, stats=profiler if show_stats else None, camera=camera)
+                drawn = snapshot
+                drawn_at = now
+            if profiler:
+                profiler.lap("render")
+            # frame rate
+            clock.tick(60)
+            if profiler:
+                profiler.lap("wait")
+                profiler.count("ticks", runner.take_ticks())
+                profiler.end_frame(snapshot.tick)
+    finally:
+        runner.stop()
+
+    pygame.quit()
+
+def run_replay(replay):
+    """
+    plays back a recorded replay
+    SPACE plays and pauses, LEFT and RIGHT step one tick (ten with SHIFT held),
+    PAGE UP and PAGE DOWN jump a hundred ticks, HOME and END jump to the start and end, ESC quits
+    the camera moves the same way as when running a simulation, see move_camera
+
+    Args:
+        replay (Replay): the replay to play back
+    """
+    clock = pygame.time.Clock()
+    running = True
+    playing = False
+    tick = replay.first_tick
+    # real time that has built up since the last tick
+    time_owed = 0.0
+    # the part of the world in the window
+    camera = Camera(replay.rows, replay.cols, WIDTH, HEIGHT, GRID_SIZE)
 
-        # handle events
+    while running:
         for event in pygame.event.get():
-            # is quits set running to false
             if event.type == pygame.QUIT:
                 running = False
-                break
+            elif move_camera(camera, event):
+                pass
             elif event.type == pygame.KEYDOWN:
-                # if space is pressed
+                step = 10 if event.mod & pygame.KMOD_SHIFT else 1
                 if event.key == pygame.K_SPACE:
-                    # restart simulation if the sim has ended
-                    if game_over:
-                        return True
-                    # toggle pause if it hasnt yet
-                    paused = not paused
-                # exit application if escape is pressed
+                    playing = not playing
+                elif event.key == pygame.K_RIGHT:
+                    tick += step
+                elif event.key == pygame.K_LEFT:
+                    tick -= step
+                elif event.key == pygame.K_PAGEDOWN:
+                    tick += 100
+                elif event.key == pygame.K_PAGEUP:
+                    tick -= 100
+                elif event.key == pygame.K_HOME:
+                    tick = replay.first_tick
+                elif event.key == pygame.K_END:
+                    tick = replay.last_tick
                 elif event.key == pygame.K_ESCAPE:
                     running = False
 
-        # puse sim if the sim ends to stop things continuing to run
-        if game_over:
-            paused = True
-
-        # handle the showing of popups when paused
-        if paused and not game_over:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            grid_x, grid_y = mouse_y // GRID_SIZE, mouse_x // GRID_SIZE
-
-            # check for hovered nest
-            for nest in nests:
-                if nest.position == (grid_x, grid_y):
-                    hovered_nest = nest
-                    break
-
-            # check for hovered food
-            for food in environment.food_items:
-                if food.position == (grid_x, grid_y):
-                    hovered_food = food
-                    break
-
-            # check for hovered ant
-            for ant in ants:
-                if ant.position == (grid_x, grid_y):
-                    hovered_ant = ant
-                    break
-        
-        # allow the ants to act if the sim is not paused
-        if not paused:
-            tasks = [ant.act() for ant in ants]
-            await asyncio.gather(*tasks)
-
-        # check if win condition has been reached
-        # win condition is collecting 50 food for now this can be changed to scale with number of ants or whatever
-        for nest in nests:
-            if nest.total_food >= 50:
-                game_over = True
-                winner = REVERSE_COLOURS.get(nest.colour, "Unknown")
-                paused = True
-
-        # render everything
-        render(screen, environment, ants, nests, paused, game_over, winner, hovered_nest, hovered_food, hovered_ant)
-        # frame rate
+        # play at the same speed the simulation ran at
+        if playing:
+            time_owed = min(time_owed + clock.get_time() / 1000, TICK_SECONDS * 5)
+            ticks_due = int(time_owed / TICK_SECONDS)
+            time_owed -= ticks_due * TICK_SECONDS
+            tick += ticks_due
+        tick = min(max(tick, replay.first_tick), replay.last_tick)
+        if tick == replay.last_tick:
+            playing = False
+
+        frame = replay.seek(tick)
+        status = f"tick {frame.tick} / {replay.last_tick}" + ("" if playing else " (paused)")
+        ants = (frame.ant_x, frame.ant_y, frame.ant_direction, frame.ant_colony)
+        render(screen, frame, ants, frame.nests, False, False, status=status, camera=camera)
         clock.tick(60)
 
     pygame.quit()
@@ -405,6 +581,32 @@ def main():
     main function for the ant simulation
     sets up pygame stuff, loads things, and starts the simulation
     """
+    parser = argparse.ArgumentParser(description="ant colony simulation")
+    parser.add_argument("--record", default=None, help="record each run to this replay file")
+    parser.add_argument("--replay", default=None, help="play back a replay file instead of running a simulation")
+    parser.add_argument("--wrap", action="store_true", help="wrap the edges of the world round into a torus")
+    parser.add_argument("--obstacles", type=float, default=0.0, help="fraction of squares that are blocked")
+    parser.add_argument("--rows", type=int, default=ROWS, help="number of rows in the world, bigger worlds are looked round with the camera")
+    parser.add_argument("--cols", type=int, default=COLS, help="number of columns in the world")
+    parser.add_argument("--ants", type=int, default=5, help="number of ants per nest")
+    parser.add_argument("--engine", choices=("agents", "swarm", "parallel"), default="agents", help="how the ants are stepped")
+    parser.add_argument("--pheromones", choices=sorted(PHEROMONE_MODES), default="eager", help="how pheromones are stored")
+    parser.add_argument("--profile", action="store_true", help="profile the loop and show the stats (F3 toggles them)")
+    parser.add_argument("--profile-out", default=None, help="write the profilers time series to this .json or .csv file on exit")
+    parser.add_argument("--steps-per-frame", type=int, default=0, help="ticks run every frame instead of keeping to real time")
+    parser.add_argument("--render-every", type=int, default=0, help="only redraw once this many ticks have run, 0 for every frame")
+    parser.add_argument("--events", default=None, help="log events to this file, json lines if it ends in .jsonl and binary otherwise")
+    parser.add_argument("--event-level", choices=sorted(LEVELS), default="info", help="lowest level of event logged")
+    parser.add_argument("--event-sample", action="append", default=[], metavar="EVENT=N", help="only log one in N events of a kind")
+    args = parser.parse_args()
+    if args.engine == "parallel" and args.pheromones not in SHARED_PHEROMONE_MODES:
+        parser.error(f"--pheromones {args.pheromones} can't be used with --engine parallel, only {' or '.join(SHARED_PHEROMONE_MODES)} pheromones can be shared with the workers")
+
+    global profiler, show_stats
+    if args.profile or args.profile_out:
+        profiler = TickProfiler()
+        show_stats = args.profile
+
     # initialise pygame
     pygame.init()
 
@@ -416,16 +618,38 @@ def main():
     # load images
     load_images()
 
+    if args.replay:
+        run_replay(Replay(args.replay))
+        return
+
     while True:
         # set up the simulation
-        environment, ants, nests = setup_simulation()
+        simulation = setup_simulation(args.wrap, args.obstacles, args.rows, args.cols, args.ants, args.engine, args.pheromones)
+        # record the run if asked, a restart records over the last run
+        recorder = None
+        if args.record:
+            recorder = ReplayRecorder(args.record, simulation)
+            simulation.tick_hooks.append(recorder)
+        # log events if asked, a restart logs over the last run
+        events = simulation.environment.events
+        events.configure(LEVELS[args.event_level], parse_sample(args.event_sample))
+        event_writer = EventWriter(events, args.events) if args.events else None
         # run the simulation
         try:
-            if not asyncio.run(run_simulation(environment, ants, nests)):
+            if not run_simulation(simulation, args.steps_per_frame, args.render_every):
                 break
         except KeyboardInterrupt:
             print("Simulation stopped.")
             break
+        finally:
+            if recorder:
+                recorder.close()
+            if event_writer:
+                event_writer.close()
+
+    # profiling may have been turned on with F3 so this checks the profiler rather than --profile
+    if profiler and args.profile_out:
+        profiler.export(args.profile_out)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -5,7 +5,9 @@ class Nest:
     class representing a nest in the ant simulation
     """
 
-    def __init__(self, row_start, row_end, col_start, col_end, colour):
+    __slots__ = ("position", "colour", "total_food", "homing")
+
+    def __init__(self, row_start, row_end, col_start, col_end, colour, rng=random):
         """
         initialises the nest in a given quadrant of the simulation
         to make the visualisation better the sim puts each nest in a random place in each quarter of the screen
@@ -16,22 +18,49 @@ class Nest:
             col_start (int): the starting column of the quadrant
             col_end (int): the end column of the quadrant
             colour (tuple): colour code of the nest
+            rng (random.Random, optional): random number generator to place the nest with. Defaults to the random module.
         """
 
         # randomise a position for the nest in the quadrant
         self.position = (
-            random.randint(row_start, row_end - 1),
-            random.randint(col_start, col_end - 1)
+            rng.randint(row_start, row_end - 1),
+            rng.randint(col_start, col_end - 1)
         )
         # set colour
         self.colour = colour
         # start food total at 0
         self.total_food = 0
+        # HomingField with the shortest way back from every square, set by the environment the nest is placed in
+        self.homing = None
+
+    @classmethod
+    def at(cls, position, colour, total_food=0):
+        """
+        creates a nest at an exact position instead of a random one, used when loading a saved simulation
+
+        Args:
+            position (tuple): coordinates of the nest
+            colour (tuple): colour code of the nest
+            total_food (int, optional): food the nest has already collected. Defaults to 0.
 
-    def add_food(self):
+        Returns:
+            Nest: the nest
+        """
+
+        nest = cls.__new__(cls)
+        nest.position = tuple(position)
+        nest.colour = tuple(colour)
+        nest.total_food = total_food
+        nest.homing = None
+        return nest
+
+    def add_food(self, amount=1):
         """
         function for adding food to the nest
+
+        Args:
+            amount (int, optional): how much food is being added. Defaults to 1.
         """
         
-        # increase total food by 1
-        self.total_food += 1
\ No newline at end of file
+        # increase total food, by 1 for a single ant dropping off
+        self.total_food += amount
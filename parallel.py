@@ -0,0 +1,412 @@
+import multiprocessing
+import os
+import weakref
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+from events import EventLog, DEBUG, OFF, TRAIL_ABANDONED
+from nest import Nest
+from pheromones import PHEROMONE_MODES
+from swarm import AntSwarm
+from topology import GridTopology
+from visited import MEMORY_LENGTH
+
+# pheromone stores whose arrays can be moved into shared memory, sparse and tiled ones grow and shrink as they go
+SHARED_PHEROMONE_MODES = ("eager", "lazy")
+# random numbers each ant is given a tick, one for each neighbouring square it could explore to
+SCORES_PER_ANT = 8
+# philox makes random numbers in blocks of 4, so skipping past an ants numbers is advancing 2 blocks
+BLOCKS_PER_ANT = SCORES_PER_ANT // 4
+
+# what a worker knows about food and homing, only the parts the ants read
+ShardFood = namedtuple("ShardFood", ["position"])
+ShardHoming = namedtuple("ShardHoming", ["next_cell"])
+
+
+class ParallelSwarm(AntSwarm):
+    """
+    AntSwarm that steps its ants on several worker processes at once
+    the ant arrays, pheromones, scent field, neighbour table and homing fields are moved into shared memory
+    and each worker owns a contiguous slice of the ants, so nothing is copied between processes each tick
+
+    a tick is run in two rounds with the same split as AntSwarm.step
+    first every worker runs decide for its ants, which only writes their own rows and drops pheromones
+    then the main process runs resolve in swarm order, so when ants clash over the last HP of a food item
+    the earliest ant gets it however the ants are split, then every worker runs search for its ants
+
+    exploring ants get their random numbers from a counter based generator keyed by the seed and the tick,
+    each ant always getting the same numbers, so a run comes out the same with any number of workers
+    it is not the same as an AntSwarm run with the same seed, which draws numbers only for the ants that explore
+    with 0 workers everything runs in the main process, which is the same run without the processes
+    """
+
+    # name of the engine in checkpoints
+    engine = "parallel"
+
+    def __init__(self, environment, nests, ants_per_nest, sensing_range=2, memory_length=MEMORY_LENGTH, seed=None, workers=None):
+        """
+        initialises the swarm, the workers are only started on the first step
+
+        Args:
+            environment (Environment): the environment that the ants act within
+            nests (list): the nests, each gets ants_per_nest ants
+            ants_per_nest (int): number of ants created for each nest
+            sensing_range (int, optional): how far the ants can sense food and pheromones. Defaults to 2.
+            memory_length (int, optional): how many visited squares each ant remembers. Defaults to MEMORY_LENGTH.
+            seed (int, optional): key for the random number generator. Defaults to None.
+            workers (int, optional): number of worker processes, 0 to run in this process. Defaults to None (one per cpu).
+        """
+
+        super().__init__(environment, nests, ants_per_nest, sensing_range, memory_length, seed)
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self.workers = os.cpu_count() if workers is None else workers
+        if self.workers and environment.pheromones.mode not in SHARED_PHEROMONE_MODES:
+            raise ValueError(f"{environment.pheromones.mode} pheromones cant be shared between processes")
+        # the ants this process steps, all of them unless it is a worker
+        self.shard = (0, self.count)
+        # worker processes and the pipes to them, None until they are started
+        self.processes = None
+        self.connections = None
+        self.finalizer = None
+
+    def get_state(self):
+        """
+        gets everything needed to save the swarm, see AntSwarm.get_state
+        """
+
+        values, arrays = super().get_state()
+        values["seed"] = self.seed
+        values["workers"] = self.workers
+        return values, arrays
+
+    def set_state(self, values, arrays):
+        """
+        restores the swarm from a saved state, see AntSwarm.set_state
+        any running workers are stopped and started again with the restored ants on the next step
+        """
+
+        self.close()
+        super().set_state(values, arrays)
+        self.seed = values["seed"]
+        self.shard = (0, self.count)
+
+    def random_scores(self, ants, shape):
+        """
+        gets the random numbers exploring ants pick their next square with, see AntSwarm.random_scores
+        the numbers for the whole shard are made from the tick and each ant takes its own row
+        """
+
+        start, stop = self.shard
+        bits = np.random.Philox(key=self.seed, counter=[0, self.environment.tick, 0, 0])
+        bits.advance(start * BLOCKS_PER_ANT)
+        scores = np.random.Generator(bits).random((stop - start, SCORES_PER_ANT))
+        return scores[ants - start]
+
+    def step(self):
+        """
+        lets every ant in the swarm act once, spread over the workers
+        """
+
+        if not self.workers:
+            super().step()
+            return
+        if self.processes is None:
+            self.start()
+
+        environment = self.environment
+        clock = getattr(environment.pheromones, "clock", 0)
+        foods = {order: food.position for order, food in self.scent.foods.items()}
+        # the workers drop pheromones into the shared layers, so they send the cells back when the drops are being tracked
+        pheromones = environment.pheromones
+        tracking = pheromones.drops is not None
+        decided = self.ask(("decide", environment.tick, clock, foods, tracking))
+
+        counts = {}
+        for *_, drops, shard_counts in decided:
+            add_counts(counts, shard_counts)
+            if tracking:
+                pheromones.drops.append(drops)
+        # the shards are in swarm order so joining them keeps it
+        home, arrived, food = (np.concatenate(parts) for parts in list(zip(*decided))[:3])
+        self.resolve(home, arrived, food)
+
+        events = environment.events
+        searched = self.ask(("search", events.wants(TRAIL_ABANDONED)))
+        for shard_counts, trail_events in searched:
+            add_counts(counts, shard_counts)
+            # logged here so sampling counts them in the same order as a single process would
+            for event in trail_events:
+                events.emit(*event)
+
+        profiler = environment.profiler
+        if profiler:
+            for name, amount in counts.items():
+                profiler.count(name, amount)
+
+    def ask(self, message):
+        """
+        sends a message to every worker and waits for all their answers
+
+        Args:
+            message (tuple): the round to run and what the workers need for it
+
+        Returns:
+            list: each workers answer, in shard order
+        """
+
+        for connection in self.connections:
+            connection.send(message)
+        return [connection.recv() for connection in self.connections]
+
+    def start(self):
+        """
+        moves the shared arrays into shared memory and starts a worker for each shard
+        """
+
+        environment = self.environment
+        segments = []
+        specs = {}
+
+        def share(name, array):
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(segment)
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+            shared[...] = array
+            specs[name] = (segment.name, array.shape, array.dtype.str)
+            return shared
+
+        for name in self.STATE_ARRAYS:
+            setattr(self, name, share(name, getattr(self, name)))
+        pheromone_values, pheromone_arrays = environment.pheromones.get_state()
+        environment.pheromones.set_state(pheromone_values, {
+            name: share(f"pheromones.{name}", array) for name, array in pheromone_arrays.items()
+        })
+        self.scent.field = share("scent.field", self.scent.field)
+        topology = environment.topology
+        topology.table = share("topology.table", topology.table)
+        topology.blocked = share("topology.blocked", topology.blocked)
+        for index, nest in enumerate(self.nests):
+            nest.homing.next_cell = share(f"homing.{index}", nest.homing.next_cell)
+
+        spec = {
+            "arrays": specs,
+            "rows": environment.rows,
+            "cols": environment.cols,
+            "wrap": topology.wrap,
+            "pheromones": pheromone_values,
+            "colours": environment.pheromones.colours,
+            "nests": [(nest.position, nest.colour) for nest in self.nests],
+            "sensing_range": self.sensing_range,
+            "memory_length": self.memory_length,
+            "seed": self.seed,
+            "count": self.count,
+        }
+
+        context = multiprocessing.get_context("spawn")
+        self.processes = []
+        self.connections = []
+        bounds = [self.count * shard // self.workers for shard in range(self.workers + 1)]
+        for start, stop in zip(bounds, bounds[1:]):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target=run_worker, args=(worker_connection, dict(spec, shard=(start, stop))), daemon=True)
+            process.start()
+            worker_connection.close()
+            self.processes.append(process)
+            self.connections.append(connection)
+        # stops the workers and frees the shared memory if the swarm is thrown away or python exits without close
+        self.finalizer = weakref.finalize(self, release, self.processes, self.connections, segments)
+
+    def close(self):
+        """
+        stops the workers and moves the shared arrays back into this process
+        the swarm carries on working and starts new workers if it is stepped again
+        """
+
+        if self.processes is None:
+            return
+
+        for name in self.STATE_ARRAYS:
+            setattr(self, name, getattr(self, name).copy())
+        pheromones = self.environment.pheromones
+        pheromone_values, pheromone_arrays = pheromones.get_state()
+        pheromones.set_state(pheromone_values, {name: array.copy() for name, array in pheromone_arrays.items()})
+        self.scent.field = self.scent.field.copy()
+        topology = self.environment.topology
+        topology.table = topology.table.copy()
+        topology.blocked = topology.blocked.copy()
+        for nest in self.nests:
+            nest.homing.next_cell = nest.homing.next_cell.copy()
+
+        self.finalizer()
+        self.processes = None
+        self.connections = None
+
+
+def add_counts(counts, more):
+    """
+    adds one set of branch counts to another
+
+    Args:
+        counts (dict): the totals, changed in place
+        more (dict): the counts to add
+    """
+
+    for name, amount in more.items():
+        counts[name] = counts.get(name, 0) + amount
+
+
+def release(processes, connections, segments):
+    """
+    stops worker processes and frees the shared memory they were using
+
+    Args:
+        processes (list): the worker processes
+        connections (list): the pipes to them
+        segments (list): the shared memory blocks
+    """
+
+    for connection in connections:
+        try:
+            connection.send(("stop",))
+        except OSError:
+            # the worker has already gone, like when python is exiting
+            pass
+        connection.close()
+    for process in processes:
+        process.join()
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            # arrays still point into the block, it is freed when they are
+            pass
+        segment.unlink()
+
+
+def attach(name):
+    """
+    opens a shared memory block made by the main process, which is the one that frees it
+
+    Args:
+        name (str): name of the block
+
+    Returns:
+        SharedMemory: the block
+    """
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python before 3.13 always tracks the block, but workers share the main processes tracker
+        # so this is the same entry the main process removes when it frees the block
+        return shared_memory.SharedMemory(name=name)
+
+
+class ShardScent:
+    """
+    the parts of a ScentField a worker reads, the field is shared and the food positions are sent each tick
+    """
+
+    def __init__(self, field):
+        """
+        Args:
+            field (numpy.ndarray): the shared scent field
+        """
+
+        self.field = field
+        self.foods = {}
+
+
+class ShardEnvironment:
+    """
+    the parts of the Environment a worker steps its ants in, built over the arrays shared by the main process
+    """
+
+    def __init__(self, rows, cols, topology, pheromones, scent):
+        """
+        Args:
+            rows (int): the number of rows in the simulation
+            cols (int): the number of columns in the simulation
+            topology (GridTopology): the shared topology
+            pheromones (PheromoneField): the shared pheromones
+            scent (ShardScent): the shared scent field
+        """
+
+        self.rows = rows
+        self.cols = cols
+        self.topology = topology
+        self.pheromones = pheromones
+        self.scent_field = scent
+        self.tick = 0
+        self.profiler = None
+        # events are collected here and sent back for the main process to log
+        self.events = EventLog(capacity=None, level=OFF)
+
+    def scent(self, radius):
+        """
+        gets the shared scent field, there is only the one the swarm senses with
+        """
+
+        return self.scent_field
+
+
+def run_worker(connection, spec):
+    """
+    the worker process, steps one shard of the ants each round it is asked to until it is told to stop
+
+    Args:
+        connection (Connection): pipe to the main process
+        spec (dict): the shared arrays and settings, see ParallelSwarm.start
+    """
+
+    segments = []
+    arrays = {}
+    for name, (segment_name, shape, dtype) in spec["arrays"].items():
+        segment = attach(segment_name)
+        segments.append(segment)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+    rows, cols = spec["rows"], spec["cols"]
+    topology = GridTopology.from_table(rows, cols, spec["wrap"], arrays["topology.blocked"], arrays["topology.table"])
+    pheromone_values = spec["pheromones"]
+    pheromones = PHEROMONE_MODES[pheromone_values["mode"]](rows, cols, spec["colours"])
+    pheromones.set_state(pheromone_values, {
+        name.split(".", 1)[1]: array for name, array in arrays.items() if name.startswith("pheromones.")
+    })
+    scent = ShardScent(arrays["scent.field"])
+    environment = ShardEnvironment(rows, cols, topology, pheromones, scent)
+
+    nests = []
+    for index, (position, colour) in enumerate(spec["nests"]):
+        nest = Nest.at(position, colour)
+        nest.homing = ShardHoming(arrays[f"homing.{index}"])
+        nests.append(nest)
+
+    swarm = ParallelSwarm(environment, nests, 0, spec["sensing_range"], spec["memory_length"], spec["seed"], workers=0)
+    for name in AntSwarm.STATE_ARRAYS:
+        setattr(swarm, name, arrays[name])
+    swarm.count = spec["count"]
+    swarm.shard = start, stop = spec["shard"]
+
+    rest = None
+    while True:
+        message = connection.recv()
+        if message[0] == "decide":
+            _, environment.tick, clock, foods, tracking = message
+            if "clock" in pheromone_values:
+                pheromones.clock = clock
+            scent.foods = {order: ShardFood(position) for order, position in foods.items()}
+            awake = np.flatnonzero(environment.tick >= swarm.sleep_until[start:stop]) + start
+            counts = {"branch.resting": stop - start - awake.size}
+            pheromones.track_drops(tracking)
+            home, arrived, food, rest = swarm.decide(awake, counts)
+            connection.send((home, arrived, food, pheromones.take_drops() if tracking else None, counts))
+        elif message[0] == "search":
+            environment.events.configure(DEBUG if message[1] else OFF)
+            counts = {}
+            swarm.search(rest, counts)
+            connection.send((counts, environment.events.drain()))
+        else:
+            break
+    # the shared memory is unmapped when the process exits, the main process frees it
+    connection.close()
@@ -0,0 +1,181 @@
+import numpy as np
+import pygame
+
+# alpha range pheromones are drawn with, fresher pheromones are drawn more solid
+MIN_ALPHA = 20
+MAX_ALPHA = 100
+
+
+class PheromoneOverlay:
+    """
+    class that draws the pheromone trails in the cameras view as a see through layer over the simulation
+    the colour and alpha of every grid square in view is worked out from the pheromone arrays in one go
+    and written into a small surface with one pixel per square, which is then scaled up to the screen
+    both surfaces are kept between frames and only the tiles that changed since the last frame are scaled again,
+    unless the view has moved, when everything is redrawn
+    pheromone stores split into tiles only have the tiles that hold pheromone, or did last frame, worked out at all
+    """
+
+    def __init__(self, tile_size=16):
+        """
+        initialises an empty overlay, the surfaces are made for the first view drawn
+
+        Args:
+            tile_size (int, optional): width of the tiles that are redrawn when they change, in grid squares. Defaults to 16.
+        """
+
+        self.tile_size = tile_size
+        # the view the surfaces are for, (first row, row after the last, first column, column after the last, square size)
+        self.view = None
+        # tiles of a tiled pheromone store that were drawn last frame
+        self.drawn = None
+
+    def reset(self, view):
+        """
+        makes empty surfaces for a new view
+
+        Args:
+            view (tuple): the view from Camera.view
+        """
+
+        x0, x1, y0, y1, size = view
+        rows, cols = x1 - x0, y1 - y0
+        self.view = view
+        # one pixel per grid square, and the same scaled up to the size it is drawn at
+        self.cells = pygame.Surface((cols, rows), pygame.SRCALPHA)
+        self.surface = pygame.Surface((cols * size, rows * size), pygame.SRCALPHA)
+        # the colour and alpha of each square last frame, used to find what changed
+        self.rgb = np.zeros((rows, cols, 3), dtype=np.uint8)
+        self.alpha = np.zeros((rows, cols), dtype=np.uint8)
+        self.drawn = None
+
+    def shade(self, pheromones, x0, x1, y0, y1):
+        """
+        works out the colour and alpha of a rectangle of squares from the pheromones
+
+        Args:
+            pheromones (PheromoneField): the pheromone field to draw
+            x0 (int): first row
+            x1 (int): row after the last one
+            y0 (int): first column
+            y1 (int): column after the last one
+
+        Returns:
+            tuple: (rows, cols, 3) colour array and (rows, cols) alpha array
+        """
+
+        rgb = np.zeros((x1 - x0, y1 - y0, 3), dtype=np.uint8)
+        alpha = np.zeros((x1 - x0, y1 - y0), dtype=np.uint8)
+        # colours are drawn in order so where trails cross the last colour is on top
+        for colour in pheromones.colours:
+            steps = pheromones.window(pheromones.layers[colour], x0, x1, y0, y1)
+            marked = steps > 0
+            rgb[marked] = colour
+            # the alpha is worked out from the intensity of the pheromone (how recently it was placed)
+            # intensity * 10 is the number of decay steps left, see PHEROMONE_STEPS
+            alpha[marked] = np.clip(steps[marked], MIN_ALPHA, MAX_ALPHA)
+        return rgb, alpha
+
+    def update(self, pheromones, view, dirty_only=True):
+        """
+        brings the overlay up to date with the pheromones in view
+
+        Args:
+            pheromones (PheromoneField): the pheromone field to draw
+            view (tuple): the view from Camera.view, the overlay is drawn at the top left square of it
+            dirty_only (bool, optional): only scale up the tiles that changed. Defaults to True.
+
+        Returns:
+            pygame.Surface: the overlay, ready to blit onto the screen
+        """
+
+        if view != self.view:
+            self.reset(view)
+        tiles = pheromones.active_tiles()
+        if tiles is not None:
+            return self.update_tiles(pheromones, tiles)
+
+        x0, x1, y0, y1, size = view
+        rows, cols = x1 - x0, y1 - y0
+        rgb, alpha = self.shade(pheromones, x0, x1, y0, y1)
+        changed = (alpha != self.alpha) | (rgb != self.rgb).any(axis=2)
+        if not changed.any():
+            return self.surface
+
+        self.rgb = rgb
+        self.alpha = alpha
+        # surfarray indexes pixels by (x, y) which is (column, row) so the arrays are transposed
+        pixels = pygame.surfarray.pixels3d(self.cells)
+        pixels[...] = rgb.transpose(1, 0, 2)
+        del pixels
+        pixels = pygame.surfarray.pixels_alpha(self.cells)
+        pixels[...] = alpha.T
+        del pixels
+
+        if not dirty_only:
+            pygame.transform.scale(self.cells, self.surface.get_size(), self.surface)
+            return self.surface
+
+        # scale up just the tiles that have a changed square in them
+        tile = self.tile_size
+        tile_rows, tile_cols = -(-rows // tile), -(-cols // tile)
+        padded = np.zeros((tile_rows * tile, tile_cols * tile), dtype=bool)
+        padded[:rows, :cols] = changed
+        dirty = padded.reshape(tile_rows, tile, tile_cols, tile).any(axis=(1, 3))
+        for tile_row, tile_col in zip(*np.nonzero(dirty)):
+            area = pygame.Rect(tile_col * tile, tile_row * tile, tile, tile).clip(self.cells.get_rect())
+            self.scale(area)
+        return self.surface
+
+    def update_tiles(self, pheromones, tiles):
+        """
+        brings the overlay up to date with a pheromone store split into tiles
+        only tiles in view holding pheromone are worked out, along with the ones that did last frame so they get cleared
+
+        Args:
+            pheromones (PheromoneField): the pheromone field to draw
+            tiles (numpy.ndarray): which of its tiles hold pheromone, from active_tiles
+
+        Returns:
+            pygame.Surface: the overlay, ready to blit onto the screen
+        """
+
+        x0, x1, y0, y1, size = self.view
+        tile = pheromones.tile_size
+        redraw = tiles if self.drawn is None or self.drawn.shape != tiles.shape else tiles | self.drawn
+        self.drawn = tiles.copy()
+
+        row0, col0 = x0 // tile, y0 // tile
+        redraw = redraw[row0:(x1 - 1) // tile + 1, col0:(y1 - 1) // tile + 1]
+        for tile_row, tile_col in zip(*np.nonzero(redraw)):
+            # the part of the tile in view, in world squares and then in squares from the top left of the view
+            tx0, ty0 = max((row0 + tile_row) * tile, x0), max((col0 + tile_col) * tile, y0)
+            tx1, ty1 = min((row0 + tile_row + 1) * tile, x1), min((col0 + tile_col + 1) * tile, y1)
+            rgb, alpha = self.shade(pheromones, tx0, tx1, ty0, ty1)
+            ax0, ax1, ay0, ay1 = tx0 - x0, tx1 - x0, ty0 - y0, ty1 - y0
+            if np.array_equal(alpha, self.alpha[ax0:ax1, ay0:ay1]) and np.array_equal(rgb, self.rgb[ax0:ax1, ay0:ay1]):
+                continue
+            self.rgb[ax0:ax1, ay0:ay1] = rgb
+            self.alpha[ax0:ax1, ay0:ay1] = alpha
+
+            # surfarray indexes pixels by (x, y) which is (column, row) so the arrays are transposed
+            pixels = pygame.surfarray.pixels3d(self.cells)
+            pixels[ay0:ay1, ax0:ax1] = rgb.transpose(1, 0, 2)
+            del pixels
+            pixels = pygame.surfarray.pixels_alpha(self.cells)
+            pixels[ay0:ay1, ax0:ax1] = alpha.T
+            del pixels
+            self.scale(pygame.Rect(ay0, ax0, ay1 - ay0, ax1 - ax0))
+        return self.surface
+
+    def scale(self, area):
+        """
+        scales part of the one pixel per square surface up onto the overlay
+
+        Args:
+            area (pygame.Rect): the part to scale, in squares from the top left of the view
+        """
+
+        size = self.view[4]
+        target = pygame.Rect(area.x * size, area.y * size, area.width * size, area.height * size)
+        pygame.transform.scale(self.cells.subsurface(area), target.size, self.surface.subsurface(target))
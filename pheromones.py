@@ -0,0 +1,735 @@
+from collections import deque
+import numpy as np
+
+# the level a freshly dropped pheromone starts at
+PHEROMONE_STRENGTH = 10
+# how much a pheromone fades on every decay step
+PHEROMONE_DECAY = 0.1
+# levels are stored as whole decay steps rather than floats
+# so decaying a cell over and over never builds up rounding error
+# a fresh pheromone lasts this many decay steps (10 / 0.1 = 100)
+PHEROMONE_STEPS = round(PHEROMONE_STRENGTH / PHEROMONE_DECAY)
+# width of the square tiles the tiled store splits the world into, in cells
+TILE_SIZE = 32
+# tiles the tiled store has room for to start with, it grows and shrinks by doubling from here
+MIN_TILES = 16
+
+
+class PheromoneField:
+    """
+    class storing the pheromone trails for every colony in the simulation
+    all colonies share one stacked numpy array with a layer for each colour
+    so decaying the whole world is a single array operation instead of a python loop
+
+    the other pheromone stores subclass this and replace the storage methods
+    (drop, drop_many, steps_at, window, decay) so everything reading pheromones works with any of them
+    """
+
+    # name of the store in PHEROMONE_MODES
+    mode = "eager"
+    # width of the tiles the store is split into, None if it isnt
+    tile_size = None
+
+    def __init__(self, rows, cols, colours):
+        """
+        initialises an empty pheromone field
+
+        Args:
+            rows (int): the number of rows in the simulation
+            cols (int): the number of columns in the simulation
+            colours (list): colour codes of the colonies that lay pheromones
+        """
+
+        self.rows = rows
+        self.cols = cols
+        self.colours = list(colours)
+        # map each colour to its layer in the stacked array
+        self.layers = {colour: index for index, colour in enumerate(self.colours)}
+        # flat indexes of the cells dropped on since take_drops was last called, None when drops arent being tracked
+        self.drops = None
+        self.allocate()
+
+    def allocate(self):
+        """
+        creates the storage for the pheromones
+        one uint8 layer per colony holding the number of decay steps left in each cell
+        """
+
+        self.grid = np.zeros((len(self.colours), self.rows, self.cols), dtype=np.uint8)
+
+    def drop(self, colour, position):
+        """
+        sets a cell to full strength for a colour
+
+        Args:
+            colour (tuple): colour code of the pheromone
+            position (tuple): coordinates of the cell
+        """
+
+        x, y = position
+        self.grid[self.layers[colour], x, y] = PHEROMONE_STEPS
+        if self.drops is not None:
+            self.note_drops(self.layers[colour], x, y)
+
+    def drop_many(self, layers, xs, ys):
+        """
+        sets a batch of cells to full strength at once
+        used by the vectorised swarm, the arrays all have to be the same shape
+
+        Args:
+            layers (numpy.ndarray): layer index of each pheromone (see self.layers)
+            xs (numpy.ndarray): x coordinates of the cells
+            ys (numpy.ndarray): y coordinates of the cells
+        """
+
+        self.grid[layers, xs, ys] = PHEROMONE_STEPS
+        if self.drops is not None:
+            self.note_drops(layers, xs, ys)
+
+    def steps_at(self, layers, xs, ys):
+        """
+        gets the number of decay steps left in cells
+        works with single values or numpy arrays, which are broadcast together
+
+        Args:
+            layers (int or numpy.ndarray): layer index of each cell
+            xs (int or numpy.ndarray): x coordinates of the cells, must be within bounds
+            ys (int or numpy.ndarray): y coordinates of the cells, must be within bounds
+
+        Returns:
+            int or numpy.ndarray: decay steps left, 0 where there is no pheromone
+        """
+
+        return self.grid[layers, xs, ys]
+
+    def window(self, layer, x0, x1, y0, y1):
+        """
+        gets the decay steps left in a rectangle of one layer
+
+        Args:
+            layer (int): layer index
+            x0 (int): first row, must be within bounds
+            x1 (int): row after the last one
+            y0 (int): first column, must be within bounds
+            y1 (int): column after the last one
+
+        Returns:
+            numpy.ndarray: decay steps left in each cell of the rectangle, do not write to it
+        """
+
+        return self.grid[layer, x0:x1, y0:y1]
+
+    def decay(self):
+        """
+        fades every pheromone in the world by one decay step
+        cells that are already empty stay at 0
+        """
+
+        # raising empty cells to 1 first means the subtract can never wrap below 0
+        np.maximum(self.grid, 1, out=self.grid)
+        np.subtract(self.grid, 1, out=self.grid)
+
+    def track_drops(self, tracking=True):
+        """
+        starts or stops keeping track of the cells pheromone is dropped on, for take_drops
+        every store calls note_drops from drop and drop_many while tracking is on
+
+        Args:
+            tracking (bool, optional): whether to keep track. Defaults to True.
+        """
+
+        self.drops = [] if tracking else None
+
+    def note_drops(self, layers, xs, ys):
+        """
+        keeps a batch of drops for take_drops
+
+        Args:
+            layers (int or numpy.ndarray): layer index of each drop
+            xs (int or numpy.ndarray): x coordinates of the cells
+            ys (int or numpy.ndarray): y coordinates of the cells
+        """
+
+        cells = (np.asarray(layers, dtype=np.int64) * self.rows + xs) * self.cols + ys
+        self.drops.append(np.ravel(cells))
+
+    def take_drops(self):
+        """
+        gets the cells dropped on since the last call and starts again
+        every other cell has only decayed since then, which is what the replay recorder relies on
+
+        Returns:
+            numpy.ndarray: sorted flat indexes into the stacked (layer, row, column) layers, each cell once
+        """
+
+        drops = np.unique(np.concatenate(self.drops)) if self.drops else np.zeros(0, dtype=np.int64)
+        self.drops = []
+        return drops
+
+    def get_state(self):
+        """
+        gets everything needed to save the field and restore it later
+
+        Returns:
+            tuple: a dict of plain values and a dict of numpy arrays
+        """
+
+        return {"mode": self.mode}, {"grid": self.grid}
+
+    def set_state(self, values, arrays):
+        """
+        restores the field from a saved state
+        the arrays can be memory mapped from a checkpoint, they are used as they are rather than copied
+
+        Args:
+            values (dict): the plain values from get_state
+            arrays (dict): the numpy arrays from get_state
+        """
+
+        self.grid = arrays["grid"]
+
+    def has_trail_many(self, layers, xs, ys):
+        """
+        checks a batch of cells for pheromone at once
+        the arrays are broadcast together so a column of layers can be checked against rows of cells
+
+        Args:
+            layers (numpy.ndarray): layer index to check for each cell
+            xs (numpy.ndarray): x coordinates of the cells, must be within bounds
+            ys (numpy.ndarray): y coordinates of the cells, must be within bounds
+
+        Returns:
+            numpy.ndarray: boolean array, true where a cell holds pheromone
+        """
+
+        return self.steps_at(layers, xs, ys) > 0
+
+    def level(self, colour, position):
+        """
+        gets the intensity of a colours pheromone in a cell
+
+        Args:
+            colour (tuple): colour code of the pheromone
+            position (tuple): coordinates of the cell
+
+        Returns:
+            float: the intensity of the pheromone, 0 if there is none
+        """
+
+        x, y = position
+        return int(self.steps_at(self.layers[colour], x, y)) * PHEROMONE_DECAY
+
+    def has_trail(self, colour, position):
+        """
+        checks if a cell holds any of a colours pheromone
+
+        Args:
+            colour (tuple): colour code of the pheromone
+            position (tuple): coordinates of the cell
+
+        Returns:
+            bool: true if there is pheromone in the cell
+        """
+
+        x, y = position
+        return self.steps_at(self.layers[colour], x, y) > 0
+
+    def find_trail(self, colour, position, radius):
+        """
+        finds the first cell holding a colours pheromone within a square around a position
+        cells are checked row by row, the same order the ants used to scan them in
+
+        Args:
+            colour (tuple): colour code of the pheromone
+            position (tuple): coordinates at the centre of the square
+            radius (int): how many cells the square extends in each direction
+
+        Returns:
+            tuple: coordinates of the first pheromone found or None if there isnt one
+        """
+
+        x, y = position
+        # clip the square to the bounds of the simulation
+        x0, x1 = max(x - radius, 0), min(x + radius + 1, self.rows)
+        y0, y1 = max(y - radius, 0), min(y + radius + 1, self.cols)
+        if x0 >= x1 or y0 >= y1:
+            return None
+
+        hits = np.flatnonzero(self.window(self.layers[colour], x0, x1, y0, y1))
+        if hits.size == 0:
+            return None
+        row, col = divmod(int(hits[0]), y1 - y0)
+        return (x0 + row, y0 + col)
+
+    def layer(self, colour):
+        """
+        gets a read only copy or view of a colours whole layer for drawing
+        values are the number of decay steps left, multiply by PHEROMONE_DECAY for the intensity
+
+        Args:
+            colour (tuple): colour code of the pheromone
+
+        Returns:
+            numpy.ndarray: rows x cols array of decay steps left in each cell
+        """
+
+        view = self.window(self.layers[colour], 0, self.rows, 0, self.cols).view()
+        view.flags.writeable = False
+        return view
+
+    def active_tiles(self):
+        """
+        gets which tiles of the world hold any pheromone, so drawing can skip the rest
+
+        Returns:
+            numpy.ndarray: boolean array with an entry per tile, or None if the store isnt split into tiles
+        """
+
+        return None
+
+
+class LazyPheromoneField(PheromoneField):
+    """
+    pheromone store that never touches the grid to decay it
+    each cell remembers the decay step it was last marked on and its level is worked out when it is read
+    as max(0, PHEROMONE_STEPS - (steps since it was marked)), which is exactly what the eager field holds
+    so a decay step only moves a counter on and the cost of pheromones is only in dropping and reading them
+    """
+
+    mode = "lazy"
+
+    def allocate(self):
+        """
+        creates the storage for the pheromones
+        one layer per colony holding the decay step each cell was last marked on
+        """
+
+        # the number of decay steps that have happened
+        self.clock = 0
+        # cells start as if they were marked long enough ago to have faded away
+        self.marked = np.full((len(self.colours), self.rows, self.cols), -PHEROMONE_STEPS, dtype=np.int64)
+
+    def drop(self, colour, position):
+        """
+        marks a cell with the current decay step for a colour, see PheromoneField.drop
+        """
+
+        x, y = position
+        self.marked[self.layers[colour], x, y] = self.clock
+        if self.drops is not None:
+            self.note_drops(self.layers[colour], x, y)
+
+    def drop_many(self, layers, xs, ys):
+        """
+        marks a batch of cells with the current decay step, see PheromoneField.drop_many
+        """
+
+        self.marked[layers, xs, ys] = self.clock
+        if self.drops is not None:
+            self.note_drops(layers, xs, ys)
+
+    def steps_at(self, layers, xs, ys):
+        """
+        works out the decay steps left in cells from when they were marked, see PheromoneField.steps_at
+        """
+
+        return np.maximum(PHEROMONE_STEPS - (self.clock - self.marked[layers, xs, ys]), 0)
+
+    def window(self, layer, x0, x1, y0, y1):
+        """
+        works out the decay steps left in a rectangle of one layer, see PheromoneField.window
+        """
+
+        steps = PHEROMONE_STEPS - (self.clock - self.marked[layer, x0:x1, y0:y1])
+        return np.maximum(steps, 0).astype(np.uint8)
+
+    def decay(self):
+        """
+        fades every pheromone by one decay step by moving the clock on
+        """
+
+        self.clock += 1
+
+    def get_state(self):
+        """
+        gets the clock and marked cells, see PheromoneField.get_state
+        """
+
+        return {"mode": self.mode, "clock": self.clock}, {"marked": self.marked}
+
+    def set_state(self, values, arrays):
+        """
+        restores the clock and marked cells, see PheromoneField.set_state
+        """
+
+        self.clock = values["clock"]
+        self.marked = arrays["marked"]
+
+
+class SparsePheromoneField(PheromoneField):
+    """
+    pheromone store for very large worlds where trails only cover a tiny part of the map
+    only cells holding pheromone are stored, in a dict per colony keyed by flat cell index
+    levels are worked out from when a cell was marked like the lazy field, so the results are the same as the eager one
+    every drop also goes on an expiry queue and each decay step removes the cells that have faded away
+    so memory and decay cost grow with the length of the trails instead of the size of the world
+
+    drops always expire PHEROMONE_STEPS after they happen so the queue is already in expiry order
+    and a plain fifo queue does the job of a heap
+    """
+
+    mode = "sparse"
+
+    def allocate(self):
+        """
+        creates the storage for the pheromones
+        an empty dict of marked cells for each colony and an empty expiry queue
+        """
+
+        # the number of decay steps that have happened
+        self.clock = 0
+        # flat cell index -> decay step it was last marked on, one dict per layer
+        self.cells = [{} for _ in self.colours]
+        # (decay step it expires on, layer, flat cell index) in the order they were dropped
+        self.expiry = deque()
+
+    @property
+    def active(self):
+        """
+        the number of cells holding pheromone across all colonies
+        """
+        return sum(len(cells) for cells in self.cells)
+
+    def drop(self, colour, position):
+        """
+        marks a cell with the current decay step for a colour, see PheromoneField.drop
+        """
+
+        layer = self.layers[colour]
+        cell = position[0] * self.cols + position[1]
+        self.cells[layer][cell] = self.clock
+        self.expiry.append((self.clock + PHEROMONE_STEPS, layer, cell))
+        if self.drops is not None:
+            self.note_drops(layer, *position)
+
+    def drop_many(self, layers, xs, ys):
+        """
+        marks a batch of cells with the current decay step, see PheromoneField.drop_many
+        """
+
+        layers, cells = np.broadcast_arrays(layers, np.asarray(xs) * self.cols + ys)
+        expires = self.clock + PHEROMONE_STEPS
+        for layer, cell in zip(layers.ravel().tolist(), cells.ravel().tolist()):
+            self.cells[layer][cell] = self.clock
+            self.expiry.append((expires, layer, cell))
+        if self.drops is not None:
+            self.note_drops(layers, xs, ys)
+
+    def steps_at(self, layers, xs, ys):
+        """
+        works out the decay steps left in cells from when they were marked, see PheromoneField.steps_at
+        """
+
+        fresh = PHEROMONE_STEPS - self.clock
+        if np.ndim(xs) == 0 and np.ndim(layers) == 0:
+            marked = self.cells[layers].get(xs * self.cols + ys)
+            return 0 if marked is None else fresh + marked
+
+        layers, cells = np.broadcast_arrays(layers, np.asarray(xs) * self.cols + ys)
+        steps = np.fromiter(
+            (fresh + self.cells[layer][cell] if cell in self.cells[layer] else 0
+             for layer, cell in zip(layers.ravel().tolist(), cells.ravel().tolist())),
+            dtype=np.int64, count=cells.size,
+        )
+        return steps.reshape(cells.shape)
+
+    def window(self, layer, x0, x1, y0, y1):
+        """
+        works out the decay steps left in a rectangle of one layer, see PheromoneField.window
+        looks up each cell of small rectangles, and only goes through the marked cells for big ones
+        """
+
+        steps = np.zeros((x1 - x0, y1 - y0), dtype=np.uint8)
+        cells = self.cells[layer]
+        fresh = PHEROMONE_STEPS - self.clock
+
+        if steps.size <= len(cells):
+            for x in range(x0, x1):
+                row = x * self.cols
+                for y in range(y0, y1):
+                    marked = cells.get(row + y)
+                    if marked is not None:
+                        steps[x - x0, y - y0] = fresh + marked
+            return steps
+
+        for cell, marked in cells.items():
+            x, y = divmod(cell, self.cols)
+            if x0 <= x < x1 and y0 <= y < y1:
+                steps[x - x0, y - y0] = fresh + marked
+        return steps
+
+    def decay(self):
+        """
+        fades every pheromone by one decay step and removes the cells that have faded away
+        """
+
+        self.clock += 1
+        expiry = self.expiry
+        while expiry and expiry[0][0] <= self.clock:
+            expires, layer, cell = expiry.popleft()
+            # cells marked again since this drop have a later entry further back in the queue
+            if self.cells[layer].get(cell) == expires - PHEROMONE_STEPS:
+                del self.cells[layer][cell]
+
+    def get_state(self):
+        """
+        gets the clock, marked cells and expiry queue as flat arrays, see PheromoneField.get_state
+        """
+
+        layers, cells, marked = [], [], []
+        for layer, layer_cells in enumerate(self.cells):
+            layers.extend([layer] * len(layer_cells))
+            cells.extend(layer_cells)
+            marked.extend(layer_cells.values())
+        expiry = np.array(self.expiry, dtype=np.int64).reshape(-1, 3)
+
+        return {"mode": self.mode, "clock": self.clock}, {
+            "layers": np.array(layers, dtype=np.int64),
+            "cells": np.array(cells, dtype=np.int64),
+            "marked": np.array(marked, dtype=np.int64),
+            "expiry": expiry,
+        }
+
+    def set_state(self, values, arrays):
+        """
+        rebuilds the marked cells and expiry queue from flat arrays, see PheromoneField.set_state
+        """
+
+        self.clock = values["clock"]
+        self.cells = [{} for _ in self.colours]
+        for layer, cell, marked in zip(arrays["layers"].tolist(), arrays["cells"].tolist(), arrays["marked"].tolist()):
+            self.cells[layer][cell] = marked
+        self.expiry = deque(map(tuple, arrays["expiry"].tolist()))
+
+
+class TiledPheromoneField(PheromoneField):
+    """
+    pheromone store for very large worlds that only keeps the parts of the world that have been marked recently
+    the world is split into TILE_SIZE x TILE_SIZE tiles, which hold decay steps left like the eager field
+    a tile is given memory the first time pheromone is dropped on it and given back once all of it has faded,
+    so pheromone memory and decay cost grow with the area the ants are marking instead of the size of the world
+    (the neighbour table, homing and scent fields are still whole-world arrays, see benchmark.py --memory)
+
+    tiles in use are packed at the start of one pool array so decaying them all is still one array operation,
+    when a tile is given back the last tiles are moved into the gap, and the pool halves once it is mostly empty
+    a tile is empty exactly PHEROMONE_STEPS decay steps after its last drop, so finding them never scans the cells
+    """
+
+    mode = "tiled"
+    tile_size = TILE_SIZE
+
+    def allocate(self):
+        """
+        creates the storage for the pheromones
+        a slot for every tile of the world, all empty, and a small pool of tiles to fill
+        """
+
+        self.tile_rows = -(-self.rows // TILE_SIZE)
+        self.tile_cols = -(-self.cols // TILE_SIZE)
+        # the number of decay steps that have happened
+        self.clock = 0
+        # slot in the pool of every tile of the world, -1 for tiles with no pheromone
+        self.slots = np.full(self.tile_rows * self.tile_cols, -1, dtype=np.int64)
+        # how many tiles at the start of the pool are in use
+        self.used = 0
+        self.resize(MIN_TILES)
+
+    def resize(self, capacity):
+        """
+        changes how many tiles the pool has room for, keeping the tiles in use
+
+        Args:
+            capacity (int): the number of tiles, at least the number in use
+        """
+
+        used = self.used
+        pool = np.zeros((capacity, len(self.colours), TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+        # the tile held in each slot and the decay step it was last dropped on
+        owners = np.full(capacity, -1, dtype=np.int64)
+        dropped = np.zeros(capacity, dtype=np.int64)
+        if used:
+            pool[:used] = self.pool[:used]
+            owners[:used] = self.owners[:used]
+            dropped[:used] = self.dropped[:used]
+        self.pool, self.owners, self.dropped = pool, owners, dropped
+
+    def tiles_of(self, xs, ys):
+        """
+        gets the tile each cell is in
+
+        Args:
+            xs (int or numpy.ndarray): x coordinates of the cells
+            ys (int or numpy.ndarray): y coordinates of the cells
+
+        Returns:
+            int or numpy.ndarray: index of each cells tile in self.slots
+        """
+
+        return (xs // TILE_SIZE) * self.tile_cols + ys // TILE_SIZE
+
+    def claim(self, tiles):
+        """
+        gives empty tiles a slot in the pool so pheromone can be dropped on them
+
+        Args:
+            tiles (numpy.ndarray): tiles about to be marked, any that already have a slot are left alone
+        """
+
+        new = np.unique(tiles[self.slots[tiles] < 0])
+        if new.size == 0:
+            return
+        capacity = len(self.owners)
+        if self.used + new.size > capacity:
+            while self.used + new.size > capacity:
+                capacity *= 2
+            self.resize(capacity)
+        slots = np.arange(self.used, self.used + new.size)
+        # slots past the tiles in use can still hold a tile that was moved out of them
+        self.pool[slots] = 0
+        self.owners[slots] = new
+        self.slots[new] = slots
+        self.used += new.size
+
+    def release(self, slots):
+        """
+        gives tiles that have faded away back to the pool, moving the last tiles in use into the gaps
+
+        Args:
+            slots (numpy.ndarray): the slots to give back, in order
+        """
+
+        self.slots[self.owners[slots]] = -1
+        keep = self.used - slots.size
+        # gaps inside the tiles that are kept are filled with kept tiles from past the end
+        holes = slots[slots < keep]
+        movers = np.setdiff1d(np.arange(keep, self.used), slots)
+        self.pool[holes] = self.pool[movers]
+        self.owners[holes] = self.owners[movers]
+        self.dropped[holes] = self.dropped[movers]
+        self.slots[self.owners[holes]] = holes
+        self.used = keep
+
+        capacity = len(self.owners)
+        if capacity > MIN_TILES and keep <= capacity // 4:
+            self.resize(max(capacity // 2, MIN_TILES))
+
+    def drop(self, colour, position):
+        """
+        sets a cell to full strength for a colour, see PheromoneField.drop
+        """
+
+        x, y = position
+        self.drop_many(self.layers[colour], np.array([x]), np.array([y]))
+
+    def drop_many(self, layers, xs, ys):
+        """
+        sets a batch of cells to full strength, making room for any tiles that were empty, see PheromoneField.drop_many
+        """
+
+        layers, xs, ys = np.broadcast_arrays(layers, xs, ys)
+        tiles = self.tiles_of(xs, ys)
+        self.claim(tiles)
+        slots = self.slots[tiles]
+        self.pool[slots, layers, xs % TILE_SIZE, ys % TILE_SIZE] = PHEROMONE_STEPS
+        self.dropped[slots] = self.clock
+        if self.drops is not None:
+            self.note_drops(layers, xs, ys)
+
+    def steps_at(self, layers, xs, ys):
+        """
+        gets the decay steps left in cells, 0 in empty tiles, see PheromoneField.steps_at
+        """
+
+        slots = self.slots[self.tiles_of(xs, ys)]
+        steps = self.pool[np.maximum(slots, 0), layers, xs % TILE_SIZE, ys % TILE_SIZE]
+        return np.where(slots >= 0, steps, 0)
+
+    def window(self, layer, x0, x1, y0, y1):
+        """
+        gets the decay steps left in a rectangle of one layer, copied out of the tiles it covers, see PheromoneField.window
+        """
+
+        steps = np.zeros((x1 - x0, y1 - y0), dtype=np.uint8)
+        if x0 >= x1 or y0 >= y1:
+            return steps
+        row0, col0 = x0 // TILE_SIZE, y0 // TILE_SIZE
+        slots = self.slots.reshape(self.tile_rows, self.tile_cols)[row0:(x1 - 1) // TILE_SIZE + 1, col0:(y1 - 1) // TILE_SIZE + 1]
+        for row, col in zip(*np.nonzero(slots >= 0)):
+            # the part of the tile inside the rectangle
+            tile_x, tile_y = (row0 + row) * TILE_SIZE, (col0 + col) * TILE_SIZE
+            ax0, ax1 = max(x0, tile_x), min(x1, tile_x + TILE_SIZE)
+            ay0, ay1 = max(y0, tile_y), min(y1, tile_y + TILE_SIZE)
+            steps[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = self.pool[
+                slots[row, col], layer, ax0 - tile_x:ax1 - tile_x, ay0 - tile_y:ay1 - tile_y
+            ]
+        return steps
+
+    def decay(self):
+        """
+        fades the tiles in use by one decay step and gives back the ones that have faded away
+        """
+
+        self.clock += 1
+        live = self.pool[:self.used]
+        np.maximum(live, 1, out=live)
+        np.subtract(live, 1, out=live)
+        faded = np.flatnonzero(self.clock - self.dropped[:self.used] >= PHEROMONE_STEPS)
+        if faded.size:
+            self.release(faded)
+
+    def active_tiles(self):
+        """
+        gets which tiles hold pheromone, see PheromoneField.active_tiles
+        """
+
+        return (self.slots >= 0).reshape(self.tile_rows, self.tile_cols)
+
+    def get_state(self):
+        """
+        gets the clock and the tiles in use, see PheromoneField.get_state
+        """
+
+        used = self.used
+        return {"mode": self.mode, "clock": self.clock}, {
+            "tiles": self.owners[:used],
+            "pool": self.pool[:used],
+            "dropped": self.dropped[:used],
+        }
+
+    def set_state(self, values, arrays):
+        """
+        puts the saved tiles back into a pool of their own, see PheromoneField.set_state
+        """
+
+        self.clock = values["clock"]
+        tiles = np.asarray(arrays["tiles"])
+        self.slots = np.full(self.tile_rows * self.tile_cols, -1, dtype=np.int64)
+        self.used = 0
+        capacity = MIN_TILES
+        while capacity < tiles.size:
+            capacity *= 2
+        self.resize(capacity)
+        self.used = tiles.size
+        self.pool[:self.used] = arrays["pool"]
+        self.owners[:self.used] = tiles
+        self.dropped[:self.used] = arrays["dropped"]
+        self.slots[tiles] = np.arange(self.used)
+
+
+# the pheromone stores that the environment can be set up with
+PHEROMONE_MODES = {
+    "eager": PheromoneField,
+    "lazy": LazyPheromoneField,
+    "sparse": SparsePheromoneField,
+    "tiled": TiledPheromoneField,
+}
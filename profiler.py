@@ -0,0 +1,156 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class TickProfiler:
+    """
+    class that records how long each phase of a frame takes and counts what the ants do
+    timings and counters build up over a frame and are stored as one row of a rolling time series when the frame ends
+    a frame is one pass of the window loop, or one tick when running headless
+
+    it is attached with environment.profiler, the ants, environment and simulation only do any
+    profiling work when it is set so there is next to no cost when it is not being used
+    the window records from its own thread while a SimulationRunner records from the simulations,
+    so everything that touches the frame in progress or the time series holds a lock
+    """
+
+    def __init__(self, history=600):
+        """
+        initialises an empty profiler
+
+        Args:
+            history (int, optional): number of frames kept in the time series. Defaults to 600.
+        """
+
+        self.frames = deque(maxlen=history)
+        self.frame = 0
+        self.started = time.perf_counter()
+        # when the last lap ended, see lap
+        self.last_lap = self.started
+        # seconds spent in each phase and the counters for the frame in progress
+        self.phases = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        times a phase of the frame, phases with the same name in a frame are added up
+
+        Args:
+            name (str): name of the phase
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def lap(self, name):
+        """
+        adds the time since the last lap, or since the frame started, to a phase
+        used to split a loop into back to back phases without wrapping each one
+
+        Args:
+            name (str): name of the phase that has just finished
+        """
+
+        now = time.perf_counter()
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + now - self.last_lap
+            self.last_lap = now
+
+    def count(self, name, amount=1):
+        """
+        adds to one of the frames counters
+
+        Args:
+            name (str): name of the counter
+            amount (int, optional): how much to add. Defaults to 1.
+        """
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_frame(self, tick=None):
+        """
+        stores the frame in progress in the time series and starts a new one
+
+        Args:
+            tick (int, optional): the simulation tick at the end of the frame. Defaults to None.
+        """
+
+        with self.lock:
+            self.frames.append({
+                "frame": self.frame,
+                "time": time.perf_counter() - self.started,
+                "tick": tick,
+                "phases": {name: seconds * 1000 for name, seconds in self.phases.items()},
+                "counters": self.counters,
+            })
+            self.frame += 1
+            self.phases = {}
+            self.counters = {}
+            self.last_lap = time.perf_counter()
+
+    def summary(self, frames=60):
+        """
+        averages the most recent frames, used for the stats overlay
+
+        Args:
+            frames (int, optional): how many frames to average over. Defaults to 60.
+
+        Returns:
+            tuple: dicts of average milliseconds per phase and average count per counter, per frame
+        """
+
+        # stored frames are never changed again, so only taking the list needs the lock
+        with self.lock:
+            recent = list(self.frames)[-frames:]
+        phases = {}
+        counters = {}
+        for frame in recent:
+            for name, milliseconds in frame["phases"].items():
+                phases[name] = phases.get(name, 0.0) + milliseconds
+            for name, amount in frame["counters"].items():
+                counters[name] = counters.get(name, 0) + amount
+        n = max(len(recent), 1)
+        return (
+            {name: total / n for name, total in phases.items()},
+            {name: total / n for name, total in counters.items()},
+        )
+
+    def export(self, path):
+        """
+        writes the time series to a file, as csv if the path ends in .csv and json otherwise
+        the csv has a column for every phase (in milliseconds) and counter seen in the series
+
+        Args:
+            path (str): the file to write
+        """
+
+        with self.lock:
+            frames = list(self.frames)
+        if not path.endswith(".csv"):
+            with open(path, "w") as file:
+                json.dump(frames, file)
+            return
+
+        phases = sorted({name for frame in frames for name in frame["phases"]})
+        counters = sorted({name for frame in frames for name in frame["counters"]})
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame", "time", "tick"] + [f"{name}_ms" for name in phases] + counters)
+            for frame in frames:
+                writer.writerow(
+                    [frame["frame"], f"{frame['time']:.6f}", frame["tick"]]
+                    + [f"{frame['phases'].get(name, 0.0):.4f}" for name in phases]
+                    + [frame["counters"].get(name, 0) for name in counters]
+                )
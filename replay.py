@@ -0,0 +1,620 @@
+import json
+import queue
+import struct
+import threading
+import zlib
+from collections import namedtuple
+import numpy as np
+from food import Food, FOOD_TYPES
+from nest import Nest
+from spatial import SpatialHash
+from topology import GridTopology
+
+# replay files start with the magic bytes and the length of the json header
+MAGIC = b"ANTREPL\x01"
+PREFIX = struct.Struct("<8sQ")
+# each chunk starts with the first and last tick in it and its compressed length
+CHUNK = struct.Struct("<qqQ")
+VERSION = 2
+
+# food types are saved as their index in this list
+FOOD_TYPE_NAMES = list(FOOD_TYPES)
+
+# what playback draws for each ant, only what the renderer needs
+ReplayAnt = namedtuple("ReplayAnt", ["position", "colour", "direction"])
+
+
+def pack(meta, arrays):
+    """
+    packs a dict of arrays into one compressed block
+    the block is a json table of each arrays dtype, shape and offset followed by the raw arrays
+
+    Args:
+        meta (dict): extra json values to keep with the arrays
+        arrays (dict): name -> numpy array
+
+    Returns:
+        bytes: the compressed block
+    """
+
+    table = []
+    blobs = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        table.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        blobs.append(array.tobytes())
+        offset += array.nbytes
+    head = json.dumps({**meta, "sections": table}).encode()
+    return zlib.compress(struct.pack("<Q", len(head)) + head + b"".join(blobs), 6)
+
+
+def unpack(block):
+    """
+    unpacks a block made by pack
+
+    Args:
+        block (bytes): the compressed block
+
+    Returns:
+        tuple: the json values and a dict of name -> numpy array
+    """
+
+    data = zlib.decompress(block)
+    (head_length,) = struct.unpack_from("<Q", data)
+    meta = json.loads(data[8:8 + head_length])
+    start = 8 + head_length
+    arrays = {}
+    for entry in meta.pop("sections"):
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        arrays[entry["name"]] = np.frombuffer(
+            data, dtype=dtype, count=count, offset=start + entry["offset"]
+        ).reshape(entry["shape"])
+    return meta, arrays
+
+
+def ant_arrays(simulation):
+    """
+    gets the position, direction and colony of every ant as arrays, from either engine
+
+    Args:
+        simulation (Simulation): the simulation being recorded
+
+    Returns:
+        tuple: x, y, direction and colony index arrays
+    """
+
+    swarm = simulation.swarm
+    if swarm is not None:
+        return swarm.x.astype(np.int32), swarm.y.astype(np.int32), swarm.direction.astype(np.float32), swarm.colony
+
+    nest_index = {id(nest): index for index, nest in enumerate(simulation.nests)}
+    ants = simulation.ants
+    x = np.array([ant.position[0] for ant in ants], dtype=np.int32)
+    y = np.array([ant.position[1] for ant in ants], dtype=np.int32)
+    direction = np.array([ant.direction for ant in ants], dtype=np.float32)
+    colony = np.array([nest_index[id(ant.nest)] for ant in ants], dtype=np.int64)
+    return x, y, direction, colony
+
+
+def pheromone_grid(pheromones):
+    """
+    gets every colours pheromones as one (colour, row, column) array of decay steps left
+
+    Args:
+        pheromones (PheromoneField): the pheromone field of any storage mode
+
+    Returns:
+        numpy.ndarray: the stacked layers
+    """
+
+    return np.stack([pheromones.layer(colour) for colour in pheromones.colours])
+
+
+def decay(grid):
+    """
+    decays a stacked pheromone grid by one tick in place, the same as the eager pheromone field does
+
+    Args:
+        grid (numpy.ndarray): decay steps left for each layer and cell
+    """
+
+    np.maximum(grid, 1, out=grid)
+    np.subtract(grid, 1, out=grid)
+
+
+class ReplayRecorder:
+    """
+    tick hook that records a simulation to a replay file
+    every tick only what changed is kept: ants that moved or turned, food that was spawned, eaten or removed,
+    the nest totals, squares that were blocked or opened and the pheromone cells that did anything other than decay by one step
+    the pheromone cells are the ones dropped on that tick, which the store keeps track of while recording,
+    so a tick costs the same however big the world is
+    the ticks are grouped into chunks that each start with a full keyframe, so playback can jump to any tick
+    finished chunks are compressed and written on a background thread so the simulation is not held up
+    """
+
+    def __init__(self, path, simulation, keyframe_every=100):
+        """
+        opens the replay file, writes its header and records the simulation as it is now
+        add the recorder to Simulation.tick_hooks to record each tick after this
+
+        Args:
+            path (str): where to write the replay
+            simulation (Simulation): the simulation to record
+            keyframe_every (int, optional): ticks in each chunk, playback seeks to the keyframe before a tick. Defaults to 100.
+        """
+
+        self.keyframe_every = keyframe_every
+        self.file = open(path, "wb")
+
+        environment = self.environment = simulation.environment
+        header = json.dumps({
+            "version": VERSION,
+            "rows": environment.rows,
+            "cols": environment.cols,
+            "nests": [{"position": nest.position, "colour": nest.colour} for nest in simulation.nests],
+            "pheromone_colours": environment.pheromones.colours,
+            "wrap": environment.topology.wrap,
+            "blocked": environment.topology.blocked_cells,
+            "keyframe_every": keyframe_every,
+        }).encode()
+        self.file.write(PREFIX.pack(MAGIC, len(header)))
+        self.file.write(header)
+
+        # the stores keep the drops and obstacle changes for each tick until close
+        environment.pheromones.track_drops()
+        environment.topology.track_changes()
+
+        # chunks waiting to be compressed and written, None tells the writer to stop
+        self.chunks = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="replay-writer", daemon=True)
+        self.thread.start()
+
+        # replay ids of the food being tracked, so food can be told apart without any id of its own
+        self.food_ids = {}
+        self.next_food_id = 0
+        self.keyframe(simulation)
+
+    def keyframe(self, simulation):
+        """
+        starts a new chunk with the full state of the simulation
+
+        Args:
+            simulation (Simulation): the simulation being recorded
+        """
+
+        environment = simulation.environment
+        self.first_tick = environment.tick
+        self.ticks = 0
+
+        self.x, self.y, self.direction, colony = ant_arrays(simulation)
+        self.food_hp = {}
+        for food in environment.food_items:
+            if food not in self.food_ids:
+                self.food_ids[food] = self.next_food_id
+                self.next_food_id += 1
+            self.food_hp[food] = food.hp
+        self.nest_food = np.array([nest.total_food for nest in simulation.nests], dtype=np.int64)
+        # everything up to now is in the keyframe
+        environment.pheromones.take_drops()
+        environment.topology.take_changes()
+        blocked = environment.topology.blocked_cells
+
+        foods = list(self.food_hp)
+        self.key = {
+            "key.ant_x": self.x, "key.ant_y": self.y, "key.ant_direction": self.direction,
+            "key.ant_colony": colony.astype(np.int8),
+            "key.food_id": np.array([self.food_ids[food] for food in foods], dtype=np.int64),
+            "key.food_x": np.array([food.position[0] for food in foods], dtype=np.int32),
+            "key.food_y": np.array([food.position[1] for food in foods], dtype=np.int32),
+            "key.food_type": np.array([FOOD_TYPE_NAMES.index(food.food_type) for food in foods], dtype=np.int8),
+            "key.food_hp": np.array([food.hp for food in foods], dtype=np.int32),
+            "key.nest_food": self.nest_food,
+            "key.pheromones": pheromone_grid(environment.pheromones),
+            "key.blocked": np.array(blocked, dtype=np.int32).reshape(len(blocked), 2),
+        }
+        # per tick changes, each kind is a list of per tick arrays joined up when the chunk is finished
+        self.deltas = {name: [] for name in (
+            "ants.count", "ants.index", "ants.x", "ants.y", "ants.direction",
+            "spawn.count", "spawn.id", "spawn.x", "spawn.y", "spawn.type", "spawn.hp",
+            "hp.count", "hp.id", "hp.hp",
+            "removed.count", "removed.id",
+            "nest_food",
+            "blocked.count", "blocked.x", "blocked.y", "blocked.blocked",
+            "pheromones.count", "pheromones.cell", "pheromones.steps",
+        )}
+
+    def __call__(self, simulation):
+        """
+        records the tick that has just run
+
+        Args:
+            simulation (Simulation): the simulation being recorded
+        """
+
+        if self.ticks + 1 >= self.keyframe_every:
+            self.finish_chunk()
+            self.keyframe(simulation)
+            return
+
+        self.ticks += 1
+        deltas = self.deltas
+        environment = simulation.environment
+
+        # ants that moved or turned
+        x, y, direction, _ = ant_arrays(simulation)
+        changed = np.flatnonzero((x != self.x) | (y != self.y) | (direction != self.direction))
+        deltas["ants.count"].append(len(changed))
+        deltas["ants.index"].append(changed.astype(np.int32))
+        deltas["ants.x"].append(x[changed])
+        deltas["ants.y"].append(y[changed])
+        deltas["ants.direction"].append(direction[changed])
+        self.x, self.y, self.direction = x, y, direction
+
+        # food that is new, has been eaten or has gone
+        spawned = []
+        eaten = []
+        food_hp = {}
+        for food in environment.food_items:
+            hp = self.food_hp.get(food)
+            if hp is None:
+                self.food_ids[food] = self.next_food_id
+                self.next_food_id += 1
+                spawned.append(food)
+            elif hp != food.hp:
+                eaten.append(food)
+            food_hp[food] = food.hp
+        removed = [self.food_ids.pop(food) for food in self.food_hp if food not in food_hp]
+        self.food_hp = food_hp
+
+        deltas["spawn.count"].append(len(spawned))
+        deltas["spawn.id"].append(np.array([self.food_ids[food] for food in spawned], dtype=np.int64))
+        deltas["spawn.x"].append(np.array([food.position[0] for food in spawned], dtype=np.int32))
+        deltas["spawn.y"].append(np.array([food.position[1] for food in spawned], dtype=np.int32))
+        deltas["spawn.type"].append(np.array([FOOD_TYPE_NAMES.index(food.food_type) for food in spawned], dtype=np.int8))
+        deltas["spawn.hp"].append(np.array([food.hp for food in spawned], dtype=np.int32))
+        deltas["hp.count"].append(len(eaten))
+        deltas["hp.id"].append(np.array([self.food_ids[food] for food in eaten], dtype=np.int64))
+        deltas["hp.hp"].append(np.array([food.hp for food in eaten], dtype=np.int32))
+        deltas["removed.count"].append(len(removed))
+        deltas["removed.id"].append(np.array(removed, dtype=np.int64))
+
+        # nest totals are only a few numbers so they are kept every tick
+        deltas["nest_food"].append(np.array([nest.total_food for nest in simulation.nests], dtype=np.int64))
+
+        # squares blocked or opened, in order as the same square can change more than once in a tick
+        changes = environment.topology.take_changes()
+        deltas["blocked.count"].append(len(changes))
+        deltas["blocked.x"].append(np.array([x for x, _, _ in changes], dtype=np.int32))
+        deltas["blocked.y"].append(np.array([y for _, y, _ in changes], dtype=np.int32))
+        deltas["blocked.blocked"].append(np.array([blocked for _, _, blocked in changes], dtype=np.int8))
+
+        # pheromones decay by one step every tick, so only the cells dropped on are kept, at the level they are at now
+        pheromones = environment.pheromones
+        cells = pheromones.take_drops()
+        layers, rest = np.divmod(cells, pheromones.rows * pheromones.cols)
+        xs, ys = np.divmod(rest, pheromones.cols)
+        deltas["pheromones.count"].append(len(cells))
+        deltas["pheromones.cell"].append(cells)
+        deltas["pheromones.steps"].append(np.asarray(pheromones.steps_at(layers, xs, ys), dtype=np.uint8))
+
+    def finish_chunk(self):
+        """
+        hands the chunk recorded so far to the background writer
+        """
+
+        arrays = dict(self.key)
+        for name, parts in self.deltas.items():
+            if name.endswith(".count"):
+                arrays[name] = np.array(parts, dtype=np.int64)
+            elif name == "nest_food":
+                arrays[name] = np.array(parts, dtype=np.int64).reshape(len(parts), len(self.nest_food))
+            elif parts:
+                arrays[name] = np.concatenate(parts)
+            else:
+                arrays[name] = np.zeros(0, dtype=np.uint8 if name == "pheromones.steps" else np.int64)
+        self.chunks.put((self.first_tick, self.first_tick + self.ticks, arrays))
+
+    def run(self):
+        """
+        compresses and writes chunks as they come in until the recorder is closed
+        """
+
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            first_tick, last_tick, arrays = chunk
+            block = pack({"first_tick": first_tick, "last_tick": last_tick}, arrays)
+            self.file.write(CHUNK.pack(first_tick, last_tick, len(block)))
+            self.file.write(block)
+
+    def close(self):
+        """
+        writes the last chunk, waits for the writer to finish and closes the file
+        """
+
+        self.finish_chunk()
+        self.chunks.put(None)
+        self.thread.join()
+        self.file.close()
+        self.environment.pheromones.track_drops(False)
+        self.environment.topology.track_changes(False)
+
+
+class ReplayPheromones:
+    """
+    the pheromone layers of a replay frame, with the parts of the PheromoneField api the renderer uses
+    """
+
+    def __init__(self, colours, grid):
+        """
+        Args:
+            colours (list): colour codes of the layers
+            grid (numpy.ndarray): decay steps left for each layer and cell
+        """
+
+        self.colours = colours
+        self.layers = {colour: index for index, colour in enumerate(colours)}
+        self.grid = grid
+
+    def layer(self, colour):
+        """
+        gets a colours whole layer for drawing
+
+        Args:
+            colour (tuple): colour code of the pheromone
+
+        Returns:
+            numpy.ndarray: decay steps left for every cell
+        """
+
+        return self.grid[self.layers[colour]]
+
+    def window(self, layer, x0, x1, y0, y1):
+        """
+        gets the decay steps left in a rectangle of one layer, see PheromoneField.window
+        """
+
+        return self.grid[layer, x0:x1, y0:y1]
+
+    def active_tiles(self):
+        """
+        the layers arent split into tiles, see PheromoneField.active_tiles
+        """
+
+        return None
+
+
+class ReplayFrame:
+    """
+    the simulation as it was at one tick of a replay
+    it has the parts of the Environment api that the renderer uses, so it can be drawn in place of one
+    the arrays belong to the replay and change when it seeks, so a frame should be drawn before seeking again
+    """
+
+    def __init__(self, replay):
+        """
+        Args:
+            replay (Replay): the replay at the tick to show
+        """
+
+        self.tick = replay.tick
+        self.rows = replay.rows
+        self.cols = replay.cols
+        self.topology = replay.topology
+        self.pheromones = ReplayPheromones(replay.pheromone_colours, replay.pheromones)
+        self.food_items = list(replay.food.values())
+        self.food_index = replay.food_index
+        self.nests = [
+            Nest.at(nest["position"], nest["colour"], int(total)) for nest, total in zip(replay.nest_info, replay.nest_food)
+        ]
+        self.ant_x, self.ant_y, self.ant_direction, self.ant_colony = (
+            replay.ant_x, replay.ant_y, replay.ant_direction, replay.ant_colony
+        )
+        self._ants = None
+
+    def food_in(self, x0, x1, y0, y1):
+        """
+        gets the food in a rectangle of squares, see Environment.food_in
+        """
+
+        return self.food_index.in_area(x0, x1, y0, y1)
+
+    @property
+    def ants(self):
+        """
+        the ants as tuples, only made when they are asked for as the renderer draws from the arrays
+        """
+
+        if self._ants is None:
+            colours = [nest.colour for nest in self.nests]
+            self._ants = [
+                ReplayAnt((x, y), colours[colony], direction)
+                for x, y, direction, colony in zip(
+                    self.ant_x.tolist(), self.ant_y.tolist(), self.ant_direction.tolist(), self.ant_colony.tolist()
+                )
+            ]
+        return self._ants
+
+
+class Replay:
+    """
+    reads a replay file and rebuilds the simulation at any recorded tick
+    seeking goes to the keyframe at the start of the chunk holding the tick and applies the changes after it,
+    moving forward inside the chunk already loaded only applies the ticks in between
+    """
+
+    def __init__(self, path):
+        """
+        reads the header of a replay file and finds where each chunk starts
+
+        Args:
+            path (str): the replay file
+        """
+
+        self.file = open(path, "rb")
+        magic, header_length = PREFIX.unpack(self.file.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an ant simulation replay")
+        header = json.loads(self.file.read(header_length))
+        if header["version"] != VERSION:
+            raise ValueError(f"unsupported replay version {header['version']}")
+
+        self.rows = header["rows"]
+        self.cols = header["cols"]
+        self.nest_info = header["nests"]
+        self.pheromone_colours = [tuple(colour) for colour in header["pheromone_colours"]]
+        blocked = np.zeros((self.rows, self.cols), dtype=bool)
+        for x, y in header["blocked"]:
+            blocked[x, y] = True
+        self.topology = GridTopology(self.rows, self.cols, header["wrap"], blocked)
+
+        # (first tick, last tick, offset) of every chunk, found by skipping from one chunk header to the next
+        self.index = []
+        while True:
+            chunk_header = self.file.read(CHUNK.size)
+            if len(chunk_header) < CHUNK.size:
+                break
+            first_tick, last_tick, length = CHUNK.unpack(chunk_header)
+            self.index.append((first_tick, last_tick, self.file.tell(), length))
+            self.file.seek(length, 1)
+        if not self.index:
+            raise ValueError(f"{path} has no recorded ticks")
+        self.first_ticks = [chunk[0] for chunk in self.index]
+
+        self.chunk = None
+        self.tick = None
+
+    @property
+    def first_tick(self):
+        return self.index[0][0]
+
+    @property
+    def last_tick(self):
+        return self.index[-1][1]
+
+    def load_chunk(self, number):
+        """
+        reads and unpacks a chunk and works out where each ticks changes start in its arrays
+
+        Args:
+            number (int): the chunk to load
+        """
+
+        _, _, offset, length = self.index[number]
+        self.file.seek(offset)
+        meta, arrays = unpack(self.file.read(length))
+        self.arrays = arrays
+        # start of each ticks changes in the joined up arrays, the first tick after the keyframe is 0
+        kinds = ("ants", "spawn", "hp", "removed", "pheromones", "blocked")
+        self.starts = {kind: np.concatenate(([0], np.cumsum(arrays[f"{kind}.count"]))) for kind in kinds}
+        self.chunk = number
+        self.keyframe()
+
+    def keyframe(self):
+        """
+        resets the state to the keyframe of the loaded chunk
+        """
+
+        arrays = self.arrays
+        self.tick = self.index[self.chunk][0]
+        self.ant_x = arrays["key.ant_x"].copy()
+        self.ant_y = arrays["key.ant_y"].copy()
+        self.ant_direction = arrays["key.ant_direction"].copy()
+        self.ant_colony = arrays["key.ant_colony"]
+        # replay food id -> food item, in the order the food was added, and the items indexed by where they are for drawing
+        self.food = {}
+        self.food_index = SpatialHash()
+        for food_id, x, y, food_type, hp in zip(*(arrays[f"key.food_{name}"].tolist() for name in ("id", "x", "y", "type", "hp"))):
+            self.add_food(food_id, Food((x, y), FOOD_TYPE_NAMES[food_type], hp))
+        self.nest_food = arrays["key.nest_food"]
+        self.pheromones = arrays["key.pheromones"].copy()
+        # only the squares that differ from the keyframe are changed, seeking is usually within a few chunks
+        topology = self.topology
+        blocked = set(map(tuple, arrays["key.blocked"].tolist()))
+        for position in set(topology.blocked_cells) ^ blocked:
+            topology.set_blocked(position, position in blocked)
+
+    def add_food(self, food_id, food):
+        """
+        starts tracking a food item
+
+        Args:
+            food_id (int): the items replay id
+            food (Food): the item
+        """
+
+        self.food[food_id] = food
+        self.food_index.insert(food, food.position)
+
+    def apply(self, tick):
+        """
+        applies the changes recorded for one tick of the loaded chunk
+
+        Args:
+            tick (int): the tick to apply, must be the one after the current tick
+        """
+
+        arrays = self.arrays
+        starts = self.starts
+        # position of this tick in the chunks per tick arrays
+        n = tick - self.index[self.chunk][0] - 1
+
+        part = slice(starts["ants"][n], starts["ants"][n + 1])
+        index = arrays["ants.index"][part]
+        self.ant_x[index] = arrays["ants.x"][part]
+        self.ant_y[index] = arrays["ants.y"][part]
+        self.ant_direction[index] = arrays["ants.direction"][part]
+
+        part = slice(starts["spawn"][n], starts["spawn"][n + 1])
+        for food_id, x, y, food_type, hp in zip(*(arrays[f"spawn.{name}"][part].tolist() for name in ("id", "x", "y", "type", "hp"))):
+            self.add_food(food_id, Food((x, y), FOOD_TYPE_NAMES[food_type], hp))
+        part = slice(starts["hp"][n], starts["hp"][n + 1])
+        for food_id, hp in zip(arrays["hp.id"][part].tolist(), arrays["hp.hp"][part].tolist()):
+            self.food[food_id].hp = hp
+        part = slice(starts["removed"][n], starts["removed"][n + 1])
+        for food_id in arrays["removed.id"][part].tolist():
+            food = self.food.pop(food_id)
+            self.food_index.remove(food, food.position)
+
+        self.nest_food = arrays["nest_food"][n]
+
+        part = slice(starts["blocked"][n], starts["blocked"][n + 1])
+        for x, y, blocked in zip(*(arrays[f"blocked.{name}"][part].tolist() for name in ("x", "y", "blocked"))):
+            self.topology.set_blocked((x, y), bool(blocked))
+
+        decay(self.pheromones)
+        part = slice(starts["pheromones"][n], starts["pheromones"][n + 1])
+        self.pheromones.ravel()[arrays["pheromones.cell"][part]] = arrays["pheromones.steps"][part]
+        self.tick = tick
+
+    def seek(self, tick):
+        """
+        moves the replay to a tick, clamped to the recorded ticks
+
+        Args:
+            tick (int): the tick to move to
+
+        Returns:
+            ReplayFrame: the simulation at that tick
+        """
+
+        tick = min(max(tick, self.first_tick), self.last_tick)
+        number = int(np.searchsorted(self.first_ticks, tick, side="right")) - 1
+        if number != self.chunk:
+            self.load_chunk(number)
+        elif tick < self.tick:
+            self.keyframe()
+        for next_tick in range(self.tick + 1, tick + 1):
+            self.apply(next_tick)
+        return ReplayFrame(self)
+
+    def close(self):
+        """
+        closes the replay file
+        """
+
+        self.file.close()
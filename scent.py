@@ -0,0 +1,98 @@
+import numpy as np
+
+# marks a square with no food in range, the field is 32 bit as it covers the whole world
+NO_FOOD = np.iinfo(np.int32).max
+
+
+class ScentField:
+    """
+    class holding which food item an ant on each square would sense, for one sensing range
+    every square stores the order the food was added to the environments food index in,
+    so sensing is one array lookup however big the sensing range is
+
+    where several items are in range the one added earliest is kept, the same one the food index finds first
+    the field is only changed when food is added or runs out, and only round that item
+    """
+
+    def __init__(self, topology, food_index, radius):
+        """
+        builds the field from the food already in the index
+
+        Args:
+            topology (GridTopology): how the squares of the world connect
+            food_index (SpatialHash): the environments index of food, used to find the items round one that runs out
+            radius (int): how many squares away food can be sensed
+        """
+
+        self.topology = topology
+        self.food_index = food_index
+        self.radius = radius
+        self.field = np.full((topology.rows, topology.cols), NO_FOOD, dtype=np.int32)
+        # order -> food item for everything in the field
+        self.foods = {}
+
+        for bucket in food_index.buckets.values():
+            for food, order in bucket.items():
+                self.add(food, order)
+
+    def add(self, food, order):
+        """
+        spreads a new food items scent over the squares in range of it
+
+        Args:
+            food (Food): the food item
+            order (int): the order it was added to the food index in
+        """
+
+        self.foods[order] = food
+        xs, ys = self.topology.window(food.position, self.radius)
+        self.field[xs, ys] = np.minimum(self.field[xs, ys], order)
+
+    def remove(self, food, order):
+        """
+        takes a food items scent away once it has been removed from the food index
+        squares that sensed it pick up the earliest other item in range, which can only be within twice the range
+
+        Args:
+            food (Food): the food item
+            order (int): the order it was added to the food index in
+        """
+
+        del self.foods[order]
+        xs, ys = self.topology.window(food.position, self.radius)
+        lost = self.field[xs, ys] == order
+        xs, ys = xs[lost], ys[lost]
+        self.field[xs, ys] = NO_FOOD
+        if not xs.size:
+            return
+
+        # items that could be in range of the squares that lost their scent, earliest first
+        nearby = {}
+        for centre in self.topology.wrapped_centres(food.position, 2 * self.radius):
+            for other_order, other in self.food_index.within(centre, 2 * self.radius):
+                nearby[other_order] = other
+        if not nearby:
+            return
+        orders = np.array(sorted(nearby), dtype=np.int32)
+        positions = np.array([nearby[other_order].position for other_order in orders.tolist()])
+
+        # the first item in range of each square, in the sorted order
+        dx, dy = self.topology.offset_many(xs[None, :], ys[None, :], positions[:, 0:1], positions[:, 1:2])
+        in_range = (np.abs(dx) <= self.radius) & (np.abs(dy) <= self.radius)
+        first = in_range.argmax(axis=0)
+        sensed = in_range[first, np.arange(xs.size)]
+        self.field[xs[sensed], ys[sensed]] = orders[first[sensed]]
+
+    def food_at(self, position):
+        """
+        gets the food an ant on a square would sense
+
+        Args:
+            position (tuple): coordinates of the square
+
+        Returns:
+            Food: the earliest added food item in range or None if there isnt one
+        """
+
+        order = self.field[position]
+        return None if order == NO_FOOD else self.foods[int(order)]
@@ -0,0 +1,58 @@
+class TimingWheel:
+    """
+    class that holds items until the tick they are due on
+    items go in the slot for their tick modulo the number of slots, so adding one and finding the ones
+    due on a tick only looks at one slot however many items are waiting
+    items due more than a full turn of the wheel away wait in their slot until the wheel comes round to them
+    """
+
+    def __init__(self, slots=64):
+        """
+        initialises an empty wheel
+
+        Args:
+            slots (int, optional): number of slots, best kept above the usual wait so items rarely go round twice. Defaults to 64.
+        """
+
+        self.slots = [[] for _ in range(slots)]
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, tick, item):
+        """
+        adds an item to be handed back on a tick
+
+        Args:
+            tick (int): the tick the item is due on
+            item: the item
+        """
+
+        self.slots[tick % len(self.slots)].append((tick, item))
+        self.count += 1
+
+    def pop_due(self, tick):
+        """
+        takes out the items that are due on a tick
+        this needs to be called for every tick in turn, items in a slot that is skipped wait for the next turn of the wheel
+
+        Args:
+            tick (int): the current tick
+
+        Returns:
+            list: the items due, in the order they were added
+        """
+
+        index = tick % len(self.slots)
+        slot = self.slots[index]
+        if not slot:
+            return []
+
+        due = [item for due_tick, item in slot if due_tick <= tick]
+        if len(due) < len(slot):
+            self.slots[index] = [(due_tick, item) for due_tick, item in slot if due_tick > tick]
+        else:
+            self.slots[index] = []
+        self.count -= len(due)
+        return due
@@ -0,0 +1,340 @@
+import argparse
+import random
+import time
+from contextlib import nullcontext
+from ant_agent import Ant_agent
+from environment import Environment
+from events import EventWriter, LEVELS, parse_sample
+from food import generate_random_food
+from nest import Nest
+from parallel import ParallelSwarm, SHARED_PHEROMONE_MODES
+from pheromones import PHEROMONE_MODES
+from scheduler import TimingWheel
+from swarm import AntSwarm
+from topology import GridTopology, random_obstacles
+from visited import MEMORY_LENGTH
+
+# how much simulated time one tick stands for in seconds
+TICK_SECONDS = 0.1
+# how much food a nest needs to collect to win
+WIN_FOOD = 50
+
+# colour codes dict for nests and ants
+COLOURS = {
+    "black": (0, 0, 0),
+    "red": (255, 0, 0),
+    "green": (0, 255, 0),
+    "blue": (0, 0, 255),
+}
+# reverse the colours dictionary to so colour values can be mapped back to language
+REVERSE_COLOURS = {v: k for k, v in COLOURS.items()}
+
+
+class Simulation:
+    """
+    class that runs the ant simulation without any display
+    time is counted in ticks on the environment clock so the sim can run as fast as the cpu allows
+    and gives the same results no matter how busy the machine is
+    """
+
+    def __init__(self, environment, ants, nests, win_food=WIN_FOOD, swarm=None):
+        """
+        initialises the simulation with an already built world
+        the ants are either a list of Ant_agent objects or a vectorised AntSwarm
+
+        Args:
+            environment (Environment): the environment the ants act within
+            ants (list): list of all ants, empty when a swarm is used
+            nests (list): list of all nests
+            win_food (int, optional): food a nest needs to collect to win. Defaults to WIN_FOOD.
+            swarm (AntSwarm, optional): the swarm holding every ant as arrays. Defaults to None.
+        """
+
+        self.environment = environment
+        self.ants = ants
+        self.swarm = swarm
+        self.nests = nests
+        self.win_food = win_food
+        # the nest that won, None while the sim is still running
+        self.winner = None
+        # functions called with the simulation after every tick, used for things like saving checkpoints
+        self.tick_hooks = []
+
+        # ants resting at food or a nest are parked on a timing wheel until the tick they wake up on
+        # so each tick only the ants that are awake are asked to act
+        # active holds the index of every awake ant in order, so ants still act in the same order as the ants list
+        self.sleeping = TimingWheel()
+        self.active = []
+        for index, ant in enumerate(ants):
+            if ant.sleep_until > environment.tick:
+                self.sleeping.schedule(ant.sleep_until, index)
+            else:
+                self.active.append(index)
+
+    @classmethod
+    def create(cls, rows, cols, ants_per_nest=5, num_food_items=20, win_food=WIN_FOOD, engine="agents",
+               pheromone_mode="eager", sensing_range=2, food_spawn_interval=(50, 100), seed=None, wrap=False,
+               obstacle_density=0.0, workers=None, memory_length=MEMORY_LENGTH):
+        """
+        sets up a new simulation
+        places a nest in each quarter of the world, scatters some food and creates the ants
+
+        Args:
+            rows (int): the number of rows in the simulation
+            cols (int): the number of columns in the simulation
+            ants_per_nest (int, optional): number of ants created for each nest. Defaults to 5.
+            num_food_items (int, optional): number of food items placed at the start. Defaults to 20.
+            win_food (int, optional): food a nest needs to collect to win. Defaults to WIN_FOOD.
+            engine (str, optional): "agents" for an Ant_agent object per ant, "swarm" for a vectorised AntSwarm
+                or "parallel" for a ParallelSwarm split over worker processes. Defaults to "agents".
+            pheromone_mode (str, optional): how the environment stores pheromones, see pheromones.PHEROMONE_MODES. Defaults to "eager".
+            sensing_range (int, optional): how many squares away the ants can sense food and pheromones. Defaults to 2.
+            food_spawn_interval (tuple, optional): min and max ticks between food spawning. Defaults to (50, 100).
+            seed (int, optional): seed for the simulations own random number generator,
+                runs with the same seed and settings play out exactly the same. Defaults to None (unseeded).
+            wrap (bool, optional): whether the edges of the world wrap round into a torus. Defaults to False.
+            obstacle_density (float, optional): fraction of squares that are blocked. Defaults to 0.0.
+            workers (int, optional): worker processes for the parallel engine, 0 to run in this process. Defaults to None (one per cpu).
+            memory_length (int, optional): how many of the squares they last stood on the ants remember. Defaults to MEMORY_LENGTH.
+
+        Returns:
+            Simulation: the new simulation
+        """
+
+        # everything random in the run comes from this generator instead of the shared random module
+        rng = random.Random(seed)
+
+        food_items = generate_random_food(rows, cols, num_food_items, rng)
+
+        # define quadrants for the nests
+        # this splts the sim into 4 quarters so a nest can be placed into each so they are better sporead out
+        # also moves the nest away from the edge a bit
+        quadrants = {
+            "top_left": (2, rows // 2, 2, cols // 2),
+            "top_right": (2, rows // 2, cols // 2, cols - 2),
+            "bottom_left": (rows // 2, rows - 2, 2, cols // 2),
+            "bottom_right": (rows // 2, rows - 2, cols // 2, cols - 2),
+        }
+
+        # initialise a nest in each of the quadrants into a list of nests
+        nests = [
+            Nest(*quadrants["top_left"], COLOURS["red"], rng),
+            Nest(*quadrants["top_right"], COLOURS["black"], rng),
+            Nest(*quadrants["bottom_left"], COLOURS["green"], rng),
+            Nest(*quadrants["bottom_right"], COLOURS["blue"], rng),
+        ]
+
+        # scatter obstacles, keeping the squares round each nest clear so no colony is walled in
+        blocked = None
+        if obstacle_density:
+            blocked = random_obstacles(rows, cols, obstacle_density, rng)
+            for nest in nests:
+                x, y = nest.position
+                blocked[max(x - 1, 0):x + 2, max(y - 1, 0):y + 2] = False
+            food_items = [food for food in food_items if not blocked[food.position]]
+        topology = GridTopology(rows, cols, wrap, blocked)
+
+        # initialise the environment with the correct size
+        environment = Environment(rows, cols, food_items, nests, food_spawn_interval, pheromone_mode, rng, topology)
+
+        # the swarm keeps all the ants in arrays instead of objects
+        # its numpy generator is seeded from the simulations generator
+        if engine == "swarm":
+            swarm = AntSwarm(environment, nests, ants_per_nest, sensing_range, memory_length, seed=rng.getrandbits(64))
+            return cls(environment, [], nests, win_food, swarm)
+        if engine == "parallel":
+            swarm = ParallelSwarm(environment, nests, ants_per_nest, sensing_range, memory_length, seed=rng.getrandbits(64),
+                                  workers=workers)
+            return cls(environment, [], nests, win_food, swarm)
+        if engine != "agents":
+            raise ValueError(f"unknown engine: {engine}")
+
+        # create the ants for each nest, they all start at their nest
+        ants = [
+            Ant_agent(nest.position, environment, nest, nest.colour, sensing_range, memory_length)
+            for nest in nests
+            for _ in range(ants_per_nest)
+        ]
+
+        return cls(environment, ants, nests, win_food)
+
+    @property
+    def tick(self):
+        """
+        the number of ticks the simulation has run for
+        """
+        return self.environment.tick
+
+    @property
+    def finished(self):
+        """
+        whether a nest has collected enough food to win
+        """
+        return self.winner is not None
+
+    def step(self, n=1):
+        """
+        advances the simulation by a number of ticks
+        every tick each ant acts once in order, then the environment decays pheromones and spawns food
+        stops early if a nest wins
+
+        Args:
+            n (int, optional): the number of ticks to run. Defaults to 1.
+
+        Returns:
+            int: the number of ticks that were run
+        """
+
+        for ran in range(n):
+            if self.winner is not None:
+                return ran
+
+            # let every ant act, timed as one phase when the sim is being profiled
+            profiler = self.environment.profiler
+            with profiler.phase("ants") if profiler else nullcontext():
+                if self.swarm is not None:
+                    self.swarm.step()
+                if self.ants:
+                    self.act_ants()
+                    if profiler:
+                        profiler.count("branch.resting", len(self.sleeping))
+
+            # move the clock on
+            self.environment.update()
+
+            # check if the win condition has been reached
+            for nest in self.nests:
+                if nest.total_food >= self.win_food:
+                    self.winner = nest
+                    break
+
+            for hook in self.tick_hooks:
+                hook(self)
+
+        return n
+
+    def act_ants(self):
+        """
+        lets every awake ant act once
+        ants that wake up this tick rejoin the active ants and ants that start resting are parked until they wake
+        """
+
+        tick = self.environment.tick
+        ants = self.ants
+
+        woken = self.sleeping.pop_due(tick)
+        if woken:
+            # both lists are already in order so this sort is just a merge
+            self.active = sorted(self.active + woken)
+
+        still_active = []
+        park = self.sleeping.schedule
+        keep = still_active.append
+        for index in self.active:
+            ant = ants[index]
+            ant.act()
+            if ant.sleep_until > tick:
+                park(ant.sleep_until, index)
+            else:
+                keep(index)
+        self.active = still_active
+
+    def run(self, max_ticks):
+        """
+        runs the simulation until a nest wins or the tick limit is reached
+
+        Args:
+            max_ticks (int): the most ticks to run for
+
+        Returns:
+            Nest: the winning nest or None if no nest won in time
+        """
+
+        self.step(max_ticks - self.tick)
+        return self.winner
+
+
+def main():
+    """
+    runs a simulation with no window and prints a summary
+    """
+
+    parser = argparse.ArgumentParser(description="run the ant simulation without a display")
+    parser.add_argument("--rows", type=int, default=33)
+    parser.add_argument("--cols", type=int, default=61)
+    parser.add_argument("--ants", type=int, default=5, help="ants per nest")
+    parser.add_argument("--food", type=int, default=20, help="food items at the start")
+    parser.add_argument("--memory", type=int, default=MEMORY_LENGTH, help="how many of the squares they last stood on the ants remember")
+    parser.add_argument("--ticks", type=int, default=100000, help="most ticks to run for")
+    parser.add_argument("--engine", choices=["agents", "swarm", "parallel"], default="agents",
+                        help="one object per ant, a vectorised swarm or a swarm split over processes")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for the parallel engine, defaults to one per cpu")
+    parser.add_argument("--pheromones", choices=sorted(PHEROMONE_MODES), default="eager", help="how pheromones are stored")
+    parser.add_argument("--seed", type=int, default=None, help="seed to make the run repeatable")
+    parser.add_argument("--wrap", action="store_true", help="wrap the edges of the world round into a torus")
+    parser.add_argument("--obstacles", type=float, default=0.0, help="fraction of squares that are blocked")
+    parser.add_argument("--resume", default=None, help="checkpoint file to carry on from instead of a new world")
+    parser.add_argument("--checkpoint", default=None, help="file to save checkpoints to while running")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="ticks between checkpoints")
+    parser.add_argument("--record", default=None, help="file to record a replay of the run to")
+    parser.add_argument("--profile", default=None, help="file to write a .json or .csv profile of the last ticks to")
+    parser.add_argument("--events", default=None, help="file to log events to, json lines if it ends in .jsonl and binary otherwise")
+    parser.add_argument("--event-level", choices=sorted(LEVELS), default="info", help="lowest level of event logged")
+    parser.add_argument("--event-sample", action="append", default=[], metavar="EVENT=N", help="only log one in N events of a kind")
+    args = parser.parse_args()
+    if args.engine == "parallel" and args.workers != 0 and args.pheromones not in SHARED_PHEROMONE_MODES and not args.resume:
+        parser.error(f"--pheromones {args.pheromones} can't be used with --engine parallel, only {' or '.join(SHARED_PHEROMONE_MODES)} pheromones can be shared with the workers")
+
+    # imported here as the checkpoint module needs this one
+    import checkpoint
+    from profiler import TickProfiler
+    from replay import ReplayRecorder
+
+    if args.resume:
+        simulation = checkpoint.load(args.resume)
+    else:
+        simulation = Simulation.create(args.rows, args.cols, args.ants, args.food, engine=args.engine,
+                                       pheromone_mode=args.pheromones, seed=args.seed, wrap=args.wrap,
+                                       obstacle_density=args.obstacles, workers=args.workers, memory_length=args.memory)
+    writer = None
+    if args.checkpoint:
+        writer = checkpoint.CheckpointWriter(args.checkpoint, args.checkpoint_every)
+        simulation.tick_hooks.append(writer)
+    recorder = None
+    if args.record:
+        recorder = ReplayRecorder(args.record, simulation)
+        simulation.tick_hooks.append(recorder)
+    profiler = None
+    if args.profile:
+        # with no window each tick is a frame of the profile
+        profiler = TickProfiler()
+        simulation.environment.profiler = profiler
+        simulation.tick_hooks.append(lambda simulation: profiler.end_frame(simulation.tick))
+    events = simulation.environment.events
+    events.configure(LEVELS[args.event_level], parse_sample(args.event_sample))
+    event_writer = EventWriter(events, args.events) if args.events else None
+
+    start = time.perf_counter()
+    winner = simulation.run(args.ticks)
+    elapsed = time.perf_counter() - start
+    if writer:
+        # save where the run ended as well so it can be carried on
+        writer.close()
+        checkpoint.save(simulation, args.checkpoint)
+    if recorder:
+        recorder.close()
+    if profiler:
+        profiler.export(args.profile)
+    if event_writer:
+        event_writer.close()
+        print(f"logged {event_writer.written} events to {args.events} ({events.dropped} dropped)")
+
+    print(f"ran {simulation.tick} ticks ({simulation.tick * TICK_SECONDS:.1f}s simulated) in {elapsed:.2f}s")
+    for nest in simulation.nests:
+        print(f"{REVERSE_COLOURS.get(nest.colour, 'Unknown')} nest: {nest.total_food} food")
+    if winner:
+        print(f"{REVERSE_COLOURS.get(winner.colour, 'Unknown')} ants win")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from pheromones import TiledPheromoneField
+from replay import ReplayPheromones, ant_arrays, pheromone_grid
+from ant_agent import GOALS
+from spatial import SpatialHash
+
+# what the renderer draws and shows in popups for each thing, copied out of the simulation so it never changes
+SnapshotAnt = namedtuple("SnapshotAnt", ["position", "colour", "direction", "agent_goal"])
+SnapshotFood = namedtuple("SnapshotFood", ["position", "food_type", "hp"])
+SnapshotNest = namedtuple("SnapshotNest", ["position", "colour", "total_food"])
+SnapshotTopology = namedtuple("SnapshotTopology", ["rows", "cols", "wrap", "blocked_cells", "blocked"])
+
+# how often a running simulation publishes a snapshot, in seconds, about once a frame at 60 fps
+PUBLISH_INTERVAL = 1 / 60
+
+
+class Snapshot:
+    """
+    the simulation as it was at the end of one tick, with the parts of the Environment api the renderer uses
+    everything is copied when it is taken so the simulation can carry on while it is drawn on another thread
+    the arrays are read only and the ant tuples are only built when they are first asked for, on the thread that draws them
+    """
+
+    def __init__(self, simulation, previous=None):
+        """
+        copies what the renderer needs out of the simulation, must be called on the thread running it
+
+        Args:
+            simulation (Simulation): the simulation to copy
+            previous (Snapshot, optional): the last snapshot of the same simulation, parts that havent changed are shared with it. Defaults to None.
+        """
+
+        environment = simulation.environment
+        self.tick = environment.tick
+        self.rows = environment.rows
+        self.cols = environment.cols
+        topology = environment.topology
+        blocked_cells = tuple(topology.blocked_cells)
+        if previous is not None and previous.topology.blocked_cells == blocked_cells:
+            # squares are hardly ever blocked while the sim runs so the last copy is kept
+            self.topology = previous.topology
+        else:
+            blocked = topology.blocked.copy()
+            blocked.flags.writeable = False
+            self.topology = SnapshotTopology(topology.rows, topology.cols, topology.wrap, blocked_cells, blocked)
+
+        pheromones = environment.pheromones
+        if pheromones.tile_size:
+            # a tiled store is copied tile by tile, so a snapshot of a huge world only costs what has been marked
+            self.pheromones = TiledPheromoneField(pheromones.rows, pheromones.cols, pheromones.colours)
+            self.pheromones.set_state(*pheromones.get_state())
+        else:
+            grid = pheromone_grid(pheromones)
+            grid.flags.writeable = False
+            self.pheromones = ReplayPheromones(pheromones.colours, grid)
+        self.food_items = tuple(SnapshotFood(food.position, food.food_type, food.hp) for food in environment.food_items)
+        # indexed by where it is here on the simulation thread, so drawing only looks at the food in view
+        # copies that are exactly the same share an entry, they would be drawn on top of each other anyway
+        self.food_index = SpatialHash()
+        for food in self.food_items:
+            self.food_index.insert(food, food.position)
+        self.nests = tuple(SnapshotNest(nest.position, nest.colour, nest.total_food) for nest in simulation.nests)
+        self.winner = simulation.winner.colour if simulation.winner is not None else None
+
+        self.ant_x, self.ant_y, self.ant_direction, self.ant_colony = (array.copy() for array in ant_arrays(simulation))
+        if simulation.swarm is not None:
+            self.ant_goals = simulation.swarm.goal.copy()
+        else:
+            self.ant_goals = np.array([ant.goal for ant in simulation.ants], dtype=np.int8)
+        self._ants = None
+        self._index = None
+
+    @property
+    def finished(self):
+        """
+        whether a nest had won when the snapshot was taken
+        """
+        return self.winner is not None
+
+    def food_in(self, x0, x1, y0, y1):
+        """
+        gets the food in a rectangle of squares, see Environment.food_in
+        """
+
+        return self.food_index.in_area(x0, x1, y0, y1)
+
+    @property
+    def ants(self):
+        """
+        the ants as tuples the renderer can draw
+        """
+
+        if self._ants is None:
+            colours = [nest.colour for nest in self.nests]
+            goals = [GOALS[goal] for goal in self.ant_goals.tolist()]
+            self._ants = tuple(
+                SnapshotAnt((x, y), colours[colony], direction, goal)
+                for x, y, direction, colony, goal in zip(
+                    self.ant_x.tolist(), self.ant_y.tolist(), self.ant_direction.tolist(), self.ant_colony.tolist(), goals
+                )
+            )
+        return self._ants
+
+    def lookup(self, position):
+        """
+        gets the first nest, food and ant in a grid square, for the hover popups
+
+        Args:
+            position (tuple): coordinates of the grid square
+
+        Returns:
+            tuple: the nest, food and ant in the square, None where there isnt one
+        """
+
+        if self._index is None:
+            # position -> first of each kind of thing there, made the first time the snapshot is hovered over
+            self._index = ({}, {}, {})
+            for index, things in zip(self._index, (self.nests, self.food_items, self.ants)):
+                for thing in things:
+                    index.setdefault(thing.position, thing)
+        return tuple(index.get(position) for index in self._index)
+
+
+class SimulationRunner:
+    """
+    class that runs a simulation on a background thread and publishes snapshots of it for a window to draw
+    only the latest snapshot is kept, one that is replaced before it is drawn is just dropped,
+    so a slow tick never holds up the window and slow drawing never holds up the simulation
+
+    the thread keeps to real time times the speed, runs a fixed number of ticks every frame, or in turbo
+    runs ticks as fast as it can, settings are plain attributes the window sets and the thread reads
+    """
+
+    def __init__(self, simulation, steps_per_frame=0, frame_seconds=1 / 60, tick_seconds=0.1, turbo_batch=10):
+        """
+        takes the first snapshot and starts the thread, paused
+
+        Args:
+            simulation (Simulation): the simulation to run, only the runner thread touches it once started
+            steps_per_frame (int, optional): ticks run every frame_seconds instead of keeping to real time, 0 to keep to real time. Defaults to 0.
+            frame_seconds (float, optional): length of a frame for steps_per_frame. Defaults to 1/60.
+            tick_seconds (float, optional): real time a tick takes at 1x speed. Defaults to 0.1.
+            turbo_batch (int, optional): ticks run between checks of the clock in turbo. Defaults to 10.
+        """
+
+        self.simulation = simulation
+        self.steps_per_frame = steps_per_frame
+        self.frame_seconds = frame_seconds
+        self.tick_seconds = tick_seconds
+        self.turbo_batch = turbo_batch
+        # settings the window changes
+        self.paused = True
+        self.speed = 1
+        self.turbo = False
+        # ticks run since the window last asked, for the profiler
+        # added to by the runner thread and taken by the window thread, so both hold the lock
+        self.ticks_run = 0
+        self.ticks_lock = threading.Lock()
+
+        self.latest = Snapshot(simulation)
+        self.stopping = threading.Event()
+        # set to wake the thread early when a setting changes
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def set(self, paused=None, speed=None, turbo=None):
+        """
+        changes how the simulation runs, from the window thread
+
+        Args:
+            paused (bool, optional): pause or unpause. Defaults to None (unchanged).
+            speed (int, optional): multiple of real time to run at. Defaults to None (unchanged).
+            turbo (bool, optional): run as fast as possible. Defaults to None (unchanged).
+        """
+
+        if paused is not None:
+            self.paused = paused
+        if speed is not None:
+            self.speed = speed
+        if turbo is not None:
+            self.turbo = turbo
+        self.wake.set()
+
+    def take_ticks(self):
+        """
+        gets how many ticks have run since the last call
+
+        Returns:
+            int: the number of ticks
+        """
+
+        with self.ticks_lock:
+            ticks, self.ticks_run = self.ticks_run, 0
+        return ticks
+
+    def run(self):
+        """
+        the runner thread, steps the simulation and publishes snapshots until stopped
+        """
+
+        simulation = self.simulation
+        published = time.perf_counter()
+        # real time that has built up since the last tick
+        time_owed = 0.0
+        last = time.perf_counter()
+
+        while not self.stopping.is_set():
+            if self.paused or simulation.finished:
+                # show the ticks run since the last snapshot before waiting
+                if self.latest.tick != simulation.tick:
+                    self.latest = Snapshot(simulation, self.latest)
+                self.wake.wait(0.05)
+                self.wake.clear()
+                last = time.perf_counter()
+                time_owed = 0.0
+                continue
+
+            frame_start = time.perf_counter()
+            if self.turbo:
+                ticks = self.turbo_batch
+            elif self.steps_per_frame:
+                ticks = self.steps_per_frame
+            else:
+                now = time.perf_counter()
+                # capped so a slow tick cant snowball
+                time_owed = min(time_owed + (now - last) * self.speed, self.tick_seconds * 5 * self.speed)
+                last = now
+                ticks = int(time_owed / self.tick_seconds)
+                time_owed -= ticks * self.tick_seconds
+
+            ran = simulation.step(ticks) if ticks else 0
+            with self.ticks_lock:
+                self.ticks_run += ran
+
+            now = time.perf_counter()
+            if ran and (now - published >= PUBLISH_INTERVAL or simulation.finished):
+                self.latest = Snapshot(simulation, self.latest)
+                published = now
+
+            # wait for the next tick or frame unless running flat out
+            if not self.turbo:
+                if self.steps_per_frame:
+                    wait = self.frame_seconds - (time.perf_counter() - frame_start)
+                else:
+                    wait = (self.tick_seconds - time_owed) / self.speed
+                if wait > 0:
+                    self.wake.wait(wait)
+                    self.wake.clear()
+
+        # make sure the last ticks run are what the window is left showing
+        self.latest = Snapshot(simulation, self.latest)
+
+    def stop(self):
+        """
+        stops the thread and waits for it to finish its tick
+        """
+
+        self.stopping.set()
+        self.wake.set()
+        self.thread.join()
@@ -0,0 +1,204 @@
+class SpatialHash:
+    """
+    class that indexes things in the simulation by where they are
+    the grid is split into square buckets and each bucket keeps the things inside it
+    so looking for things near a position only checks the buckets around it instead of everything in the world
+    anything with a position property can be stored
+    """
+
+    def __init__(self, bucket_size=8):
+        """
+        initialises an empty index
+
+        Args:
+            bucket_size (int, optional): width of each bucket in grid squares. Defaults to 8.
+        """
+
+        self.bucket_size = bucket_size
+        # bucket coordinates -> {entity: order it was added in}
+        # dicts keep their insertion order and remove things in O(1)
+        self.buckets = {}
+        self.added = 0
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def bucket_key(self, position):
+        """
+        gets the coordinates of the bucket a position falls in
+
+        Args:
+            position (tuple): coordinates of a grid square
+
+        Returns:
+            tuple: coordinates of the bucket
+        """
+
+        return (position[0] // self.bucket_size, position[1] // self.bucket_size)
+
+    def insert(self, entity, position):
+        """
+        adds something to the index
+
+        Args:
+            entity (object): the thing being added
+            position (tuple): the grid square it is in
+
+        Returns:
+            int: the order it was added in
+        """
+
+        order = self.added
+        self.buckets.setdefault(self.bucket_key(position), {})[entity] = order
+        self.added += 1
+        return order
+
+    def remove(self, entity, position):
+        """
+        removes something from the index
+
+        Args:
+            entity (object): the thing being removed
+            position (tuple): the grid square it was added at
+
+        Returns:
+            int: the order it was added in
+        """
+
+        key = self.bucket_key(position)
+        bucket = self.buckets[key]
+        order = bucket.pop(entity)
+        # drop empty buckets so the index only holds the parts of the world that have something in them
+        if not bucket:
+            del self.buckets[key]
+        return order
+
+    def move(self, entity, old_position, new_position):
+        """
+        updates the index when something moves
+        nothing needs to change if it stays within the same bucket
+
+        Args:
+            entity (object): the thing that moved
+            old_position (tuple): the grid square it was in
+            new_position (tuple): the grid square it is in now
+        """
+
+        old_key = self.bucket_key(old_position)
+        new_key = self.bucket_key(new_position)
+        if old_key == new_key:
+            return
+
+        bucket = self.buckets[old_key]
+        # keep the order it was first added in so lookups stay in a stable order
+        order = bucket.pop(entity)
+        if not bucket:
+            del self.buckets[old_key]
+        self.buckets.setdefault(new_key, {})[entity] = order
+
+    def at(self, position):
+        """
+        gets everything in a grid square, in the order it was added
+
+        Args:
+            position (tuple): coordinates of the grid square
+
+        Returns:
+            list: everything in the square
+        """
+
+        bucket = self.buckets.get(self.bucket_key(position), {})
+        return [entity for entity in bucket if entity.position == position]
+
+    def within(self, position, radius):
+        """
+        gets everything within a number of squares of a position in any direction
+        covers the square area around the position (chebyshev distance), the same area the ants sense in
+
+        Args:
+            position (tuple): coordinates at the centre of the area
+            radius (int): how many squares the area extends in each direction
+
+        Yields:
+            tuple: (order it was added in, entity) for everything in the area
+        """
+
+        x, y = position
+        size = self.bucket_size
+        for bx in range((x - radius) // size, (x + radius) // size + 1):
+            for by in range((y - radius) // size, (y + radius) // size + 1):
+                bucket = self.buckets.get((bx, by))
+                if not bucket:
+                    continue
+                for entity, order in bucket.items():
+                    ex, ey = entity.position
+                    if abs(ex - x) <= radius and abs(ey - y) <= radius:
+                        yield order, entity
+
+    def first_within(self, position, radius):
+        """
+        gets whatever was added earliest out of everything within range of a position
+
+        Args:
+            position (tuple): coordinates at the centre of the area
+            radius (int): how many squares the area extends in each direction
+
+        Returns:
+            object: the earliest added entity in range or None if there isnt one
+        """
+
+        found = min(self.within(position, radius), key=lambda item: item[0], default=None)
+        return found[1] if found else None
+
+    def nearest(self, position, radius):
+        """
+        gets the closest thing to a position within range
+        distance is chebyshev distance, ties go to whatever was added first
+
+        Args:
+            position (tuple): coordinates at the centre of the area
+            radius (int): how many squares the area extends in each direction
+
+        Returns:
+            object: the nearest entity in range or None if there isnt one
+        """
+
+        x, y = position
+
+        def distance(item):
+            order, entity = item
+            return (max(abs(entity.position[0] - x), abs(entity.position[1] - y)), order)
+
+        found = min(self.within(position, radius), key=distance, default=None)
+        return found[1] if found else None
+
+    def in_area(self, x0, x1, y0, y1):
+        """
+        gets everything in a rectangle of squares, like the part of the world in the window
+        only the buckets overlapping the rectangle are checked, or only the buckets in use if that is fewer
+
+        Args:
+            x0 (int): first row
+            x1 (int): row after the last one
+            y0 (int): first column
+            y1 (int): column after the last one
+
+        Returns:
+            list: everything in the rectangle, in the order it was added
+        """
+
+        size = self.bucket_size
+        bx0, bx1 = x0 // size, -(-x1 // size)
+        by0, by1 = y0 // size, -(-y1 // size)
+        if (bx1 - bx0) * (by1 - by0) > len(self.buckets):
+            buckets = [bucket for (bx, by), bucket in self.buckets.items() if bx0 <= bx < bx1 and by0 <= by < by1]
+        else:
+            buckets = [self.buckets[key] for key in ((bx, by) for bx in range(bx0, bx1) for by in range(by0, by1)) if key in self.buckets]
+        found = [
+            (order, entity)
+            for bucket in buckets
+            for entity, order in bucket.items()
+            if x0 <= entity.position[0] < x1 and y0 <= entity.position[1] < y1
+        ]
+        found.sort(key=lambda item: item[0])
+        return [entity for _, entity in found]
@@ -0,0 +1,153 @@
+import pygame
+
+# size of each food image in grid squares (width, height)
+FOOD_SIZES = {
+    "Nut": (2, 2),
+    "Berry": (2, 3),
+    "Leaf": (4, 4),
+    "Bug": (6, 3),
+}
+
+# image files for each food type
+FOOD_FILES = {
+    "Leaf": "images/leaf.png",
+    "Bug": "images/bug.png",
+    "Berry": "images/berry.png",
+    "Nut": "images/nut.png",
+}
+# image files for the ants and nests of each colour
+ANT_FILES = {
+    (0, 0, 0): "images/black_ant.png",
+    (255, 0, 0): "images/red_ant.png",
+    (0, 255, 0): "images/green_ant.png",
+    (0, 0, 255): "images/blue_ant.png",
+}
+NEST_FILES = {
+    (0, 0, 0): "images/black_ant_nest.png",
+    (255, 0, 0): "images/red_ant_nest.png",
+    (0, 255, 0): "images/green_ant_nest.png",
+    (0, 0, 255): "images/blue_ant_nest.png",
+}
+
+
+class SpriteCache:
+    """
+    class holding every image the simulation draws, already scaled and rotated
+    images are loaded and scaled once, and each ant colour gets a rotated copy for a fixed set of headings
+    so drawing a sprite each frame is just a lookup and a blit
+    the display has to be set up before the cache is made so the images can be converted to its pixel format
+    """
+
+    def __init__(self, grid_size, headings=36):
+        """
+        loads and prepares all the images
+
+        Args:
+            grid_size (int): size of a grid square in pixels
+            headings (int, optional): number of rotated images made for each ant colour. Defaults to 36 (every 10 degrees).
+        """
+
+        self.grid_size = grid_size
+        self.headings = headings
+        self.heading_step = 360 / headings
+
+        # the images at their original size, used for the big pictures on the win screen
+        self.food_images = {food_type: pygame.image.load(path).convert_alpha() for food_type, path in FOOD_FILES.items()}
+        self.ant_images = {colour: pygame.image.load(path).convert_alpha() for colour, path in ANT_FILES.items()}
+        self.nest_images = {colour: pygame.image.load(path).convert_alpha() for colour, path in NEST_FILES.items()}
+
+        # food and nests scaled to their size on the grid, with the offset that centres them on their square
+        self.food = {}
+        for food_type, image in self.food_images.items():
+            width, height = FOOD_SIZES[food_type]
+            size = (grid_size * width, grid_size * height)
+            self.food[food_type] = self.centred(pygame.transform.scale(image, size), grid_size)
+        self.nests = {
+            colour: self.centred(pygame.transform.scale(image, (grid_size * 2, grid_size * 2)), grid_size)
+            for colour, image in self.nest_images.items()
+        }
+
+        # a rotated ant for every heading of every colour, centred on half a square
+        self.ants = {}
+        for colour, image in self.ant_images.items():
+            scaled = pygame.transform.scale(image, (grid_size, grid_size))
+            # the images need an extra 180 degrees
+            self.ants[colour] = [
+                self.centred(pygame.transform.rotate(scaled, heading * self.heading_step + 180), grid_size // 2)
+                for heading in range(headings)
+            ]
+
+        # scaled copies for the win screen, made the first time they are needed
+        self.large = {}
+
+    @staticmethod
+    def centred(image, centre):
+        """
+        pairs an image with the offset that puts its centre on a point
+
+        Args:
+            image (pygame.Surface): the image
+            centre (int): distance from the top left of the grid square to the point in pixels
+
+        Returns:
+            tuple: the image and its (x, y) offset from the top left of the grid square
+        """
+
+        return image, (centre - image.get_width() // 2, centre - image.get_height() // 2)
+
+    def food_sprite(self, food_type):
+        """
+        gets the image for a type of food
+
+        Args:
+            food_type (str): the type of food
+
+        Returns:
+            tuple: the image and its offset from the top left of the grid square
+        """
+
+        return self.food[food_type]
+
+    def nest_sprite(self, colour):
+        """
+        gets the image for a nest
+
+        Args:
+            colour (tuple): colour code of the nest
+
+        Returns:
+            tuple: the image and its offset from the top left of the grid square
+        """
+
+        return self.nests[colour]
+
+    def ant_sprite(self, colour, direction):
+        """
+        gets the image for an ant facing the closest cached heading to its direction
+
+        Args:
+            colour (tuple): colour code of the ant
+            direction (float): direction the ant is facing in degrees
+
+        Returns:
+            tuple: the image and its offset from the top left of the grid square
+        """
+
+        return self.ants[colour][round(direction / self.heading_step) % self.headings]
+
+    def large_image(self, image, size):
+        """
+        gets an image scaled to a size, scaling it only the first time it is asked for
+
+        Args:
+            image (pygame.Surface): one of the original images
+            size (tuple): size in pixels
+
+        Returns:
+            pygame.Surface: the scaled image
+        """
+
+        key = (id(image), size)
+        if key not in self.large:
+            self.large[key] = pygame.transform.scale(image, size)
+        return self.large[key]
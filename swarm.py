@@ -0,0 +1,669 @@
+import numpy as np
+from ant_agent import (REST_TICKS, IGNORE_PHEROMONE_TICKS, GOALS, GOAL_EXPLORING, GOAL_DEPOSITING, GOAL_RETURNING,
+                       GOAL_PICKING_UP, GOAL_FOLLOWING, GOAL_DETECTED)
+from events import PICKUP, DEPOSIT, TRAIL_ABANDONED, FOOD_TYPE_CODES
+from scent import NO_FOOD
+from topology import NEIGHBOR_DX, NEIGHBOR_DY, STEP_ANGLES
+from visited import MEMORY_LENGTH, EMPTY, HASH_MULTIPLIER, HASH_BITS, table_bits
+
+# direction an ant faces after stepping to each neighbour
+NEIGHBOR_ANGLES = np.degrees(np.arctan2(NEIGHBOR_DY, NEIGHBOR_DX)).astype(np.float32)
+# direction an ant faces when heading somewhere further away, the closest of the 8 steps like Ant_agent.face
+# indexed by sign(dx) * 3 + sign(dy) + 4
+STEP_ANGLE_TABLE = np.array(STEP_ANGLES, dtype=np.float32)
+
+
+class AntSwarm:
+    """
+    class representing every ant in the simulation as a struct of numpy arrays
+    instead of one Ant_agent object per ant each property is a column with a row per ant
+    each tick the decisions from Ant_agent.act are made for the whole swarm at once with masked array operations
+    the priorities are the same:
+    return food to nest > move towards sensed food > follow trail > detect trail > explore
+
+    every ant decides from the state of the world at the start of the tick
+    then the shared changes (pheromone drops, picking up and depositing food) are applied together
+    when more ants try to take food than it has HP left the ants earlier in the swarm get it
+    """
+
+    # name of the engine in checkpoints
+    engine = "swarm"
+
+    def __init__(self, environment, nests, ants_per_nest, sensing_range=2, memory_length=MEMORY_LENGTH, seed=None):
+        """
+        initialises the swarm with all the ants sat at their nests
+
+        Args:
+            environment (Environment): the environment that the ants act within
+            nests (list): the nests, each gets ants_per_nest ants
+            ants_per_nest (int): number of ants created for each nest
+            sensing_range (int, optional): how far the ants can sense food and pheromones. Defaults to 2.
+            memory_length (int, optional): how many visited squares each ant remembers. Defaults to MEMORY_LENGTH.
+            seed (int, optional): seed for the random number generator. Defaults to None.
+        """
+
+        self.environment = environment
+        self.nests = nests
+        self.sensing_range = sensing_range
+        self.memory_length = memory_length
+        self.rng = np.random.default_rng(seed)
+
+        count = len(nests) * ants_per_nest
+        self.count = count
+
+        # nest of each ant, and where the nests are and which pheromone layer they use
+        self.colony = np.repeat(np.arange(len(nests)), ants_per_nest)
+        self.nest_x = np.array([nest.position[0] for nest in nests])
+        self.nest_y = np.array([nest.position[1] for nest in nests])
+        self.nest_layer = np.array([environment.pheromones.layers[nest.colour] for nest in nests])
+
+        # state of each ant, mirrors the properties of Ant_agent
+        self.x = self.nest_x[self.colony].copy()
+        self.y = self.nest_y[self.colony].copy()
+        self.direction = np.zeros(count, dtype=np.float32)
+        self.carrying_food = np.zeros(count, dtype=bool)
+        self.following_pheromone = np.zeros(count, dtype=bool)
+        self.goal = np.full(count, GOAL_EXPLORING, dtype=np.int8)
+        self.sleep_until = np.zeros(count, dtype=np.int64)
+        self.ignore_pheromone_until = np.zeros(count, dtype=np.int64)
+
+        # the last squares each ant visited as a ring buffer of flat indexes, -1 is an empty slot
+        # stored slot major so each slot is one contiguous row across the swarm
+        self.visited = np.full((memory_length, count), EMPTY, dtype=np.int32)
+        self.visited_head = np.zeros(count, dtype=np.int64)
+        # a counting hash set of the squares in each ants ring buffer, a row of the table per ant laid out like
+        # VisitedMemory, so checking a square costs the same however long the memory is
+        bits = table_bits(memory_length)
+        self.memory_mask = (1 << bits) - 1
+        self.memory_shift = HASH_BITS - bits
+        self.visited_keys = np.full((count, 1 << bits), EMPTY, dtype=np.int32)
+        self.visited_counts = np.zeros((count, 1 << bits), dtype=np.uint8 if memory_length < 1 << 8 else np.uint16)
+
+        # the environments field of which food is in sensing range of each square, kept up to date as food comes and goes
+        self.scent = environment.scent(sensing_range)
+
+    # the per ant arrays that make up the state of the swarm
+    STATE_ARRAYS = (
+        "colony", "x", "y", "direction", "carrying_food", "following_pheromone", "goal",
+        "sleep_until", "ignore_pheromone_until", "visited", "visited_head", "visited_keys", "visited_counts",
+    )
+
+    def get_state(self):
+        """
+        gets everything needed to save the swarm and restore it later
+
+        Returns:
+            tuple: a dict of plain values and a dict of numpy arrays
+        """
+
+        values = {
+            "sensing_range": self.sensing_range,
+            "memory_length": self.memory_length,
+            "rng": self.rng.bit_generator.state,
+        }
+        return values, {name: getattr(self, name) for name in self.STATE_ARRAYS}
+
+    def set_state(self, values, arrays):
+        """
+        restores the swarm from a saved state
+        the swarm has to have been created with the same sensing range and memory length
+
+        Args:
+            values (dict): the plain values from get_state
+            arrays (dict): the numpy arrays from get_state
+        """
+
+        for name in self.STATE_ARRAYS:
+            setattr(self, name, np.array(arrays[name]))
+        self.count = self.x.size
+        self.rng.bit_generator.state = values["rng"]
+
+    def colours(self):
+        """
+        gets the colour code of every ant
+
+        Returns:
+            list: colour code of each ant in swarm order
+        """
+
+        return [self.nests[colony].colour for colony in self.colony]
+
+    def goal_text(self, index):
+        """
+        gets the goal of an ant as text, the same as Ant_agent.agent_goal
+
+        Args:
+            index (int): the ant in the swarm
+
+        Returns:
+            str: description of what the ant is doing
+        """
+
+        return GOALS[self.goal[index]]
+
+    def step(self):
+        """
+        lets every ant in the swarm act once
+        """
+
+        # ants that are sleeping (picking up or dropping off food) skip the tick
+        awake = np.flatnonzero(self.environment.tick >= self.sleep_until)
+        # counts how many ants take each branch, the same branches as Ant_agent.act, passed on to the profiler if there is one
+        counts = {"branch.resting": self.count - awake.size}
+
+        home, arrived, food, rest = self.decide(awake, counts)
+        self.resolve(home, arrived, food)
+        self.search(rest, counts)
+
+        profiler = self.environment.profiler
+        if profiler:
+            for name, amount in counts.items():
+                profiler.count(name, amount)
+
+    def decide(self, ants, counts):
+        """
+        first half of a tick, for a group of awake ants
+        ants carrying food head home dropping pheromones and the others go for any food they can sense
+        only the ants own rows change, apart from pheromone drops which set a square to full strength
+        so they come out the same whatever order they happen in, everything else shared is left to resolve
+
+        Args:
+            ants (numpy.ndarray): indexes of the awake ants, in swarm order
+            counts (dict): branch counters to add to
+
+        Returns:
+            tuple: ants at their nest with food, ants stood on the food they sensed and that food,
+                and the ants that sensed nothing, for resolve and search
+        """
+
+        carrying = self.carrying_food[ants]
+        carriers = ants[carrying]
+        colony = self.colony[carriers]
+        at_nest = (self.x[carriers] == self.nest_x[colony]) & (self.y[carriers] == self.nest_y[colony])
+        home = carriers[at_nest]
+
+        # ants carrying food head home, dropping pheromones on the way
+        returning = carriers[~at_nest]
+        colony = self.colony[returning]
+        self.goal[returning] = GOAL_RETURNING
+        self.environment.pheromones.drop_many(self.nest_layer[colony], self.x[returning], self.y[returning])
+        self.return_home(returning)
+        counts["branch.depositing"] = home.size
+        counts["branch.returning"] = returning.size
+
+        # ants dropping food off do nothing else this tick, like Ant_agent.act
+        searchers = ants[~carrying]
+
+        # ants that can sense food go for it
+        food = self.sense_food(searchers)
+        sensed = food >= 0
+        seekers = searchers[sensed]
+        food = food[sensed]
+        self.ignore_pheromone_until[seekers] = 0
+        food_x, food_y = self.food_position(food)
+        arrived = (self.x[seekers] == food_x) & (self.y[seekers] == food_y)
+        self.move_towards(seekers[~arrived], food_x[~arrived], food_y[~arrived])
+        counts["branch.picking_up"] = int(arrived.sum())
+        counts["branch.moving_to_food"] = seekers.size - counts["branch.picking_up"]
+        counts["sensing_scans"] = counts["food_lookups"] = searchers.size
+
+        return home, seekers[arrived], food[arrived], searchers[~sensed]
+
+    def resolve(self, home, arrived, food):
+        """
+        applies the changes from decide that other ants could clash over, in swarm order
+        ants drop food off at their nest and pick up food, the earliest ants getting it when there isnt enough
+
+        Args:
+            home (numpy.ndarray): indexes of the ants at their nest with food
+            arrived (numpy.ndarray): indexes of the ants stood on food
+            food (numpy.ndarray): order of the food each of those ants is on
+        """
+
+        self.deposit(home)
+        self.pick_up(arrived, food)
+
+    def search(self, ants, counts):
+        """
+        second half of a tick, for the awake ants that couldnt sense food
+        they follow a trail if they are on one, otherwise look for a trail or explore
+        only the ants own rows change
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants, in swarm order
+            counts (dict): branch counters to add to
+        """
+
+        tick = self.environment.tick
+
+        # follow a trail if on one
+        following = self.following_pheromone[ants]
+        followers = ants[following]
+        self.goal[followers] = GOAL_FOLLOWING
+        self.follow_pheromone(followers)
+
+        # ants ignoring trails explore, the others look for a trail and explore if there isnt one
+        rest = ants[~following]
+        ignore_until = self.ignore_pheromone_until[rest]
+        ignoring = (ignore_until != 0) & (tick < ignore_until)
+        detected = self.start_following_pheromone(rest[~ignoring])
+        trackers = rest[~ignoring][detected]
+        self.goal[trackers] = GOAL_DETECTED
+        self.following_pheromone[trackers] = True
+
+        explorers = np.concatenate((rest[ignoring], rest[~ignoring][~detected]))
+        self.goal[explorers] = GOAL_EXPLORING
+        self.move(explorers)
+
+        counts["branch.following_trail"] = followers.size
+        counts["branch.ignoring_trails"] = int(ignoring.sum())
+        counts["branch.detected_trail"] = trackers.size
+        counts["branch.exploring"] = explorers.size - counts["branch.ignoring_trails"]
+        counts["pheromone_reads"] = followers.size * len(NEIGHBOR_DX) + rest.size - counts["branch.ignoring_trails"]
+
+    def food_position(self, food):
+        """
+        gets the positions of food items sensed by sense_food
+
+        Args:
+            food (numpy.ndarray): orders of the food items, as sense_food gives
+
+        Returns:
+            tuple: arrays of the x and y coordinates
+        """
+
+        orders, index = np.unique(food, return_inverse=True)
+        foods = self.scent.foods
+        positions = np.array([foods[order].position for order in orders.tolist()], dtype=np.int64).reshape(-1, 2)
+        return positions[index, 0], positions[index, 1]
+
+    def sense_food(self, ants):
+        """
+        checks for food within the sensing range of a group of ants, one lookup in the scent field per ant
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants that are sensing
+
+        Returns:
+            numpy.ndarray: the order the food each ant senses was added to the environment in, -1 if there is none
+        """
+
+        found = self.scent.field[self.x[ants], self.y[ants]]
+        return np.where(found != NO_FOOD, found, -1)
+
+    def pick_up(self, ants, food):
+        """
+        ants standing on food pick some up
+        a food item can only be taken as many times as it has HP, the earliest ants in the swarm go first
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants on food
+            food (numpy.ndarray): order of the food each ant is on
+        """
+
+        if ants.size == 0:
+            return
+
+        foods = self.scent.foods
+        # group the ants by food, keeping swarm order within each group
+        order = np.lexsort((ants, food))
+        ants, food = ants[order], food[order]
+        items, first, counts = np.unique(food, return_index=True, return_counts=True)
+        hp = np.array([foods[item].hp for item in items.tolist()])
+        place = np.arange(ants.size) - np.repeat(first, counts)
+        lucky = ants[place < np.repeat(hp, counts)]
+
+        self.goal[lucky] = GOAL_PICKING_UP
+        self.carrying_food[lucky] = True
+        self.sleep_until[lucky] = self.environment.tick + REST_TICKS
+
+        events = self.environment.events
+        if events.wants(PICKUP):
+            tick = self.environment.tick
+            for ant, item in zip(lucky.tolist(), food[place < np.repeat(hp, counts)].tolist()):
+                events.emit(PICKUP, tick, int(self.x[ant]), int(self.y[ant]), int(self.colony[ant]),
+                            FOOD_TYPE_CODES[foods[item].food_type])
+
+        for item, taken in zip(items.tolist(), np.minimum(counts, hp).tolist()):
+            position = foods[item].position
+            for _ in range(taken):
+                self.environment.remove_food(position)
+
+    def deposit(self, ants):
+        """
+        ants at their nest drop off the food they are carrying
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants that are depositing
+        """
+
+        if ants.size == 0:
+            return
+
+        self.goal[ants] = GOAL_DEPOSITING
+        self.carrying_food[ants] = False
+        self.sleep_until[ants] = self.environment.tick + REST_TICKS
+
+        events = self.environment.events
+        if events.wants(DEPOSIT):
+            # each ant logs the nests total after its own food is added, the same as Ant_agent
+            totals = [nest.total_food for nest in self.nests]
+            for ant, colony in zip(ants.tolist(), self.colony[ants].tolist()):
+                totals[colony] += 1
+                events.emit(DEPOSIT, self.environment.tick, int(self.nest_x[colony]), int(self.nest_y[colony]), colony, totals[colony])
+
+        for nest, amount in zip(self.nests, np.bincount(self.colony[ants], minlength=len(self.nests))):
+            if amount:
+                nest.add_food(int(amount))
+
+    def remember(self, ants):
+        """
+        adds the current square of each ant to its memory of visited squares
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+        """
+
+        if not self.memory_length:
+            return
+        cells = self.x[ants] * self.environment.cols + self.y[ants]
+        head = self.visited_head[ants]
+
+        # forget the oldest square of ants whose memory is full, it only leaves the table if this was the last copy
+        oldest = self.visited[head, ants]
+        full = oldest != EMPTY
+        if full.any():
+            ants_full = ants[full]
+            slots = self.memory_slots(ants_full, oldest[full])
+            self.visited_counts[ants_full, slots] -= 1
+            gone = self.visited_counts[ants_full, slots] == 0
+            self.forget(ants_full[gone], slots[gone])
+
+        self.visited[head, ants] = cells
+        slots = self.memory_slots(ants, cells)
+        self.visited_keys[ants, slots] = cells
+        self.visited_counts[ants, slots] += 1
+        self.visited_head[ants] = (head + 1) % self.memory_length
+
+    def memory_slots(self, ants, cells):
+        """
+        finds the slot of squares in their ants hash tables, like VisitedMemory.slot for a batch
+        every square is probed one slot further each round until it is found or an empty slot is reached,
+        the tables are at most half full so that only takes a few rounds
+
+        Args:
+            ants (numpy.ndarray): index of the ant for each square, broadcast with cells
+            cells (numpy.ndarray): flat indexes of the squares
+
+        Returns:
+            numpy.ndarray: the slot holding each square, or the empty slot it would go in, in the shape of cells
+        """
+
+        ants, cells = np.broadcast_arrays(ants, cells)
+        shape = cells.shape
+        ants, cells = ants.ravel(), cells.ravel()
+        keys = self.visited_keys
+        slots = (cells * HASH_MULTIPLIER & 0xFFFF) >> self.memory_shift
+        probing = np.arange(cells.size)
+        while probing.size:
+            key = keys[ants[probing], slots[probing]]
+            probing = probing[(key != cells[probing]) & (key != EMPTY)]
+            slots[probing] = (slots[probing] + 1) & self.memory_mask
+        return slots.reshape(shape)
+
+    def forget(self, ants, gaps):
+        """
+        empties slots in the ants hash tables, shifting the entries after each one back like VisitedMemory.remove,
+        every ant moves one slot along its run each round until it reaches an empty slot
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants, each at most once
+            gaps (numpy.ndarray): the slot to empty for each ant
+        """
+
+        keys = self.visited_keys
+        counts = self.visited_counts
+        mask = self.memory_mask
+        slots = gaps.copy()
+        while ants.size:
+            slots = (slots + 1) & mask
+            key = keys[ants, slots]
+            end = key == EMPTY
+            keys[ants[end], gaps[end]] = EMPTY
+            counts[ants[end], gaps[end]] = 0
+            ants, gaps, slots, key = ants[~end], gaps[~end], slots[~end], key[~end]
+
+            home = (key * HASH_MULTIPLIER & 0xFFFF) >> self.memory_shift
+            # the entry can fill the gap unless its home slot is between the gap and where it is now
+            move = ((gaps < slots) & ((home <= gaps) | (home > slots))) | ((slots < gaps) & (home <= gaps) & (home > slots))
+            keys[ants[move], gaps[move]] = key[move]
+            counts[ants[move], gaps[move]] = counts[ants[move], slots[move]]
+            gaps[move] = slots[move]
+
+    def neighbors(self, ants):
+        """
+        gets the surrounding squares of a group of ants
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+
+        Returns:
+            tuple: x and y arrays of shape (ants, 8) and a mask of which squares can be walked on
+        """
+
+        return self.environment.topology.neighbors_many(self.x[ants], self.y[ants])
+
+    def return_home(self, ants):
+        """
+        moves a group of ants one square along the shortest way back to their nests, from each nests homing field
+        ants with no way home head straight for their nest instead
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+        """
+
+        if ants.size == 0:
+            return
+
+        colony = self.colony[ants]
+        cells = self.x[ants] * self.environment.cols + self.y[ants]
+        steps = np.empty(ants.size, dtype=np.int64)
+        for index, nest in enumerate(self.nests):
+            mine = colony == index
+            steps[mine] = nest.homing.next_cell[cells[mine]]
+
+        lost = steps < 0
+        found = ants[~lost]
+        # face the nest like move_towards does, then take the step
+        dx, dy = self.environment.topology.offset_many(self.x[found], self.y[found], self.nest_x[colony[~lost]], self.nest_y[colony[~lost]])
+        self.direction[found] = STEP_ANGLE_TABLE[np.sign(dx) * 3 + np.sign(dy) + 4]
+        self.x[found], self.y[found] = np.divmod(steps[~lost], self.environment.cols)
+        self.move_towards(ants[lost], self.nest_x[colony[lost]], self.nest_y[colony[lost]])
+
+    def move_towards(self, ants, target_x, target_y):
+        """
+        moves a group of ants one square towards their targets
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+            target_x (numpy.ndarray): x coordinate of each ants target
+            target_y (numpy.ndarray): y coordinate of each ants target
+        """
+
+        if ants.size == 0:
+            return
+
+        topology = self.environment.topology
+        dx, dy = topology.offset_many(self.x[ants], self.y[ants], target_x, target_y)
+        # turn to face the target
+        turning = (dx != 0) | (dy != 0)
+        self.direction[ants[turning]] = STEP_ANGLE_TABLE[np.sign(dx[turning]) * 3 + np.sign(dy[turning]) + 4]
+
+        # step one square along each axis, only if the square can be walked on
+        new_x, new_y, allowed = topology.step_many(self.x[ants], self.y[ants], np.sign(dx), np.sign(dy))
+        self.x[ants[allowed]] = new_x[allowed]
+        self.y[ants[allowed]] = new_y[allowed]
+        if not allowed.all():
+            blocked = ~allowed
+            self.go_round(ants[blocked], np.asarray(target_x)[blocked], np.asarray(target_y)[blocked],
+                          np.maximum(np.abs(dx), np.abs(dy))[blocked])
+
+    def go_round(self, ants, target_x, target_y, distance):
+        """
+        moves ants whose straight step towards their target is blocked to the open neighbour that gets closest to it
+        ants with no neighbour any closer, like behind a wall, move like exploring ants so they are never stuck for good
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+            target_x (numpy.ndarray): x coordinate of each ants target
+            target_y (numpy.ndarray): y coordinate of each ants target
+            distance (numpy.ndarray): how many steps each ant is from its target now
+        """
+
+        x, y, inside = self.neighbors(ants)
+        dx, dy = self.environment.topology.offset_many(x, y, target_x[:, None], target_y[:, None])
+        after = np.maximum(np.abs(dx), np.abs(dy))
+        after[~inside] = np.iinfo(after.dtype).max
+        # ties go to the first in neighbour order, the same one Ant_agent.move_towards picks
+        choice = after.argmin(axis=1)
+        rows = np.arange(ants.size)
+        closer = after[rows, choice] < distance
+
+        self.direction[ants[closer]] = NEIGHBOR_ANGLES[choice[closer]]
+        self.x[ants[closer]] = x[rows, choice][closer]
+        self.y[ants[closer]] = y[rows, choice][closer]
+        self.move(ants[~closer])
+
+    def move(self, ants):
+        """
+        moves a group of exploring ants to a random neighbouring square
+        each ant picks a square it hasnt visited recently if there is one, otherwise any square
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+        """
+
+        if ants.size == 0:
+            return
+
+        x, y, inside = self.neighbors(ants)
+        cells = x * self.environment.cols + y
+        # look each neighbour up in its ants hash table
+        if self.memory_length:
+            visited = self.visited_keys[ants[:, None], self.memory_slots(ants[:, None], cells)] == cells
+        else:
+            visited = np.zeros(x.shape, dtype=bool)
+
+        # random scores, unvisited squares always beat visited ones and out of bounds squares never win
+        score = self.random_scores(ants, x.shape) + ~visited
+        score[~inside] = -1
+        choice = score.argmax(axis=1)
+
+        # ants walled in by blocked squares stay where they are
+        free = inside.any(axis=1)
+        if not free.all():
+            ants, x, y, choice = ants[free], x[free], y[free], choice[free]
+
+        rows = np.arange(ants.size)
+        self.direction[ants] = NEIGHBOR_ANGLES[choice]
+        self.remember(ants)
+        self.x[ants] = x[rows, choice]
+        self.y[ants] = y[rows, choice]
+
+    def random_scores(self, ants, shape):
+        """
+        gets the random numbers exploring ants pick their next square with
+
+        Args:
+            ants (numpy.ndarray): indexes of the exploring ants
+            shape (tuple): shape of the numbers wanted, a row per ant
+
+        Returns:
+            numpy.ndarray: numbers between 0 and 1
+        """
+
+        return self.rng.random(shape)
+
+    def start_following_pheromone(self, ants):
+        """
+        checks for a pheromone trail within sensing range of a group of ants
+        ants that find one move towards it
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+
+        Returns:
+            numpy.ndarray: boolean mask of the ants that found a trail
+        """
+
+        found = np.zeros(ants.size, dtype=bool)
+        if ants.size == 0:
+            return found
+
+        r = self.sensing_range
+        topology = self.environment.topology
+        layers = self.nest_layer[self.colony[ants]]
+        target_x = np.zeros(ants.size, dtype=np.int64)
+        target_y = np.zeros(ants.size, dtype=np.int64)
+
+        # scan the squares in the same row by row order as Ant_agent and keep the first trail each ant finds
+        for dx in range(-r, r + 1):
+            for dy in range(-r, r + 1):
+                x, y, inside = topology.wrap_many(self.x[ants] + dx, self.y[ants] + dy)
+                hit = ~found & inside
+                hit[hit] = self.environment.pheromones.has_trail_many(layers[hit], x[hit], y[hit])
+                target_x[hit] = x[hit]
+                target_y[hit] = y[hit]
+                found |= hit
+
+        self.move_towards(ants[found], target_x[found], target_y[found])
+        return found
+
+    def follow_pheromone(self, ants):
+        """
+        moves a group of ants along their trails in the direction away from their nest
+        ants that reach the end of a trail stop following and ignore trails for a while
+
+        Args:
+            ants (numpy.ndarray): indexes of the ants
+        """
+
+        if ants.size == 0:
+            return
+
+        x, y, inside = self.neighbors(ants)
+        colony = self.colony[ants]
+        if self.memory_length:
+            last = self.visited[(self.visited_head[ants] - 1) % self.memory_length, ants]
+        else:
+            last = np.full(ants.size, EMPTY)
+
+        # squares on the trail, skipping the square the ant was just on
+        trail = inside & (x * self.environment.cols + y != last[:, None])
+        layers = np.broadcast_to(self.nest_layer[colony][:, None], x.shape)
+        trail[trail] = self.environment.pheromones.has_trail_many(layers[trail], x[trail], y[trail])
+
+        # pick the trail square furthest from the nest, the short way round if the world wraps
+        dx, dy = self.environment.topology.offset_many(self.nest_x[colony][:, None], self.nest_y[colony][:, None], x, y)
+        distance = dx ** 2 + dy ** 2
+        distance[~trail] = 0
+        choice = distance.argmax(axis=1)
+        rows = np.arange(ants.size)
+        found = distance[rows, choice] > 0
+
+        movers = ants[found]
+        self.remember(movers)
+        self.move_towards(movers, x[rows, choice][found], y[rows, choice][found])
+        # stop following once food is in range
+        smelled = movers[self.sense_food(movers) >= 0]
+        self.following_pheromone[smelled] = False
+        self.ignore_pheromone_until[smelled] = 0
+
+        # no trail left, stop following and ignore trails for a while so the ant isnt caught in a loop
+        lost = ants[~found]
+        self.following_pheromone[lost] = False
+        self.ignore_pheromone_until[lost] = self.environment.tick + IGNORE_PHEROMONE_TICKS
+        events = self.environment.events
+        if events.wants(TRAIL_ABANDONED):
+            for ant in lost.tolist():
+                events.emit(TRAIL_ABANDONED, self.environment.tick, int(self.x[ant]), int(self.y[ant]), int(self.colony[ant]))
@@ -0,0 +1,153 @@
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from simulation import Simulation, REVERSE_COLOURS
+from visited import MEMORY_LENGTH
+
+# settings every run starts from, the sweep grid overrides them
+BASE_PARAMETERS = {
+    "rows": 33,
+    "cols": 61,
+    "ants_per_nest": 5,
+    "num_food_items": 20,
+    "sensing_range": 2,
+    "memory_length": MEMORY_LENGTH,
+    "food_spawn_interval": (50, 100),
+    "win_food": 50,
+    "engine": "agents",
+    "pheromone_mode": "eager",
+    "wrap": False,
+    "obstacle_density": 0.0,
+}
+
+
+def parameter_grid(grid):
+    """
+    expands a dict of parameter values into every combination of them
+
+    Args:
+        grid (dict): parameter name -> list of values to try
+
+    Returns:
+        list: one dict of parameters for each combination
+    """
+
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_one(parameters, seed, max_ticks, sample_every):
+    """
+    runs one headless simulation with its own seeded random number generator
+    this is what each worker process runs
+
+    Args:
+        parameters (dict): settings that replace the ones in BASE_PARAMETERS
+        seed (int): seed for the run
+        max_ticks (int): the most ticks to run before giving up on a winner
+        sample_every (int): how many ticks between samples of the food each nest has
+
+    Returns:
+        dict: the settings and seed, the winner, ticks taken and the food per nest over time
+    """
+
+    settings = {**BASE_PARAMETERS, **parameters}
+    simulation = Simulation.create(**settings, seed=seed)
+    names = [REVERSE_COLOURS.get(nest.colour, "unknown") for nest in simulation.nests]
+
+    # food per nest every sample_every ticks, starting from tick 0
+    samples = {"tick": [0], **{name: [0] for name in names}}
+    while not simulation.finished and simulation.tick < max_ticks:
+        simulation.step(min(sample_every, max_ticks - simulation.tick))
+        samples["tick"].append(simulation.tick)
+        for name, nest in zip(names, simulation.nests):
+            samples[name].append(nest.total_food)
+
+    winner = simulation.winner
+    return {
+        "parameters": parameters,
+        "seed": seed,
+        "winner": REVERSE_COLOURS.get(winner.colour, "unknown") if winner else None,
+        "ticks": simulation.tick,
+        "food": samples,
+    }
+
+
+def sweep(grid, seeds, max_ticks=20000, sample_every=100, workers=None):
+    """
+    runs every combination of parameters with every seed, spread over a pool of processes
+
+    Args:
+        grid (dict): parameter name -> list of values to try
+        seeds (list): seeds to run each combination with
+        max_ticks (int, optional): the most ticks each run can take. Defaults to 20000.
+        sample_every (int, optional): ticks between food samples. Defaults to 100.
+        workers (int, optional): number of processes. Defaults to one per cpu core.
+
+    Returns:
+        list: the result of each run, in the same order as the grid and seeds
+    """
+
+    runs = [(parameters, seed) for parameters in parameter_grid(grid) for seed in seeds]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(run_one, parameters, seed, max_ticks, sample_every) for parameters, seed in runs]
+        return [future.result() for future in futures]
+
+
+def parse_parameter(text):
+    """
+    reads a parameter from the command line in the form name=value,value,...
+    values are read as json so numbers and lists work, anything else is kept as a string
+
+    Args:
+        text (str): the parameter text
+
+    Returns:
+        tuple: the name and the list of values
+    """
+
+    name, _, values = text.partition("=")
+    if name not in BASE_PARAMETERS:
+        raise argparse.ArgumentTypeError(f"unknown parameter: {name}")
+
+    parsed = []
+    for value in values.split(";" if "[" in values else ","):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            pass
+        # json gives lists but the simulation wants the spawn interval as a tuple
+        parsed.append(tuple(value) if isinstance(value, list) else value)
+    return name, parsed
+
+
+def main():
+    """
+    runs a parameter sweep from the command line and writes the results to a json file
+    """
+
+    parser = argparse.ArgumentParser(
+        description="run headless simulations over a grid of parameters on every core",
+        epilog="example: python sweep.py --param ants_per_nest=5,10,20 --param food_spawn_interval=[20,40];[50,100]",
+    )
+    parser.add_argument("--param", type=parse_parameter, action="append", default=[],
+                        help="name=value,value,... (use ; between values that are lists)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--ticks", type=int, default=20000, help="most ticks per run")
+    parser.add_argument("--sample-every", type=int, default=100, help="ticks between food samples")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default one per core)")
+    parser.add_argument("--out", default="sweep_results.json")
+    args = parser.parse_args()
+
+    results = sweep(dict(args.param), args.seeds, args.ticks, args.sample_every, args.workers)
+    with open(args.out, "w") as file:
+        json.dump(results, file)
+
+    for result in results:
+        print(f"{result['parameters']} seed {result['seed']}: {result['winner'] or 'no winner'} after {result['ticks']} ticks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+import math
+import numpy as np
+
+# offsets to the 8 surrounding squares, the order every neighbour table and list is in
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+NEIGHBOR_DX = np.array([dx for dx, _ in NEIGHBOR_OFFSETS])
+NEIGHBOR_DY = np.array([dy for _, dy in NEIGHBOR_OFFSETS])
+# about how many squares the neighbour table is built for at a time, so the temporaries stay small however big the world is
+TABLE_SLAB = 1 << 16
+# flat indexes are kept as 32 bit ints, which halves the neighbour table and everything indexed by it
+INDEX_DTYPE = np.int32
+# slot of the opposite step for each slot, the way back to a square from its neighbour
+OPPOSITE_SLOT = tuple(NEIGHBOR_OFFSETS.index((-dx, -dy)) for dx, dy in NEIGHBOR_OFFSETS)
+# direction in degrees something faces after each of the 8 steps, indexed by (dx + 1) * 3 + dy + 1 for steps of -1, 0 or 1
+# worked out once so moving never needs trigonometry, the middle entry is standing still and is never used
+STEP_ANGLES = tuple(math.degrees(math.atan2(dy, dx)) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+
+def random_obstacles(rows, cols, density, rng):
+    """
+    scatters blocked squares over a world
+
+    Args:
+        rows (int): the number of rows in the simulation
+        cols (int): the number of columns in the simulation
+        density (float): fraction of squares to block
+        rng (random.Random): random number generator to use
+
+    Returns:
+        numpy.ndarray: rows x cols boolean array, true where a square is blocked
+    """
+
+    blocked = np.zeros(rows * cols, dtype=bool)
+    blocked[rng.sample(range(rows * cols), int(rows * cols * density))] = True
+    return blocked.reshape(rows, cols)
+
+
+class GridTopology:
+    """
+    class describing how the squares of the world connect to each other
+    the world is either bounded, where the edges are walls, or a torus, where walking off one edge comes back on the other
+    squares can also be blocked so nothing can walk onto them
+
+    the neighbours of every square are worked out once, as a table of flat indexes (row * cols + col)
+    with -1 where a neighbour is off the edge or blocked, so moving never has to check bounds
+    """
+
+    def __init__(self, rows, cols, wrap=False, blocked=None):
+        """
+        builds the neighbour table for a world
+
+        Args:
+            rows (int): the number of rows in the simulation
+            cols (int): the number of columns in the simulation
+            wrap (bool, optional): whether the edges wrap round into a torus. Defaults to False.
+            blocked (numpy.ndarray, optional): rows x cols boolean array of blocked squares. Defaults to None (nothing blocked).
+        """
+
+        self.rows = rows
+        self.cols = cols
+        self.wrap = wrap
+        self.blocked = np.zeros((rows, cols), dtype=bool) if blocked is None else np.array(blocked, dtype=bool)
+        # the blocked squares as (row, col) positions, for drawing them
+        self.blocked_cells = [tuple(cell) for cell in np.argwhere(self.blocked).tolist()]
+
+        self.table = self.build_table()
+        # (row, col, blocked) for each square blocked or opened since take_changes was last called, None when not tracked
+        self.changes = None
+
+        # neighbours of each square as tuples of positions for the ant objects, filled in as squares are visited
+        self.neighbor_lists = {}
+        # offsets of the squares in a sensing window for each radius, in row by row order
+        self.windows = {}
+
+    def build_table(self):
+        """
+        works out the neighbour table, a slab of rows at a time
+        each slab is written straight into the table, one neighbour at a time,
+        so the only temporaries are the size of a slab rather than the size of the world
+
+        Returns:
+            numpy.ndarray: (rows * cols) x 8 table of flat indexes, -1 where a neighbour is off the edge or blocked
+        """
+
+        rows, cols = self.rows, self.cols
+        if rows * cols > np.iinfo(INDEX_DTYPE).max:
+            raise ValueError(f"a world of {rows} x {cols} squares is too big to index")
+        table = np.empty((rows * cols, len(NEIGHBOR_OFFSETS)), dtype=INDEX_DTYPE)
+        y = np.arange(cols, dtype=INDEX_DTYPE)
+        slab = max(1, TABLE_SLAB // cols)
+        for start in range(0, rows, slab):
+            end = min(start + slab, rows)
+            x = np.arange(start, end, dtype=INDEX_DTYPE)[:, None]
+            # the rows of the table for this slab, as one row of the slab per row of the world
+            block = table[start * cols:end * cols].reshape(end - start, cols, len(NEIGHBOR_OFFSETS))
+            for slot, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+                nx = x + dx
+                ny = y + dy
+                if self.wrap:
+                    nx %= rows
+                    ny %= cols
+                    valid = ~self.blocked[nx, ny]
+                else:
+                    inside = ((nx >= 0) & (nx < rows)) & ((ny >= 0) & (ny < cols))
+                    valid = inside & ~self.blocked[np.clip(nx, 0, rows - 1), np.clip(ny, 0, cols - 1)]
+                out = block[:, :, slot]
+                np.multiply(nx, cols, out=out, casting="unsafe")
+                out += ny
+                out[~valid] = -1
+        return table
+
+    @classmethod
+    def from_table(cls, rows, cols, wrap, blocked, table):
+        """
+        creates a topology around a neighbour table and blocked array that have already been built
+        used by worker processes that share them with the main process instead of building their own
+
+        Args:
+            rows (int): the number of rows in the simulation
+            cols (int): the number of columns in the simulation
+            wrap (bool): whether the edges wrap round into a torus
+            blocked (numpy.ndarray): rows x cols boolean array of blocked squares, used as it is
+            table (numpy.ndarray): the neighbour table, used as it is
+
+        Returns:
+            GridTopology: the topology
+        """
+
+        topology = cls.__new__(cls)
+        topology.rows = rows
+        topology.cols = cols
+        topology.wrap = wrap
+        topology.blocked = blocked
+        topology.blocked_cells = [tuple(cell) for cell in np.argwhere(blocked).tolist()]
+        topology.table = table
+        topology.changes = None
+        topology.neighbor_lists = {}
+        topology.windows = {}
+        return topology
+
+    def is_open(self, position):
+        """
+        checks if a square can be walked on
+
+        Args:
+            position (tuple): coordinates of the square
+
+        Returns:
+            bool: true if the square is in the world and not blocked
+        """
+
+        x, y = position
+        if self.wrap:
+            x, y = x % self.rows, y % self.cols
+        elif not (0 <= x < self.rows and 0 <= y < self.cols):
+            return False
+        return not self.blocked[x, y]
+
+    def set_blocked(self, position, blocked=True):
+        """
+        blocks or opens a square after the table has been built
+        only the table entries pointing at the square change, in the rows of its neighbours
+
+        Args:
+            position (tuple): coordinates of the square
+            blocked (bool, optional): true to block the square, false to open it. Defaults to True.
+        """
+
+        x, y = position
+        if self.blocked[x, y] == blocked:
+            return
+        self.blocked[x, y] = blocked
+        if blocked:
+            self.blocked_cells.append((x, y))
+        else:
+            self.blocked_cells.remove((x, y))
+        if self.changes is not None:
+            self.changes.append((x, y, blocked))
+
+        cell = x * self.cols + y
+        for slot, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            nx, ny = x + dx, y + dy
+            if self.wrap:
+                nx, ny = nx % self.rows, ny % self.cols
+            elif not (0 <= nx < self.rows and 0 <= ny < self.cols):
+                continue
+            # the neighbour reaches this square with the opposite step
+            self.table[nx * self.cols + ny, OPPOSITE_SLOT[slot]] = -1 if blocked else cell
+            self.neighbor_lists.pop((nx, ny), None)
+
+    def track_changes(self, tracking=True):
+        """
+        starts or stops keeping track of squares that are blocked or opened, for take_changes
+
+        Args:
+            tracking (bool, optional): whether to keep track. Defaults to True.
+        """
+
+        self.changes = [] if tracking else None
+
+    def take_changes(self):
+        """
+        gets the squares blocked or opened since the last call and starts again
+
+        Returns:
+            list: (row, col, blocked) for each change, in the order they were made
+        """
+
+        changes, self.changes = self.changes, []
+        return changes
+
+    def neighbors(self, position):
+        """
+        gets the squares an ant can step to from a square
+        the tuple is made once per square and shared, so it must not be changed
+
+        Args:
+            position (tuple): coordinates of the square
+
+        Returns:
+            tuple: positions of the open neighbouring squares
+        """
+
+        neighbors = self.neighbor_lists.get(position)
+        if neighbors is None:
+            row = self.table[position[0] * self.cols + position[1]]
+            neighbors = tuple(divmod(int(cell), self.cols) for cell in row if cell >= 0)
+            self.neighbor_lists[position] = neighbors
+        return neighbors
+
+    def offset(self, position, target):
+        """
+        gets the step from one square to another, the short way round on a torus
+
+        Args:
+            position (tuple): coordinates of the start
+            target (tuple): coordinates of the end
+
+        Returns:
+            tuple: the row and column difference
+        """
+
+        dx = target[0] - position[0]
+        dy = target[1] - position[1]
+        if self.wrap:
+            dx = (dx + self.rows // 2) % self.rows - self.rows // 2
+            dy = (dy + self.cols // 2) % self.cols - self.cols // 2
+        return dx, dy
+
+    def step(self, position, dx, dy):
+        """
+        takes one step from a square
+
+        Args:
+            position (tuple): coordinates of the start
+            dx (int): row step, -1, 0 or 1
+            dy (int): column step, -1, 0 or 1
+
+        Returns:
+            tuple: the square stepped to or None if it is off the edge or blocked
+        """
+
+        x, y = position[0] + dx, position[1] + dy
+        if self.wrap:
+            x, y = x % self.rows, y % self.cols
+        elif not (0 <= x < self.rows and 0 <= y < self.cols):
+            return None
+        if self.blocked[x, y]:
+            return None
+        return (x, y)
+
+    def window(self, position, radius):
+        """
+        gets the squares within a number of squares of a position in any direction, in row by row order
+        squares off the edge are left out, on a torus they wrap round instead
+
+        Args:
+            position (tuple): coordinates at the centre
+            radius (int): how many squares the window extends in each direction
+
+        Returns:
+            tuple: arrays of the row and column of each square
+        """
+
+        offsets = self.windows.get(radius)
+        if offsets is None:
+            span = np.arange(-radius, radius + 1)
+            offsets = (np.repeat(span, span.size), np.tile(span, span.size))
+            self.windows[radius] = offsets
+        x = position[0] + offsets[0]
+        y = position[1] + offsets[1]
+        if self.wrap:
+            return x % self.rows, y % self.cols
+        inside = (x >= 0) & (x < self.rows) & (y >= 0) & (y < self.cols)
+        return x[inside], y[inside]
+
+    def wrapped_centres(self, position, radius):
+        """
+        gets every copy of a position whose window reaches into the world
+        on a torus a window hanging off one edge also covers the squares on the other edge,
+        which are found by searching round a copy of the position shifted by the size of the world
+
+        Args:
+            position (tuple): coordinates at the centre
+            radius (int): how many squares the window extends in each direction
+
+        Returns:
+            list: the position itself and any shifted copies that need searching too
+        """
+
+        if not self.wrap:
+            return [position]
+        x, y = position
+        xs = [x] + [x + shift for shift in (-self.rows, self.rows) if -radius <= x + shift < self.rows + radius]
+        ys = [y] + [y + shift for shift in (-self.cols, self.cols) if -radius <= y + shift < self.cols + radius]
+        return [(cx, cy) for cx in xs for cy in ys]
+
+    def neighbors_many(self, x, y):
+        """
+        gets the neighbouring squares of many squares at once
+
+        Args:
+            x (numpy.ndarray): rows of the squares
+            y (numpy.ndarray): columns of the squares
+
+        Returns:
+            tuple: row and column arrays of shape (squares, 8) and a mask of which neighbours are open
+        """
+
+        cells = self.table[x * self.cols + y]
+        open_ = cells >= 0
+        nx, ny = np.divmod(np.where(open_, cells, 0), self.cols)
+        return nx, ny, open_
+
+    def offset_many(self, x, y, target_x, target_y):
+        """
+        gets the steps from many squares to their targets, the short way round on a torus
+
+        Args:
+            x (numpy.ndarray): rows of the starts
+            y (numpy.ndarray): columns of the starts
+            target_x (numpy.ndarray): rows of the targets
+            target_y (numpy.ndarray): columns of the targets
+
+        Returns:
+            tuple: arrays of the row and column differences
+        """
+
+        dx = target_x - x
+        dy = target_y - y
+        if self.wrap:
+            dx = (dx + self.rows // 2) % self.rows - self.rows // 2
+            dy = (dy + self.cols // 2) % self.cols - self.cols // 2
+        return dx, dy
+
+    def step_many(self, x, y, dx, dy):
+        """
+        takes one step from many squares at once
+
+        Args:
+            x (numpy.ndarray): rows of the starts
+            y (numpy.ndarray): columns of the starts
+            dx (numpy.ndarray): row steps, -1, 0 or 1
+            dy (numpy.ndarray): column steps, -1, 0 or 1
+
+        Returns:
+            tuple: rows and columns stepped to and a mask of the steps that were allowed
+        """
+
+        new_x = x + dx
+        new_y = y + dy
+        if self.wrap:
+            new_x %= self.rows
+            new_y %= self.cols
+            allowed = np.ones(new_x.shape, dtype=bool)
+        else:
+            allowed = (new_x >= 0) & (new_x < self.rows) & (new_y >= 0) & (new_y < self.cols)
+        allowed[allowed] = ~self.blocked[new_x[allowed], new_y[allowed]]
+        return new_x, new_y, allowed
+
+    def wrap_many(self, x, y):
+        """
+        brings squares that may be off the edge back into the world
+
+        Args:
+            x (numpy.ndarray): rows of the squares
+            y (numpy.ndarray): columns of the squares
+
+        Returns:
+            tuple: rows and columns, wrapped on a torus, and a mask of the squares that are in the world
+        """
+
+        if self.wrap:
+            return x % self.rows, y % self.cols, np.ones(x.shape, dtype=bool)
+        return x, y, (x >= 0) & (x < self.rows) & (y >= 0) & (y < self.cols)
@@ -0,0 +1,227 @@
+from array import array
+
+# how many of the squares it last stood on an ant remembers by default
+MEMORY_LENGTH = 50
+# marks an empty slot in the ring buffer and the hash table, flat indexes are never negative
+EMPTY = -1
+# multiplier for fibonacci hashing (2 ** 16 / golden ratio), the top bits of the low 16 bits of the product pick the slot
+# so squares next to each other, or a row apart, land in slots spread over the table
+# 16 bits keeps the numbers small so the sum is quick in python, which limits the table to 2 ** 16 slots
+HASH_MULTIPLIER = 40503
+HASH_BITS = 16
+# longest memory the table has room for at most half full
+MAX_MEMORY_LENGTH = 1 << (HASH_BITS - 1)
+
+
+def table_bits(length):
+    """
+    works out how big a hash table of remembered squares has to be, a power of two at least twice the length
+    so probes stay short, used by VisitedMemory and the swarms memory arrays
+
+    Args:
+        length (int): how many squares are remembered
+
+    Returns:
+        int: log2 of the number of slots
+    """
+
+    if length > MAX_MEMORY_LENGTH:
+        raise ValueError(f"memory length can be at most {MAX_MEMORY_LENGTH}, not {length}")
+    bits = 2
+    while 1 << bits < length * 2:
+        bits += 1
+    return bits
+
+
+class VisitedMemory:
+    """
+    class that remembers the last few squares an ant stood on
+    the squares are kept as flat indexes (row * cols + col) in a ring buffer, which overwrites the oldest one once it is full,
+    along with a counting hash set of the squares in the buffer, so adding a square, forgetting the oldest one
+    and checking if a square is remembered all take the same time however long the memory is
+
+    there is one of these for every ant so everything is packed into arrays of machine ints instead of python objects,
+    the hash set is an open addressed table with linear probing at most half full,
+    which for the default length takes about 1KB per ant where a python set of the same squares takes about 4KB
+    """
+
+    # slots instead of a __dict__, there is one of these for every ant
+    __slots__ = ("cols", "length", "cells", "head", "size", "keys", "counts", "mask", "shift")
+
+    def __init__(self, cols, length=MEMORY_LENGTH):
+        """
+        initialises an empty memory
+
+        Args:
+            cols (int): the number of columns in the world, to turn positions into flat indexes
+            length (int, optional): how many squares are remembered. Defaults to MEMORY_LENGTH.
+        """
+
+        bits = table_bits(length)
+        self.cols = cols
+        self.length = length
+        # the ring buffer of 32 bit indexes, the next square is written at head and it holds size squares before it
+        self.cells = array("i", [EMPTY]) * length
+        self.head = 0
+        self.size = 0
+        # the hash table, see table_bits
+        self.mask = (1 << bits) - 1
+        self.shift = HASH_BITS - bits
+        # the square in each slot and how many times it is in the ring buffer,
+        # a square can't be in it more than length times so short memories count in bytes
+        self.keys = array("i", [EMPTY]) * (1 << bits)
+        self.counts = array("B" if length < 1 << 8 else "H", [0]) * (1 << bits)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, position):
+        cell = position[0] * self.cols + position[1]
+        return self.keys[self.slot(cell)] == cell
+
+    def __iter__(self):
+        # oldest first, the order the squares were added in
+        for slot in range(self.head - self.size, self.head):
+            yield divmod(self.cells[slot % self.length], self.cols)
+
+    def slot(self, cell):
+        """
+        finds the slot of a square in the hash table
+
+        Args:
+            cell (int): flat index of the square
+
+        Returns:
+            int: the slot holding the square, or the empty slot it would go in if it isnt remembered
+        """
+
+        keys = self.keys
+        mask = self.mask
+        slot = (cell * HASH_MULTIPLIER & 0xFFFF) >> self.shift
+        while True:
+            key = keys[slot]
+            if key == cell or key == EMPTY:
+                return slot
+            slot = (slot + 1) & mask
+
+    def remove(self, slot):
+        """
+        empties a slot in the hash table
+        the entries after it in the same run are shifted back into the gap when their home slot allows,
+        so lookups never have to step over deleted entries
+
+        Args:
+            slot (int): the slot to empty
+        """
+
+        keys = self.keys
+        counts = self.counts
+        mask = self.mask
+        shift = self.shift
+        gap = slot
+        while True:
+            slot = (slot + 1) & mask
+            key = keys[slot]
+            if key == EMPTY:
+                break
+            home = (key * HASH_MULTIPLIER & 0xFFFF) >> shift
+            # the entry can fill the gap unless its home slot is between the gap and where it is now
+            if (gap < slot and (home <= gap or home > slot)) or (slot < gap and home <= gap and home > slot):
+                keys[gap] = key
+                counts[gap] = counts[slot]
+                gap = slot
+        keys[gap] = EMPTY
+        counts[gap] = 0
+
+    def add(self, position):
+        """
+        remembers a square, forgetting the oldest one if the memory is full
+
+        Args:
+            position (tuple): coordinates of the square
+        """
+
+        length = self.length
+        if not length:
+            return
+        cells = self.cells
+        keys = self.keys
+        counts = self.counts
+        mask = self.mask
+        shift = self.shift
+        head = self.head
+        # the slot lookups are written out like in unvisited, this runs every time an ant moves
+        if self.size == length:
+            # forget the oldest square, it only leaves the table if this was the last time it is in the buffer
+            oldest = cells[head]
+            slot = (oldest * HASH_MULTIPLIER & 0xFFFF) >> shift
+            while keys[slot] != oldest:
+                slot = (slot + 1) & mask
+            if counts[slot] > 1:
+                counts[slot] -= 1
+            else:
+                self.remove(slot)
+        else:
+            self.size += 1
+        cell = position[0] * self.cols + position[1]
+        cells[head] = cell
+        slot = (cell * HASH_MULTIPLIER & 0xFFFF) >> shift
+        key = keys[slot]
+        while key != cell and key != EMPTY:
+            slot = (slot + 1) & mask
+            key = keys[slot]
+        keys[slot] = cell
+        counts[slot] += 1
+        self.head = head + 1 if head + 1 < length else 0
+
+    def last(self):
+        """
+        gets the square added most recently
+
+        Returns:
+            tuple: coordinates of the square or None if nothing is remembered
+        """
+
+        if not self.size:
+            return None
+        return divmod(self.cells[self.head - 1], self.cols)
+
+    def unvisited(self, positions):
+        """
+        picks out the squares that are not remembered
+        the lookup is written out here rather than calling slot, as it runs for every neighbour of every exploring ant
+
+        Args:
+            positions (tuple): coordinates of the squares to check, like the neighbours of an ant
+
+        Returns:
+            list: the squares that are not remembered, in the order they were given
+        """
+
+        keys = self.keys
+        mask = self.mask
+        shift = self.shift
+        cols = self.cols
+        unvisited = []
+        for position in positions:
+            cell = position[0] * cols + position[1]
+            slot = (cell * HASH_MULTIPLIER & 0xFFFF) >> shift
+            while True:
+                key = keys[slot]
+                if key == cell:
+                    break
+                if key == EMPTY:
+                    unvisited.append(position)
+                    break
+                slot = (slot + 1) & mask
+        return unvisited
+
+    def clear(self):
+        """
+        forgets every square
+        """
+
+        self.head = 0
+        self.size = 0
+        self.keys = array("i", [EMPTY]) * len(self.keys)
+        self.counts = array(self.counts.typecode, [0]) * len(self.counts)